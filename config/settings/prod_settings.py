@@ -29,6 +29,10 @@ REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 REDIS_PASSWORD = os.getenv("REDIS_PASS", "")
 
+# Dedicated Redis instance of the rendered record HTML (see CACHES below)
+RENDER_REDIS_HOST = os.getenv("RENDER_REDIS_HOST", "redis-renders")
+RENDER_REDIS_PORT = os.getenv("RENDER_REDIS_PORT", "6379")
+
 # Add config/static_files for deployment-specific custom assets
 # This allows users to place custom logos and images in config/static_files
 # without modifying the base applicaiton code
@@ -73,7 +77,21 @@ CACHES = {
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         }
-    }
+    },
+    # Rendered record HTML, render failures, metrics and re-rendering progress
+    # (NX_RENDER_CACHE_ALIAS). Kept in a separate Redis instance, started with
+    # a "maxmemory" limit and the "allkeys-lru" eviction policy (see
+    # docker-compose.base.yml), so that filling it with renders evicts the
+    # least recently displayed records instead of the sessions stored in
+    # "default" (maxmemory and the eviction policy apply to a whole instance,
+    # not to one of its databases). Everything stored there can be rebuilt.
+    "renders": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": f"redis://:{REDIS_PASSWORD}@{RENDER_REDIS_HOST}:{RENDER_REDIS_PORT}/0",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
+    },
 }
 
 # Option 2: Database-backed sessions with in-memory cache (fallback)
@@ -85,7 +103,11 @@ CACHES = {
 #     "default": {
 #         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
 #         "LOCATION": "unique-snowflake",
-#     }
+#     },
+#     "renders": {
+#         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+#         "LOCATION": "renders",
+#     },
 # }
 
 # Security settings
@@ -186,6 +186,15 @@ function admin-stats {
     docker exec "$script:COMPOSE_PROJECT_NAME`_cdcs" python /srv/scripts/show_stats.py 2>&1 | Where-Object { $_ -notmatch 'SSL_CERTIFICATES_DIR|Registered signals' }
 }
 
+# Rendered-HTML cache
+function admin-prefill-cache {
+    docker exec "$script:COMPOSE_PROJECT_NAME`_cdcs" python manage.py prefill_list_cache 2>&1 | Where-Object { $_ -notmatch 'SSL_CERTIFICATES_DIR|Registered signals' }
+}
+
+function admin-rerender {
+    docker exec "$script:COMPOSE_PROJECT_NAME`_cdcs" python manage.py rerender_records 2>&1 | Where-Object { $_ -notmatch 'SSL_CERTIFICATES_DIR|Registered signals' }
+}
+
 # Environment initialization
 function admin-init {
     docker exec -it "$script:COMPOSE_PROJECT_NAME`_cdcs" python /srv/scripts/init_environment.py
@@ -214,6 +223,10 @@ Write-Host ""
 Write-Host "  📊 Statistics:"
 Write-Host "    admin-stats           - Show system statistics (users, records, templates)"
 Write-Host ""
+Write-Host "  ⚡ Caching:"
+Write-Host "    admin-prefill-cache   - Render all records into the search results cache"
+Write-Host "    admin-rerender        - Re-render all records (after a stylesheet change)"
+Write-Host ""
 Write-Host "  🚀 Initialization:"
 Write-Host "    admin-init            - Initialize environment (create superuser, load schema & XSLT)"
 Write-Host ""
@@ -151,6 +151,10 @@ admin-import-users() {
 # Data statistics
 alias admin-stats="docker exec ${COMPOSE_PROJECT_NAME}_cdcs python /srv/scripts/show_stats.py 2>&1 | grep -v 'SSL_CERTIFICATES_DIR\|Registered signals'"
 
+# Rendered-HTML cache
+alias admin-prefill-cache="docker exec ${COMPOSE_PROJECT_NAME}_cdcs python manage.py prefill_list_cache 2>&1 | grep -v 'SSL_CERTIFICATES_DIR\|Registered signals'"
+alias admin-rerender="docker exec ${COMPOSE_PROJECT_NAME}_cdcs python manage.py rerender_records 2>&1 | grep -v 'SSL_CERTIFICATES_DIR\|Registered signals'"
+
 # Environment initialization
 alias admin-init="docker exec -it ${COMPOSE_PROJECT_NAME}_cdcs python /srv/scripts/init_environment.py"
 
@@ -176,6 +180,10 @@ echo ""
 echo "  📊 Statistics:"
 echo "    admin-stats           - Show system statistics (users, records, templates)"
 echo ""
+echo "  ⚡ Caching:"
+echo "    admin-prefill-cache   - Render all records into the search results cache"
+echo "    admin-rerender        - Re-render all records (after a stylesheet change)"
+echo ""
 echo "  🚀 Initialization:"
 echo "    admin-init            - Initialize environment (create superuser, load schema & XSLT)"
 echo ""
@@ -102,4 +102,8 @@ esac
 
 echo ""
 echo "XSLT stylesheet(s) updated in database."
-echo "Refresh your browser to see changes."
+echo "Pages keep using the previous stylesheet(s) until every record is"
+echo "re-rendered with the new one(s), which is queued on the Celery workers."
+echo "To follow its progress, or to re-render all records here instead, run:"
+echo "  docker compose exec cdcs python manage.py rerender_records --status"
+echo "  docker compose exec cdcs python manage.py rerender_records"
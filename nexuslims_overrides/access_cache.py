@@ -0,0 +1,192 @@
+"""
+Per-user access-control cache.
+
+Every search and detail request asks core_main_app which workspaces the user
+(or, for anonymous visitors, the "anonymous" group, see signals.py) can read
+or write, which takes several queries (the user's groups, the workspace
+permissions, the workspaces). These rarely change, so the resolved
+permission ids and workspace ids are cached per user, and for anonymous
+visitors, in a Django cache shared by all processes.
+
+install_access_cache wraps the core functions computing them (the workspace
+API functions return querysets of the cached ids, as callers such as forms
+and serializers expect querysets). Cache keys include a version shared by all
+processes, which the signal handlers change whenever a workspace, a group, a
+permission or a user's groups or permissions change, so stale entries are
+never read.
+"""
+import functools
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+ACCESS_CACHE_KEY_PREFIX = "nx:access"
+ACCESS_VERSION_KEY = "nx:access-version"
+
+# Whether the core functions are wrapped (install_access_cache is idempotent)
+_installed = False
+
+
+def get_access_cache():
+    """Return the Django cache used to store resolved access control
+
+    Returns:
+        BaseCache: the cache configured by NX_ACCESS_CACHE_ALIAS
+
+    """
+    return caches[getattr(settings, "NX_ACCESS_CACHE_ALIAS", "default")]
+
+
+def is_access_cache_enabled():
+    """Check whether resolved access control should be cached
+
+    Returns:
+        bool: False if NX_ACCESS_CACHE_TIMEOUT is set to 0
+
+    """
+    return getattr(settings, "NX_ACCESS_CACHE_TIMEOUT", 300) != 0
+
+
+def _get_user_key(user):
+    """Identify the access of a user in cache keys"""
+    if user is None or user.is_anonymous:
+        return "anonymous"
+    # superusers can access everything, whatever their groups
+    return f"{user.id}:{'superuser' if user.is_superuser else 'user'}"
+
+
+def get_cached_access(name, user, compute):
+    """Get a resolved access-control value of a user from the cache, or
+    compute and cache it
+
+    Args:
+        name: name of the value (e.g. "read-workspaces")
+        user: user the value is resolved for
+        compute: function computing the value (which must be picklable)
+
+    Returns:
+        the value
+
+    """
+    cache = get_access_cache()
+    try:
+        version = cache.get(ACCESS_VERSION_KEY, 0)
+        cache_key = (
+            f"{ACCESS_CACHE_KEY_PREFIX}:{version}:{name}:{_get_user_key(user)}"
+        )
+        value = cache.get(cache_key)
+    except Exception as e:
+        # Never fail a request because the cache is unavailable
+        logger.warning(f"Could not read access control from cache: {e}")
+        return compute()
+    if value is None:
+        value = compute()
+        try:
+            cache.set(
+                cache_key,
+                value,
+                timeout=getattr(settings, "NX_ACCESS_CACHE_TIMEOUT", 300),
+            )
+        except Exception as e:
+            logger.warning(f"Could not store access control in cache: {e}")
+    return value
+
+
+def bump_access_version():
+    """Change the version of the access-control cache, so that every process
+    resolves access control again"""
+    cache = get_access_cache()
+    try:
+        try:
+            cache.incr(ACCESS_VERSION_KEY)
+        except ValueError:
+            # key does not exist yet
+            cache.set(ACCESS_VERSION_KEY, 1, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not update access control version: {e}")
+
+
+def _cache_permission_ids(name, func):
+    """Wrap a core function returning the workspace permission ids of a user"""
+
+    @functools.wraps(func)
+    def wrapper(user):
+        return get_cached_access(name, user, lambda: list(func(user)))
+
+    return wrapper
+
+
+def _cache_workspaces(name, func):
+    """Wrap a core function returning the workspaces a user can access, as a
+    queryset of the cached workspace ids"""
+    from core_main_app.components.workspace.models import Workspace
+
+    @functools.wraps(func)
+    def wrapper(user):
+        workspace_ids = get_cached_access(
+            name, user, lambda: list(func(user).values_list("pk", flat=True))
+        )
+        return Workspace.objects.filter(pk__in=workspace_ids)
+
+    return wrapper
+
+
+def _cache_workspace_ids(name, func):
+    """Wrap a core function returning the ids of the workspaces a user can
+    access"""
+
+    @functools.wraps(func)
+    def wrapper(user):
+        return get_cached_access(name, user, lambda: list(func(user)))
+
+    return wrapper
+
+
+def install_access_cache():
+    """Cache the access control resolved by core_main_app (see the module
+    docstring)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from core_main_app.components.blob import access_control as blob_access
+    from core_main_app.components.data import access_control as data_access
+    from core_main_app.components.workspace import api as workspace_api
+    from core_main_app.permissions import api as permission_api
+
+    permission_api.get_all_workspace_permissions_user_can_read = (
+        _cache_permission_ids(
+            "read-permissions",
+            permission_api.get_all_workspace_permissions_user_can_read,
+        )
+    )
+    permission_api.get_all_workspace_permissions_user_can_write = (
+        _cache_permission_ids(
+            "write-permissions",
+            permission_api.get_all_workspace_permissions_user_can_write,
+        )
+    )
+    workspace_api.get_all_workspaces_with_read_access_by_user = _cache_workspaces(
+        "read-workspaces",
+        workspace_api.get_all_workspaces_with_read_access_by_user,
+    )
+    workspace_api.get_all_workspaces_with_write_access_by_user = _cache_workspaces(
+        "write-workspaces",
+        workspace_api.get_all_workspaces_with_write_access_by_user,
+    )
+    # ids of the workspaces a search is restricted to (not a queryset, so
+    # searches do not query the workspaces at all)
+    get_read_accessible_workspaces = _cache_workspace_ids(
+        "search-workspaces",
+        data_access._get_read_accessible_workspaces_by_user,
+    )
+    data_access._get_read_accessible_workspaces_by_user = (
+        get_read_accessible_workspaces
+    )
+    blob_access._get_read_accessible_workspaces_by_user = (
+        get_read_accessible_workspaces
+    )
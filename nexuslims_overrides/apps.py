@@ -21,3 +21,38 @@ class NexusLIMSOverridesConfig(AppConfig):
 
         # Import signal handlers
         from . import signals  # noqa: F401
+
+        # Register the XSLT extension functions used by the stylesheets
+        from django.conf import settings
+
+        if getattr(settings, "NX_XSLT_EXTENSION_FUNCTIONS", True):
+            from .xslt_functions import register_xslt_functions
+
+            register_xslt_functions()
+
+        # Cache the workspaces and permissions resolved for each user
+        from .access_cache import install_access_cache, is_access_cache_enabled
+
+        if is_access_cache_enabled():
+            install_access_cache()
+
+        # Filter instrument-pid queries through the instrument index
+        from .instrument_index import (
+            install_instrument_pid_filter,
+            is_instrument_index_enabled,
+        )
+
+        if is_instrument_index_enabled():
+            install_instrument_pid_filter()
+
+        # Run keyword searches on the PostgreSQL full-text search documents
+        from .fulltext import install_fulltext_search, is_fulltext_search_enabled
+
+        if is_fulltext_search_enabled():
+            install_fulltext_search()
+
+        # Look record names up by trigram similarity
+        from .fuzzy_search import install_fuzzy_search, is_fuzzy_search_enabled
+
+        if is_fuzzy_search_enabled():
+            install_fuzzy_search()
@@ -39,9 +39,13 @@ def nexuslims_features(request):
         {% if NX_ENABLE_TUTORIALS %}
             <!-- Setup template -->
         {% endif %}
+        {% if NX_FUZZY_SEARCH %}
+            <!-- Search box suggestions -->
+        {% endif %}
     """
     return {
         'NX_ENABLE_TUTORIALS': getattr(settings, 'NX_ENABLE_TUTORIALS', True),
+        'NX_FUZZY_SEARCH': getattr(settings, 'NX_FUZZY_SEARCH', False),
     }
 
 def nexuslims_colors(request):
@@ -0,0 +1,229 @@
+"""
+Server-side dataset table.
+
+Records with more datasets than NX_MAX_DATASET_DISPLAY_COUNT are displayed
+as a table with one row per dataset (the "simple" display). Rather than
+rendering every row into the page, the detail stylesheet can render an
+empty table that DataTables fills a page at a time from the
+nexuslims_dataset_rows view, in the DataTables server-side processing
+format, so that the page weight does not grow with the number of datasets.
+
+The rows of a record are extracted once per version of the record and kept
+in the rendered fragment cache (see nexuslims_overrides.render_cache). The
+base URLs of the datasets and previews are stylesheet variables, so the rows
+hold paths, which the table prefixes with the base URLs read from the page.
+"""
+import logging
+import math
+
+from django.conf import settings
+from lxml import etree
+
+from nexuslims_overrides.record_summary import (
+    EXPERIMENT_NAMESPACE,
+    get_record_summary,
+)
+from nexuslims_overrides.render_cache import (
+    get_render_cache,
+    is_render_cache_enabled,
+)
+from nexuslims_overrides.xml import get_parsed_xml
+from nexuslims_overrides.xslt_functions import decode
+
+logger = logging.getLogger(__name__)
+
+DATASET_ROWS_CACHE_KEY_PREFIX = "nx:dataset-rows"
+
+# Values of a row, in the order of the table columns (see the
+# simple-filelist-table template of the detail stylesheet)
+ROW_FIELDS = (
+    "number",
+    "activity",
+    "name",
+    "path",
+    "path_link",
+    "type",
+    "preview",
+    "metadata",
+    "location",
+)
+
+# Table column -> sort key of a row, for the sortable columns
+SORT_KEYS = {
+    0: lambda row: row[0],
+    1: lambda row: (math.isnan(row[1]), row[1]),
+    2: lambda row: row[2].casefold(),
+    3: lambda row: row[3].casefold(),
+    4: lambda row: row[5].casefold(),
+}
+
+# Upper bound of the number of rows returned at once
+MAX_PAGE_LENGTH = 1000
+
+_find_datasets = etree.XPath(
+    "//nx:dataset", namespaces={"nx": EXPERIMENT_NAMESPACE}
+)
+
+
+def is_dataset_table_server_side():
+    """Check whether the simple display should load its rows from the server
+
+    Returns:
+        bool: value of NX_DATASET_TABLE_SERVER_SIDE (default: True)
+
+    """
+    return getattr(settings, "NX_DATASET_TABLE_SERVER_SIDE", True)
+
+
+def _get_child_text(element, name):
+    """Get the text of the first child of a dataset element, like the XPath
+    string(nx:name) expression
+
+    Returns:
+        str: text of the child, or None if there is no such child
+    """
+    child = element.find(f"{{{EXPERIMENT_NAMESPACE}}}{name}")
+    if child is None:
+        return None
+    return "".join(child.itertext())
+
+
+def _format_number(value):
+    """Format a number like the XPath string() function"""
+    if math.isnan(value):
+        return "NaN"
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def extract_dataset_rows(xml_tree, root_path):
+    """Extract the rows of the dataset table of a record, with the values
+    the simple-filelist-table template displays
+
+    Args:
+        xml_tree: parsed record
+        root_path: root path of the file listing (see get_filelist_root_path)
+
+    Returns:
+        list: one tuple of ROW_FIELDS values per dataset, in document order
+
+    """
+    rows = []
+    for number, dataset in enumerate(_find_datasets(xml_tree), start=1):
+        try:
+            activity = float(dataset.getparent().get("seqno")) + 1
+        except (TypeError, ValueError):
+            activity = math.nan
+        location = _get_child_text(dataset, "location") or ""
+        preview = _get_child_text(dataset, "preview")
+
+        # folder of the dataset, without trailing slash (template
+        # "get-path-of-file")
+        path_link = location.rpartition("/")[0]
+        _, found, relative_path = path_link.partition(root_path)
+        relative_path = (found and relative_path) or "/"
+
+        if preview is not None:
+            # like substring-before(), empty if there is no ".thumb.png"
+            before, found, _ = preview.partition(".thumb.png")
+            metadata = (before if found else "") + ".json"
+        else:
+            metadata = location + ".json"
+
+        dataset_type = dataset.get("type", "")
+        rows.append(
+            (
+                number,
+                activity,
+                _get_child_text(dataset, "name") or "",
+                decode(None, relative_path),
+                path_link,
+                "Spectrum Image" if dataset_type == "SpectrumImage" else dataset_type,
+                preview,
+                " ".join(metadata.split()),
+                location,
+            )
+        )
+    return rows
+
+
+def get_dataset_rows(data):
+    """Get the rows of the dataset table of a record, extracting them if they
+    are not cached for this version of the record
+
+    Args:
+        data: Data of the record
+
+    Returns:
+        list: rows returned by extract_dataset_rows
+
+    """
+    cache_key = (
+        f"{DATASET_ROWS_CACHE_KEY_PREFIX}:{data.id}"
+        f"@{data.last_modification_date.isoformat()}"
+    )
+    try:
+        rows = get_render_cache().get(cache_key)
+    except Exception as e:
+        logger.warning(f"Could not read dataset rows from cache: {e}")
+        rows = None
+    if rows is not None:
+        return rows
+
+    xml_string = data.xml_content
+    summary = get_record_summary(xml_string, data_id=data.id)
+    rows = extract_dataset_rows(get_parsed_xml(xml_string), summary["root_path"])
+
+    if is_render_cache_enabled():
+        try:
+            get_render_cache().set(
+                cache_key,
+                rows,
+                timeout=getattr(settings, "NX_RENDER_CACHE_TIMEOUT", 604800),
+            )
+        except Exception as e:
+            logger.warning(f"Could not store dataset rows in cache: {e}")
+    return rows
+
+
+def query_dataset_rows(rows, search="", order_column=0, descending=False):
+    """Filter and sort the rows of a dataset table
+
+    Like the client-side table, the search only looks at the dataset names:
+    a row matches if its name contains every word of the search,
+    ignoring case.
+
+    Args:
+        rows: rows returned by get_dataset_rows
+        search: search string
+        order_column: index of the table column to sort by (rows are left in
+            document order for columns that are not sortable)
+        descending: whether to sort in descending order
+
+    Returns:
+        list: matching rows, sorted
+
+    """
+    words = search.casefold().split()
+    if words:
+        rows = [
+            row for row in rows if all(word in row[2].casefold() for word in words)
+        ]
+    sort_key = SORT_KEYS.get(order_column)
+    if sort_key is not None:
+        rows = sorted(rows, key=sort_key, reverse=descending)
+    return rows
+
+
+def format_dataset_row(row):
+    """Format a row for the JSON response of the nexuslims_dataset_rows view
+
+    Args:
+        row: tuple of ROW_FIELDS values
+
+    Returns:
+        dict: field -> value
+
+    """
+    row = dict(zip(ROW_FIELDS, row))
+    row["activity"] = _format_number(row["activity"])
+    return row
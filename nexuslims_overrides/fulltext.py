@@ -0,0 +1,236 @@
+"""
+PostgreSQL full-text keyword search.
+
+core_main_app turns the keywords of a keyword search into one
+case-insensitive substring comparison per keyword on the stored content of
+every record (it only uses a full-text index for the "postgresql_psycopg2"
+engine name, and then indexes the whole content), so the cost of a search
+grows with the repository.
+
+With NX_KEYWORD_SEARCH_BACKEND = "postgres", the fields visitors search for
+are instead extracted when a record is saved into a weighted tsvector (see
+nexuslims_overrides.models.RecordSearchDocument, which has a GIN index):
+
+- A: the title
+- B: the experimenters, sample names and instruments (names and PIDs)
+- C: the dataset paths, split on path separators so that each directory and
+  file name can be searched for
+
+install_fulltext_search makes the query conversion of core_main_app match
+keywords against these documents (with websearch_to_tsquery, so quoted
+phrases and "-" exclusions work), and orders the results by relevance when
+the default sort order is requested.
+
+Records saved before the backend was selected are indexed by the
+``backfill_search_documents`` management command.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import OuterRef, Q, Subquery, TextField, Value
+from lxml import etree
+
+from core_main_app.utils.query.mongo.prepare import sanitize_value
+
+from nexuslims_overrides.models import RecordSearchDocument
+from nexuslims_overrides.query_conversion import (
+    require_postgresql,
+    wrap_convert_to_django,
+)
+from nexuslims_overrides.record_summary import EXPERIMENT_NAMESPACE
+from nexuslims_overrides.xml import get_parsed_xml
+
+POSTGRES_BACKEND = "postgres"
+
+_namespaces = {"nx": EXPERIMENT_NAMESPACE}
+# XPath expressions of the searchable fields, by weight
+_search_fields = {
+    "A": [etree.XPath("/nx:Experiment/nx:title", namespaces=_namespaces)],
+    "B": [
+        etree.XPath(
+            "/nx:Experiment/nx:summary/nx:experimenter", namespaces=_namespaces
+        ),
+        etree.XPath("/nx:Experiment/nx:sample/nx:name", namespaces=_namespaces),
+        etree.XPath(
+            "/nx:Experiment/nx:summary/nx:instrument", namespaces=_namespaces
+        ),
+        etree.XPath(
+            "/nx:Experiment/nx:summary/nx:instrument/@pid",
+            namespaces=_namespaces,
+        ),
+    ],
+    "C": [etree.XPath("//nx:dataset/nx:location", namespaces=_namespaces)],
+}
+_path_separators = re.compile(r"[/\\]+")
+
+# Whether the query conversion is wrapped (install_fulltext_search is
+# idempotent)
+_installed = False
+
+
+def is_fulltext_search_enabled():
+    """Check whether keyword searches should use the PostgreSQL full-text
+    backend
+
+    Returns:
+        bool: True if NX_KEYWORD_SEARCH_BACKEND is "postgres"
+
+    """
+    return getattr(settings, "NX_KEYWORD_SEARCH_BACKEND", "default") == (
+        POSTGRES_BACKEND
+    )
+
+
+def get_search_config():
+    """Get the PostgreSQL text search configuration used to build and query
+    the search documents
+
+    Returns:
+        str: value of NX_FULLTEXT_SEARCH_CONFIG
+
+    """
+    return getattr(settings, "NX_FULLTEXT_SEARCH_CONFIG", "english")
+
+
+def get_search_fields(xml_string, title=""):
+    """Extract the searchable text of a record
+
+    Args:
+        xml_string: content of the record
+        title: title of the data, used if the record has none
+
+    Returns:
+        dict: weight -> text of the fields with this weight
+
+    """
+    xml_tree = get_parsed_xml(xml_string)
+    fields = {}
+    for weight, xpaths in _search_fields.items():
+        values = []
+        for xpath in xpaths:
+            for node in xpath(xml_tree):
+                value = node if isinstance(node, str) else node.text
+                if value and value.strip():
+                    values.append(value.strip())
+        fields[weight] = values
+    if not fields["A"] and title:
+        fields["A"] = [title]
+    fields["C"] = [
+        _path_separators.sub(" ", path).strip() for path in fields["C"]
+    ]
+    return {weight: " ".join(values) for weight, values in fields.items()}
+
+
+def update_search_document(data):
+    """Build the search document of a record from its current content
+
+    Args:
+        data: Data to index
+
+    """
+    config = get_search_config()
+    search_vector = None
+    for weight, text in get_search_fields(data.content, data.title).items():
+        vector = SearchVector(
+            Value(text, output_field=TextField()), weight=weight, config=config
+        )
+        search_vector = vector if search_vector is None else search_vector + vector
+    RecordSearchDocument.objects.update_or_create(
+        data_id=data.id, defaults={"search_vector": search_vector}
+    )
+
+
+def _get_search_query(text):
+    """Build the full-text query of the keywords of a search"""
+    return SearchQuery(text, search_type="websearch", config=get_search_config())
+
+
+def _get_text_search(query_dict):
+    """Get the keywords of a query ("$text" criteria, at the top level or in
+    "$and" sub-queries)
+
+    Args:
+        query_dict: JSON query
+
+    Returns:
+        str: keywords, or None if the query has no keywords
+
+    """
+    if not isinstance(query_dict, dict):
+        return None
+    text = query_dict.get("$text")
+    if isinstance(text, dict) and isinstance(text.get("$search"), str):
+        return text["$search"].strip() or None
+    for sub_query in query_dict.get("$and", []):
+        text = _get_text_search(sub_query)
+        if text:
+            return text
+    return None
+
+
+def _convert_text_search(func):
+    """Wrap core_main_app's conversion of JSON queries to Django queries, so
+    that keywords are matched against the search documents"""
+
+    @functools.wraps(func)
+    def wrapper(query_dict):
+        text = query_dict.get("$text") if isinstance(query_dict, dict) else None
+        if not isinstance(text, dict) or not isinstance(text.get("$search"), str):
+            return func(query_dict)
+
+        other_criteria = {
+            key: criteria for key, criteria in query_dict.items() if key != "$text"
+        }
+        query = func(other_criteria)
+        keywords = sanitize_value(text["$search"].strip())
+        if keywords:
+            documents = RecordSearchDocument.objects.filter(
+                search_vector=_get_search_query(keywords)
+            )
+            query &= Q(pk__in=documents.values("data_id"))
+        return query
+
+    return wrapper
+
+
+def _rank_text_search(func):
+    """Wrap core_main_app's execution of JSON queries, so that the results of
+    keyword searches in the default sort order are ordered by relevance"""
+    from core_main_app.settings import DATA_SORTING_FIELDS
+
+    @functools.wraps(func)
+    def wrapper(json_query, user, order_by_field=DATA_SORTING_FIELDS):
+        data_list = func(json_query, user, order_by_field)
+        text = _get_text_search(json_query)
+        # a sort order chosen by the visitor is kept
+        if text is None or list(order_by_field) != list(DATA_SORTING_FIELDS):
+            return data_list
+
+        rank = (
+            RecordSearchDocument.objects.filter(data_id=OuterRef("pk"))
+            .annotate(rank=SearchRank("search_vector", _get_search_query(text)))
+            .values("rank")[:1]
+        )
+        return data_list.annotate(nx_search_rank=Subquery(rank)).order_by(
+            "-nx_search_rank",
+            *[field.replace("+", "") for field in order_by_field],
+        )
+
+    return wrapper
+
+
+def install_fulltext_search():
+    """Run keyword searches on the search documents (see the module
+    docstring)"""
+    global _installed
+    if _installed:
+        return
+    require_postgresql(f'NX_KEYWORD_SEARCH_BACKEND = "{POSTGRES_BACKEND}"')
+    _installed = True
+
+    from core_main_app.components.data import api as data_api
+
+    wrap_convert_to_django(_convert_text_search)
+    data_api.execute_json_query = _rank_text_search(data_api.execute_json_query)
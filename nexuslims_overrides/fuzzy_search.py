@@ -0,0 +1,182 @@
+"""
+Fuzzy search on record names (PostgreSQL pg_trgm).
+
+Visitors often type partial or misspelled sample IDs, record titles or
+experimenter names, which keyword searches (exact words) then miss. With
+NX_FUZZY_SEARCH enabled, the title, sample names and experimenter names of
+each record are extracted when the record is saved (see
+nexuslims_overrides.models.RecordSearchName, which has a trigram GIN index),
+and are looked up by trigram word similarity:
+
+- by the ``fuzzy`` search operator (``fuzzy:<name>`` in the search box, see
+  migrations/0009_create_fuzzy_search_operator.py), which
+  install_fuzzy_search makes the query conversion of core_main_app answer
+  from the names (see nexuslims_overrides.query_conversion). Without fuzzy
+  search, the operator matches the names exactly.
+- by the suggestions of the search box (get_name_suggestions), which replace
+  those of core_explore_keyword_app (which run a keyword search over the
+  content of the records to extract words from them).
+
+Names are similar to a value when word_similarity(value, name) reaches the
+pg_trgm.word_similarity_threshold of the database (0.6 by default).
+Records saved before fuzzy search was enabled are indexed by the
+``backfill_search_documents`` management command.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import Max, Q
+from lxml import etree
+
+from nexuslims_overrides.models import RecordSearchName
+from nexuslims_overrides.query_conversion import (
+    filter_search_operator_queries,
+    require_postgresql,
+    wrap_convert_to_django,
+)
+from nexuslims_overrides.record_summary import EXPERIMENT_NAMESPACE
+from nexuslims_overrides.xml import get_parsed_xml
+
+FUZZY_OPERATOR_NAME = "fuzzy"
+# dot notations of the fuzzy search operator, in the order of _name_xpaths
+FUZZY_DOT_NOTATION_LIST = [
+    "Experiment.title",
+    "Experiment.sample.name",
+    "Experiment.summary.experimenter",
+]
+
+_namespaces = {"nx": EXPERIMENT_NAMESPACE}
+_name_xpaths = {
+    RecordSearchName.TITLE: etree.XPath(
+        "/nx:Experiment/nx:title", namespaces=_namespaces
+    ),
+    RecordSearchName.SAMPLE: etree.XPath(
+        "/nx:Experiment/nx:sample/nx:name", namespaces=_namespaces
+    ),
+    RecordSearchName.EXPERIMENTER: etree.XPath(
+        "/nx:Experiment/nx:summary/nx:experimenter", namespaces=_namespaces
+    ),
+}
+_max_name_length = RecordSearchName._meta.get_field("name").max_length
+
+# Whether the query conversion is wrapped (install_fuzzy_search is
+# idempotent)
+_installed = False
+
+
+def is_fuzzy_search_enabled():
+    """Check whether record names should be indexed and looked up by trigram
+    similarity
+
+    Returns:
+        bool: value of NX_FUZZY_SEARCH
+
+    """
+    return getattr(settings, "NX_FUZZY_SEARCH", False)
+
+
+def get_search_names(xml_string, title=""):
+    """Extract the names of a record
+
+    Args:
+        xml_string: content of the record
+        title: title of the data, used if the record has none
+
+    Returns:
+        list: distinct (RecordSearchName field, name) pairs
+
+    """
+    xml_tree = get_parsed_xml(xml_string)
+    names = []
+    for field, xpath in _name_xpaths.items():
+        for element in xpath(xml_tree):
+            if element.text and element.text.strip():
+                names.append((field, element.text.strip()[:_max_name_length]))
+    if title and not any(field == RecordSearchName.TITLE for field, _ in names):
+        names.append((RecordSearchName.TITLE, title[:_max_name_length]))
+    return list(dict.fromkeys(names))
+
+
+def update_search_names(data):
+    """Replace the names indexed for a record with those of its current
+    content
+
+    Args:
+        data: Data to index
+
+    """
+    names = get_search_names(data.content, data.title)
+    with transaction.atomic():
+        RecordSearchName.objects.filter(data_id=data.id).delete()
+        RecordSearchName.objects.bulk_create(
+            RecordSearchName(data_id=data.id, field=field, name=name)
+            for field, name in names
+        )
+
+
+def _get_fuzzy_filter(value):
+    """Build the Django query of the records with a name similar to a value
+
+    Args:
+        value: value of the fuzzy search operator
+
+    Returns:
+        Q: query, or None for regular expressions (matched on the content of
+        the records by core_main_app)
+
+    """
+    if not isinstance(value, str):
+        return None
+    names = RecordSearchName.objects.filter(name__trigram_word_similar=value)
+    return Q(pk__in=names.values("data_id"))
+
+
+def get_name_suggestions(term, user, limit=None):
+    """Get the names of the records a user can read that are similar to a
+    term, most similar first
+
+    Args:
+        term: term typed in the search box
+        user: user searching
+        limit: maximum number of names (default: NX_FUZZY_SUGGESTIONS_LIMIT)
+
+    Returns:
+        list: names
+
+    """
+    from core_main_app.components.data import api as data_api
+
+    if limit is None:
+        limit = getattr(settings, "NX_FUZZY_SUGGESTIONS_LIMIT", 10)
+    # records the user can read (the same access control as searches)
+    readable_data = data_api.execute_json_query({}, user).order_by().values("pk")
+    names = (
+        RecordSearchName.objects.filter(
+            data_id__in=readable_data, name__trigram_word_similar=term
+        )
+        .values("name")
+        .annotate(similarity=Max(TrigramWordSimilarity(term, "name")))
+        .order_by("-similarity", "name")
+    )
+    return [name["name"] for name in names[:limit]]
+
+
+def install_fuzzy_search():
+    """Look record names up by trigram similarity (see the module
+    docstring)"""
+    global _installed
+    if _installed:
+        return
+    require_postgresql("NX_FUZZY_SEARCH = True")
+    _installed = True
+
+    # django.contrib.postgres is not an installed app, so its trigram lookup
+    # is only registered on the indexed field
+    from django.contrib.postgres.lookups import TrigramWordSimilar
+
+    RecordSearchName._meta.get_field("name").register_lookup(TrigramWordSimilar)
+    wrap_convert_to_django(
+        lambda func: filter_search_operator_queries(
+            func, FUZZY_DOT_NOTATION_LIST, _get_fuzzy_filter
+        )
+    )
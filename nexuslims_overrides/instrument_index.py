@@ -0,0 +1,131 @@
+"""
+Instrument index.
+
+The instrument badges of the search results filter the results with the
+instrument-pid search operator (see migrations/0001_create_search_operators.py),
+which core_main_app turns into a comparison of a value inside the stored
+content of every record. The instrument PIDs of each record are instead
+extracted when the record is saved, into a table indexed on the PID (see
+nexuslims_overrides.models.RecordInstrument), and install_instrument_pid_filter
+makes the query conversion of core_main_app (see
+nexuslims_overrides.query_conversion) filter instrument-pid queries through
+that table.
+
+Records saved before the table existed are indexed by the
+``backfill_instrument_pids`` management command.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from lxml import etree
+
+from nexuslims_overrides.models import RecordInstrument
+from nexuslims_overrides.query_conversion import (
+    filter_search_operator_queries,
+    wrap_convert_to_django,
+)
+from nexuslims_overrides.record_summary import EXPERIMENT_NAMESPACE
+from nexuslims_overrides.xml import get_parsed_xml
+
+# dot notation of the instrument-pid search operator
+INSTRUMENT_PID_DOT_NOTATION = "Experiment.summary.instrument.@pid"
+
+_find_instrument_pids = etree.XPath(
+    "/nx:Experiment/nx:summary/nx:instrument/@pid",
+    namespaces={"nx": EXPERIMENT_NAMESPACE},
+)
+
+# Whether the query conversion is wrapped (install_instrument_pid_filter is
+# idempotent)
+_installed = False
+
+
+def is_instrument_index_enabled():
+    """Check whether instrument-pid queries should use the instrument index
+
+    Returns:
+        bool: value of NX_INSTRUMENT_PID_INDEX
+
+    """
+    return getattr(settings, "NX_INSTRUMENT_PID_INDEX", True)
+
+
+def get_instrument_pids(xml_string):
+    """Extract the instrument PIDs of a record
+
+    Args:
+        xml_string: content of the record
+
+    Returns:
+        list: distinct instrument PIDs, in document order
+
+    """
+    pids = _find_instrument_pids(get_parsed_xml(xml_string))
+    return list(dict.fromkeys(str(pid) for pid in pids if pid))
+
+
+def update_record_instruments(data):
+    """Replace the instrument PIDs indexed for a record with those of its
+    current content
+
+    Args:
+        data: Data to index
+
+    Returns:
+        list: instrument PIDs of the record
+
+    """
+    pids = get_instrument_pids(data.content)
+    with transaction.atomic():
+        RecordInstrument.objects.filter(data_id=data.id).exclude(
+            instrument_pid__in=pids
+        ).delete()
+        existing = set(
+            RecordInstrument.objects.filter(data_id=data.id).values_list(
+                "instrument_pid", flat=True
+            )
+        )
+        RecordInstrument.objects.bulk_create(
+            RecordInstrument(data_id=data.id, instrument_pid=pid)
+            for pid in pids
+            if pid not in existing
+        )
+    return pids
+
+
+def _get_instrument_pid_filter(value):
+    """Build the Django query of the records of an instrument, from the
+    instrument index
+
+    Args:
+        value: instrument PID, or regular expression matching PIDs
+
+    Returns:
+        Q: query
+
+    """
+    if isinstance(value, re.Pattern):
+        instruments = RecordInstrument.objects.filter(
+            instrument_pid__regex=value.pattern
+        )
+    else:
+        instruments = RecordInstrument.objects.filter(instrument_pid=value)
+    return Q(pk__in=instruments.values("data_id"))
+
+
+def install_instrument_pid_filter():
+    """Filter instrument-pid queries through the instrument index (see the
+    module docstring)"""
+    global _installed
+    if _installed or settings.MONGODB_INDEXING:
+        # Queries on MongoDB are not converted to Django queries
+        return
+    _installed = True
+
+    wrap_convert_to_django(
+        lambda func: filter_search_operator_queries(
+            func, [INSTRUMENT_PID_DOT_NOTATION], _get_instrument_pid_filter
+        )
+    )
@@ -0,0 +1,64 @@
+"""
+Index the instrument PIDs of every record, e.g. after the instrument index
+was added or enabled.
+
+Usage:
+    python manage.py backfill_instrument_pids
+"""
+from django.core.management.base import BaseCommand
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+
+from nexuslims_overrides.instrument_index import (
+    is_instrument_index_enabled,
+    update_record_instruments,
+)
+
+
+class Command(BaseCommand):
+    """Index the instrument PIDs of all records"""
+
+    help = (
+        "Extract the instrument PIDs of every record into the instrument "
+        "index, which filtering by instrument queries. Records are indexed "
+        "when they are saved, so this is only needed for the records saved "
+        "before the index was added or while it was disabled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=100,
+            help="Print progress every N records (default: 100)",
+        )
+
+    def handle(self, *args, **options):
+        if not is_instrument_index_enabled():
+            self.stderr.write(
+                "The instrument index is disabled "
+                "(NX_INSTRUMENT_PID_INDEX = False), nothing to do."
+            )
+            return
+
+        data_list = Data.objects.filter(template__format=Template.XSD).order_by(
+            "pk"
+        )
+        total = data_list.count()
+        self.stdout.write(f"Indexing the instruments of {total} records")
+
+        failed = 0
+        for count, data in enumerate(data_list.iterator(), start=1):
+            try:
+                update_record_instruments(data)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Could not index data {data.id}: {e}")
+            if count % options["progress_every"] == 0 or count == total:
+                self.stdout.write(f"  {count}/{total} records processed")
+
+        message = f"✓ Instruments of {total - failed} records indexed"
+        if failed:
+            message += f", {failed} failed"
+        self.stdout.write(self.style.SUCCESS(message))
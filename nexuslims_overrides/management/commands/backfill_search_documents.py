@@ -0,0 +1,78 @@
+"""
+Build the search indexes of every record (the full-text search documents and
+the fuzzy search names, for the ones enabled), e.g. after the PostgreSQL
+keyword search backend was selected or fuzzy search was enabled.
+
+Usage:
+    python manage.py backfill_search_documents
+"""
+from django.core.management.base import BaseCommand
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+
+from nexuslims_overrides.fulltext import (
+    is_fulltext_search_enabled,
+    update_search_document,
+)
+from nexuslims_overrides.fuzzy_search import (
+    is_fuzzy_search_enabled,
+    update_search_names,
+)
+
+
+class Command(BaseCommand):
+    """Build the search indexes of all records"""
+
+    help = (
+        "Build the full-text search document (with the PostgreSQL keyword "
+        "search backend) and the fuzzy search names (with NX_FUZZY_SEARCH) "
+        "of every record. They are built when records are saved, so this is "
+        "only needed for the records saved before the backend was selected "
+        "or fuzzy search was enabled, or after changing "
+        "NX_FULLTEXT_SEARCH_CONFIG."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=100,
+            help="Print progress every N records (default: 100)",
+        )
+
+    def handle(self, *args, **options):
+        updates = []
+        if is_fulltext_search_enabled():
+            updates.append(update_search_document)
+        if is_fuzzy_search_enabled():
+            updates.append(update_search_names)
+        if not updates:
+            self.stderr.write(
+                "Neither the full-text keyword search backend "
+                '(NX_KEYWORD_SEARCH_BACKEND = "postgres") nor fuzzy search '
+                "(NX_FUZZY_SEARCH = True) is enabled, nothing to do."
+            )
+            return
+
+        data_list = Data.objects.filter(template__format=Template.XSD).order_by(
+            "pk"
+        )
+        total = data_list.count()
+        self.stdout.write(f"Building the search indexes of {total} records")
+
+        failed = 0
+        for count, data in enumerate(data_list.iterator(), start=1):
+            try:
+                for update in updates:
+                    update(data)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Could not index data {data.id}: {e}")
+            if count % options["progress_every"] == 0 or count == total:
+                self.stdout.write(f"  {count}/{total} records processed")
+
+        message = f"✓ Search indexes of {total - failed} records built"
+        if failed:
+            message += f", {failed} failed"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,64 @@
+"""
+Pre-fill the rendered-HTML cache with the list view of every record.
+
+Usage:
+    python manage.py prefill_list_cache
+"""
+from django.core.management.base import BaseCommand
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+
+from nexuslims_overrides.prerender import get_data_detail_url
+from nexuslims_overrides.render_cache import is_render_cache_enabled
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    render_xml_as_html_list,
+)
+
+
+class Command(BaseCommand):
+    """Render the list view of all records into the rendered-HTML cache"""
+
+    help = (
+        "Render the search result (list) view of every record into the "
+        "rendered-HTML cache, so that search pages do not have to run the "
+        "list XSLT for records that were never displayed before."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=100,
+            help="Print progress every N records (default: 100)",
+        )
+
+    def handle(self, *args, **options):
+        if not is_render_cache_enabled():
+            self.stderr.write(
+                "The rendered-HTML cache is disabled "
+                "(NX_RENDER_CACHE_TIMEOUT = 0), nothing to do."
+            )
+            return
+
+        data_list = (
+            Data.objects.filter(template__format=Template.XSD)
+            .select_related("template")
+            .order_by("pk")
+        )
+        total = data_list.count()
+        self.stdout.write(f"Pre-filling list view cache for {total} records")
+
+        for count, data in enumerate(data_list.iterator(), start=1):
+            render_xml_as_html_list(
+                xml_content=data.content,
+                template_id=data.template.id,
+                template_hash=data.template.hash,
+                # Records that are linked through a PID get a different
+                # detail URL and will be rendered on first display instead
+                detail_url=get_data_detail_url(data),
+            )
+            if count % options["progress_every"] == 0 or count == total:
+                self.stdout.write(f"  {count}/{total} records processed")
+
+        self.stdout.write(self.style.SUCCESS("✓ List view cache pre-filled"))
@@ -0,0 +1,95 @@
+"""
+Profile the XSLT rendering of a record.
+
+Usage:
+    python manage.py profile_xslt <data_id> [--type detail|list|all]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core_main_app.components.data.models import Data
+
+from nexuslims_overrides.prerender import get_data_detail_url
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    RenderStrategy,
+    render_xml_as_html_detail,
+    render_xml_as_html_list,
+)
+from nexuslims_overrides.xml import get_content_hash
+
+
+class Command(BaseCommand):
+    """Report the time spent in each template of the stylesheets"""
+
+    help = (
+        "Render a record with lxml's XSLT profiler enabled and report, for "
+        "each template of the stylesheet, the number of calls and the self "
+        "time spent in it (excluding the templates it applies or calls). "
+        "Rendered-HTML caches are bypassed, and the detail view is rendered "
+        "with the full strategy, whatever the one of the record."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("data_id", help="ID of the record to render")
+        parser.add_argument(
+            "--type",
+            choices=["detail", "list", "all"],
+            default="detail",
+            help="Rendering to profile (default: detail)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            data = Data.objects.select_related("template").get(
+                pk=options["data_id"]
+            )
+        except (Data.DoesNotExist, ValueError):
+            raise CommandError(f"Record {options['data_id']} does not exist")
+
+        content = data.content
+        self.stdout.write(
+            f"Record {data.id} ({data.title}): {len(content.encode('utf-8'))} "
+            f"bytes, content hash {get_content_hash(content)[:16]}"
+        )
+
+        renderings = {
+            "detail": lambda: render_xml_as_html_detail(
+                xmlName=data.title,
+                data_id=data.id,
+                xml_content=content,
+                template_id=data.template.id,
+                template_hash=data.template.hash,
+                request=None,
+                # profile the full templates, also for the records whose page
+                # uses another strategy, without changing that strategy
+                render_strategy=RenderStrategy.full,
+                measure_render=False,
+            ),
+            "list": lambda: render_xml_as_html_list(
+                xml_content=content,
+                template_id=data.template.id,
+                template_hash=data.template.hash,
+                detail_url=get_data_detail_url(data),
+            ),
+        }
+        if options["type"] != "all":
+            renderings = {options["type"]: renderings[options["type"]]}
+
+        # the profile is printed by xsl_transform, make sure it runs
+        with override_settings(
+            NX_XSLT_PROFILE=True,
+            NX_RENDER_CACHE_TIMEOUT=0,
+            NX_PRERENDER_RECORDS=False,
+        ):
+            for xslt_type, render in renderings.items():
+                start = time.perf_counter()
+                html_string = render()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"✓ {xslt_type} view rendered in {elapsed * 1000:.1f} ms "
+                        f"({len(html_string.encode('utf-8'))} bytes)"
+                    )
+                )
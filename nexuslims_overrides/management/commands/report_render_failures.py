@@ -0,0 +1,100 @@
+"""
+Report the records that fail to render with the current stylesheets, with
+the lxml error log of each failure.
+
+Usage:
+    python manage.py report_render_failures [--render] [--ids ID [ID ...]]
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+
+from nexuslims_overrides.prerender import prerender_data
+from nexuslims_overrides.render_cache import (
+    get_error_log,
+    get_render_failure_timeout,
+)
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    get_data_render_failures,
+)
+
+
+class Command(BaseCommand):
+    """Report the records known to fail to render"""
+
+    help = (
+        "List the records whose detail or list view failed to render with the "
+        "current stylesheets (as remembered by the negative render cache, for "
+        "NX_RENDER_FAILURE_TIMEOUT seconds), with the lxml error log of each "
+        "failure. Use --render to render the records first, so that failures "
+        "that were not met recently are found too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--render",
+            action="store_true",
+            help="Pre-render the records first (records whose stored "
+            "renderings are current are skipped)",
+        )
+        parser.add_argument(
+            "--ids",
+            nargs="+",
+            type=int,
+            help="Only report these data ids (default: every record)",
+        )
+
+    def handle(self, *args, **options):
+        if not get_render_failure_timeout():
+            self.stderr.write(
+                "The negative render cache is disabled "
+                "(NX_RENDER_FAILURE_TIMEOUT = 0), no failures are known."
+            )
+            return
+
+        data_list = (
+            Data.objects.filter(template__format=Template.XSD)
+            .select_related("template")
+            .order_by("pk")
+        )
+        if options["ids"]:
+            data_list = data_list.filter(pk__in=options["ids"])
+
+        failing = 0
+        for data in data_list.iterator():
+            failures = {}
+            if options["render"]:
+                try:
+                    prerender_data(data)
+                except Exception as e:
+                    # e.g. the record cannot be parsed to compute its summary
+                    failures["pre-rendering"] = {
+                        "failed_at": timezone.now().isoformat(),
+                        "error": f"{type(e).__name__}: {e}",
+                        "error_log": get_error_log(e),
+                    }
+            failures.update(
+                (f"{xslt_type.lower()} view", failure)
+                for xslt_type, failure in get_data_render_failures(data).items()
+            )
+            if failures:
+                failing += 1
+                self._report_failures(data, failures)
+
+        if failing:
+            self.stdout.write(self.style.WARNING(f"{failing} failing records"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✓ No failing records"))
+
+    def _report_failures(self, data, failures):
+        """Print the failures of the views of a data"""
+        self.stdout.write(self.style.ERROR(f"Data {data.id} ({data.title}):"))
+        for name, failure in failures.items():
+            self.stdout.write(
+                f"  {name}, failed at {failure['failed_at']}: "
+                f"{failure['error']}"
+            )
+            for entry in failure["error_log"]:
+                self.stdout.write(f"    {entry}")
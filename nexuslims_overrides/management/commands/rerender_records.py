@@ -0,0 +1,129 @@
+"""
+Re-render the detail and list views of every record, e.g. after a stylesheet
+was changed with update-xslt.sh.
+
+Usage:
+    python manage.py rerender_records [--workers N] [--chunk-size N]
+    python manage.py rerender_records --celery
+    python manage.py rerender_records --status
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from nexuslims_overrides.prerender import (
+    format_rerender_progress,
+    get_rerender_progress,
+    rerender_all_data,
+)
+from nexuslims_overrides.render_cache import is_prerender_enabled
+from nexuslims_overrides.tasks import rerender_all_data_task
+
+
+class Command(BaseCommand):
+    """Re-render all records with the current stylesheets"""
+
+    help = (
+        "Render the detail and list views of every record with the current "
+        "stylesheets and store them, so that visitors do not have to wait "
+        "for records to be rendered on demand after a stylesheet change. "
+        "Records whose stored renderings are current are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "NX_RERENDER_WORKERS", None)
+            or os.cpu_count(),
+            help="Number of worker processes "
+            "(default: NX_RERENDER_WORKERS, or the number of CPUs)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=getattr(settings, "NX_RERENDER_CHUNK_SIZE", 50),
+            help="Number of records rendered (and stored) together "
+            "(default: NX_RERENDER_CHUNK_SIZE, or 50)",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Queue the re-rendering on the Celery workers instead",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Print the progress of the last re-rendering queued on the "
+            "Celery workers",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self._print_status()
+            return
+
+        if not is_prerender_enabled():
+            self.stderr.write(
+                "Record pre-rendering is disabled "
+                "(NX_PRERENDER_RECORDS = False), nothing to do."
+            )
+            return
+
+        if options["celery"]:
+            rerender_all_data_task.apply_async(
+                kwargs={"chunk_size": options["chunk_size"]}
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "✓ Re-rendering queued on Celery workers "
+                    "(see its progress with --status)"
+                )
+            )
+            return
+
+        self.stdout.write(
+            f"Re-rendering records with {options['workers']} workers "
+            f"(chunks of {options['chunk_size']})"
+        )
+        rendered, failed = rerender_all_data(
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            progress_callback=self._report_progress,
+        )
+
+        message = f"✓ {rendered} records re-rendered"
+        if failed:
+            message += f", {failed} failed (see logs)"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def _report_progress(self, processed, total, elapsed):
+        """Print the progress and throughput of the re-rendering"""
+        self.stdout.write(
+            "  " + format_rerender_progress(processed, total, elapsed)
+        )
+
+    def _print_status(self):
+        """Print the progress of the last re-rendering run by the Celery
+        workers"""
+        progress = get_rerender_progress()
+        if progress is None:
+            self.stdout.write("No re-rendering was queued on Celery workers")
+            return
+        if progress["finished"]:
+            message = (
+                f"✓ {progress['rendered']} records re-rendered in "
+                f"{progress['elapsed']:.0f}s ({progress['rate']:.1f} records/s)"
+            )
+            if progress["failed"]:
+                message += f", {progress['failed']} failed (see logs)"
+            self.stdout.write(self.style.SUCCESS(message))
+            return
+        self.stdout.write(
+            "Re-rendering in progress: "
+            + format_rerender_progress(
+                progress["processed"], progress["total"], progress["elapsed"]
+            )
+            + (f", {progress['failed']} failed" if progress["failed"] else "")
+        )
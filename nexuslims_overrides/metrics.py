@@ -0,0 +1,332 @@
+"""
+XSLT rendering metrics.
+
+Timings and sizes of the XSLT transformations (see xml.xsl_transform) are
+recorded in Prometheus-style histograms, labelled by stylesheet name and
+rendering type (list or detail), and exposed in the Prometheus text format
+by the metrics view (see views.metrics).
+
+Each process (gunicorn worker, Celery worker) records its observations in
+memory, and a background thread publishes its cumulative histograms in the
+shared Django cache selected by NX_RENDER_CACHE_ALIAS every
+NX_METRICS_PUBLISH_INTERVAL seconds. The metrics view adds up the histograms of every process, so that
+any worker scraped through a load balancer reports the same totals. The
+histograms of a process are kept for PROCESS_METRICS_TIMEOUT seconds after
+it last published them, so that the totals do not drop when a worker is
+restarted.
+"""
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = "nx:metrics"
+# key of the list of the keys the processes publish their histograms under
+METRICS_PROCESSES_KEY = f"{METRICS_KEY_PREFIX}:processes"
+# lifetime of the histograms published by a process, in seconds
+PROCESS_METRICS_TIMEOUT = 7 * 24 * 60 * 60
+
+# Upper bounds of the histogram buckets
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_BUCKETS = tuple(1024 * 4**exponent for exponent in range(10))
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# name -> (help text, bucket bounds)
+HISTOGRAMS = {
+    "nexuslims_xslt_xml_parse_seconds": (
+        "Time spent parsing the XML documents",
+        TIME_BUCKETS,
+    ),
+    "nexuslims_xslt_stylesheet_compile_seconds": (
+        "Time spent parsing and compiling the stylesheet (or getting it from "
+        "the compiled stylesheet cache)",
+        TIME_BUCKETS,
+    ),
+    "nexuslims_xslt_transform_seconds": (
+        "Time spent applying the stylesheet",
+        TIME_BUCKETS,
+    ),
+    "nexuslims_xslt_serialize_seconds": (
+        "Time spent serializing the output of the stylesheet",
+        TIME_BUCKETS,
+    ),
+    "nexuslims_xslt_input_bytes": (
+        "Size of the transformed XML documents",
+        SIZE_BUCKETS,
+    ),
+    "nexuslims_xslt_output_bytes": (
+        "Size of the output of the stylesheet",
+        SIZE_BUCKETS,
+    ),
+    "nexuslims_xslt_datasets": (
+        "Number of datasets in the transformed XML documents",
+        COUNT_BUCKETS,
+    ),
+}
+
+_metrics_lock = threading.Lock()
+# (histogram name, labels) -> [bucket counts..., sum]
+_histogram_values = {}
+# (pid, cache key) of the histograms of this process, see _get_process_key
+_process_key = None
+# whether values were recorded since the histograms were last published
+_unpublished = False
+# (pid, thread) publishing the histograms of this process
+_publisher = None
+# stylesheet hash -> stylesheet name (dropped with the stylesheets resolved by
+# the template tags, see clear_xslt_string_cache)
+_stylesheet_names = {}
+
+
+def is_metrics_enabled():
+    """Check whether XSLT metrics should be recorded
+
+    Returns:
+        bool: value of NX_XSLT_METRICS
+
+    """
+    return getattr(settings, "NX_XSLT_METRICS", True)
+
+
+def set_stylesheet_name(xslt_string, name):
+    """Record the name of a stylesheet, used to label its metrics
+
+    Args:
+        xslt_string: XSLT content
+        name: name of the stylesheet (e.g. "detail_stylesheet.xsl")
+
+    """
+    from nexuslims_overrides.xml import get_stylesheet_hash
+
+    _stylesheet_names[get_stylesheet_hash(xslt_string)] = name
+
+
+def get_stylesheet_name(xslt_string):
+    """Get the name of a stylesheet recorded with set_stylesheet_name
+
+    Args:
+        xslt_string: XSLT content
+
+    Returns:
+        str: name of the stylesheet, or "unknown"
+
+    """
+    from nexuslims_overrides.xml import get_stylesheet_hash
+
+    return _stylesheet_names.get(get_stylesheet_hash(xslt_string), "unknown")
+
+
+def clear_stylesheet_names():
+    """Drop the stylesheet names recorded by this process"""
+    _stylesheet_names.clear()
+
+
+def observe(name, value, stylesheet="unknown", xslt_type="unknown"):
+    """Record a value in a histogram
+
+    Args:
+        name: name of the histogram (see HISTOGRAMS)
+        value: observed value
+        stylesheet: name of the stylesheet
+        xslt_type: type of rendering (list or detail)
+
+    """
+    buckets = HISTOGRAMS[name][1]
+    key = (name, stylesheet, xslt_type.lower())
+    with _metrics_lock:
+        _get_process_key()
+        values = _histogram_values.get(key)
+        if values is None:
+            # one count per bucket, the +Inf bucket, and the sum
+            values = _histogram_values[key] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                values[index] += 1
+        values[-2] += 1
+        values[-1] += value
+        _start_publisher()
+
+
+def _get_process_key():
+    """Get the cache key of the histograms of this process, called with the
+    metrics lock held
+
+    A forked process (e.g. by rerender_records) gets a new key, and drops the
+    values it inherited, which its parent publishes.
+
+    Returns:
+        str: cache key
+
+    """
+    global _process_key
+    pid = os.getpid()
+    if _process_key is None or _process_key[0] != pid:
+        if _process_key is not None:
+            _histogram_values.clear()
+        # the pid alone could be reused by a later process of the same host
+        _process_key = (
+            pid,
+            f"{METRICS_KEY_PREFIX}:{socket.gethostname()}:{pid}:"
+            f"{uuid.uuid4().hex[:8]}",
+        )
+    return _process_key[1]
+
+
+def _start_publisher():
+    """Start the thread publishing the histograms of this process, if it is
+    not running, called with the metrics lock held"""
+    global _publisher, _unpublished
+    _unpublished = True
+    pid = os.getpid()
+    if _publisher is None or _publisher[0] != pid:
+        # threads are not inherited by forked processes
+        thread = threading.Thread(
+            target=_publish_periodically, name="nexuslims-metrics", daemon=True
+        )
+        _publisher = (pid, thread)
+        thread.start()
+
+
+def _publish_periodically():
+    """Publish the histograms of this process every
+    NX_METRICS_PUBLISH_INTERVAL seconds, when values were recorded"""
+    while True:
+        time.sleep(getattr(settings, "NX_METRICS_PUBLISH_INTERVAL", 10))
+        if _unpublished:
+            publish_metrics()
+
+
+def _get_metrics_cache():
+    """Return the Django cache the processes publish their histograms in
+
+    Returns:
+        BaseCache: the cache configured by NX_RENDER_CACHE_ALIAS
+
+    """
+    from nexuslims_overrides.render_cache import get_render_cache
+
+    return get_render_cache()
+
+
+def publish_metrics():
+    """Publish the histograms of this process in the shared cache, where
+    render_metrics adds them to those of the other processes"""
+    global _unpublished
+    with _metrics_lock:
+        process_key = _get_process_key()
+        snapshot = {key: list(values) for key, values in _histogram_values.items()}
+        _unpublished = False
+    try:
+        cache = _get_metrics_cache()
+        cache.set(process_key, snapshot, timeout=PROCESS_METRICS_TIMEOUT)
+        # Concurrent registrations may overwrite each other, a process that
+        # is missing registers again the next time it publishes
+        process_keys = cache.get(METRICS_PROCESSES_KEY) or []
+        if process_key not in process_keys:
+            cache.set(
+                METRICS_PROCESSES_KEY,
+                process_keys + [process_key],
+                timeout=PROCESS_METRICS_TIMEOUT,
+            )
+    except Exception as e:
+        # Never fail a render because the cache is unavailable
+        logger.warning(f"Could not publish XSLT metrics: {e}")
+
+
+def get_aggregated_metrics():
+    """Add up the histograms published by every process
+
+    Returns:
+        dict: (histogram name, labels) -> [bucket counts..., sum], or the
+        histograms of this process only if the cache is unavailable
+
+    """
+    publish_metrics()
+    try:
+        cache = _get_metrics_cache()
+        process_keys = cache.get(METRICS_PROCESSES_KEY) or []
+        snapshots = cache.get_many(process_keys)
+        # forget the processes whose histograms expired
+        if len(snapshots) < len(process_keys):
+            cache.set(
+                METRICS_PROCESSES_KEY,
+                [key for key in process_keys if key in snapshots],
+                timeout=PROCESS_METRICS_TIMEOUT,
+            )
+    except Exception as e:
+        logger.warning(f"Could not read the XSLT metrics of other processes: {e}")
+        with _metrics_lock:
+            snapshots = {None: dict(_histogram_values)}
+
+    totals = {}
+    for snapshot in snapshots.values():
+        for key, values in snapshot.items():
+            total = totals.get(key)
+            if total is None:
+                totals[key] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    total[index] += value
+    return totals
+
+
+def clear_metrics():
+    """Drop all the values recorded by this process"""
+    with _metrics_lock:
+        _histogram_values.clear()
+
+
+def _format_value(value):
+    """Format a number for the Prometheus text format"""
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    """Escape a label value for the Prometheus text format"""
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def render_metrics():
+    """Render the metrics of every process in the Prometheus text format
+
+    Returns:
+        str: exposition text
+
+    """
+    totals = get_aggregated_metrics()
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (series_name, stylesheet, xslt_type), values in sorted(totals.items()):
+            if series_name != name:
+                continue
+            labels = (
+                f'stylesheet="{_escape_label(stylesheet)}",'
+                f'type="{_escape_label(xslt_type)}"'
+            )
+            for bound, count in zip(buckets + (math.inf,), values[:-1]):
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{_format_value(float(bound))}"}} '
+                    f"{count}"
+                )
+            lines.append(f"{name}_sum{{{labels}}} {_format_value(values[-1])}")
+            lines.append(f"{name}_count{{{labels}}} {values[-2]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,48 @@
+# Generated migration for NexusLIMS stored record renderings
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0001_create_search_operators"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderedRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("xslt_type", models.CharField(max_length=20)),
+                (
+                    "cache_key",
+                    models.CharField(db_index=True, max_length=255),
+                ),
+                ("html", models.TextField()),
+                ("rendered_at", models.DateTimeField(auto_now=True)),
+                (
+                    "data",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core_main_app.data",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rendered record",
+                "unique_together": {("data", "xslt_type")},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated migration for NexusLIMS record summaries
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0002_renderedrecord"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordSummary",
+            fields=[
+                (
+                    "data",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core_main_app.data",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(db_index=True, max_length=64),
+                ),
+                ("root_path", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Record summary",
+                "verbose_name_plural": "Record summaries",
+            },
+        ),
+    ]
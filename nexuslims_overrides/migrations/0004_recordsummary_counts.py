@@ -0,0 +1,42 @@
+# Generated migration for the NexusLIMS record summary counts
+
+from django.db import migrations, models
+
+
+def delete_record_summaries(apps, schema_editor):
+    """Drop the existing summaries, which lack the new values: they are
+    computed again when the records are rendered"""
+    apps.get_model("nexuslims_overrides", "RecordSummary").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nexuslims_overrides", "0003_recordsummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recordsummary",
+            name="dataset_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="recordsummary",
+            name="activity_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="recordsummary",
+            name="extension_counts",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="recordsummary",
+            name="instrument_pid",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(
+            delete_record_summaries, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated migration for the NexusLIMS record render times
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nexuslims_overrides", "0004_recordsummary_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recordsummary",
+            name="render_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
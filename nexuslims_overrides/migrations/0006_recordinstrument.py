@@ -0,0 +1,45 @@
+# Generated migration for the NexusLIMS record instrument index
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0005_recordsummary_render_seconds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordInstrument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "instrument_pid",
+                    models.CharField(db_index=True, max_length=255),
+                ),
+                (
+                    "data",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core_main_app.data",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Record instrument",
+                "unique_together": {("data", "instrument_pid")},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated migration for the NexusLIMS full-text search documents
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0006_recordinstrument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordSearchDocument",
+            fields=[
+                (
+                    "data",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core_main_app.data",
+                    ),
+                ),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        null=True
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Record search document",
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="nx_search_vector_gin"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated migration for the NexusLIMS fuzzy search names
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0007_recordsearchdocument"),
+    ]
+
+    operations = [
+        # pg_trgm provides the trigram index operator class (this is a no-op
+        # on other databases)
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="RecordSearchName",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "field",
+                    models.CharField(
+                        choices=[
+                            ("title", "Title"),
+                            ("sample", "Sample"),
+                            ("experimenter", "Experimenter"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "data",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core_main_app.data",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Record search name",
+                "unique_together": {("data", "field", "name")},
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["name"],
+                        name="nx_search_name_trgm",
+                        opclasses=["gin_trgm_ops"],
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated migration for the NexusLIMS fuzzy search operator
+
+from django.db import migrations
+
+
+def create_fuzzy_operator(apps, schema_editor):
+    """Create the fuzzy search operator for approximate name lookups."""
+    SearchOperator = apps.get_model('core_explore_keyword_app', 'SearchOperator')
+
+    if SearchOperator.objects.filter(name='fuzzy').exists():
+        print("  → Search operator 'fuzzy' already exists, skipping...")
+        return
+
+    # Must match FUZZY_DOT_NOTATION_LIST in nexuslims_overrides/fuzzy_search.py
+    SearchOperator.objects.create(
+        name='fuzzy',
+        xpath_list=[
+            '/nx:Experiment/nx:title',
+            '/nx:Experiment/nx:sample/nx:name',
+            '/nx:Experiment/nx:summary/nx:experimenter',
+        ],
+        dot_notation_list=[
+            'Experiment.title',
+            'Experiment.sample.name',
+            'Experiment.summary.experimenter',
+        ],
+    )
+    print("  ✓ Created search operator 'fuzzy'")
+
+
+def remove_fuzzy_operator(apps, schema_editor):
+    """Remove the fuzzy search operator (for migration rollback)."""
+    SearchOperator = apps.get_model('core_explore_keyword_app', 'SearchOperator')
+
+    deleted_count, _ = SearchOperator.objects.filter(name='fuzzy').delete()
+
+    if deleted_count > 0:
+        print("  ✓ Removed search operator 'fuzzy'")
+    else:
+        print("  → Search operator 'fuzzy' not found, nothing to remove")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nexuslims_overrides", "0008_recordsearchname"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_fuzzy_operator,
+            reverse_code=remove_fuzzy_operator
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated migration for the NexusLIMS staged stylesheet changes
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core_main_app", "0013_file_history"),
+        ("nexuslims_overrides", "0009_create_fuzzy_search_operator"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderedrecord",
+            name="stylesheet_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name="renderedrecord",
+            unique_together={("data", "xslt_type", "stylesheet_hash")},
+        ),
+        migrations.CreateModel(
+            name="PublishedStylesheet",
+            fields=[
+                (
+                    "xsl_transformation",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core_main_app.xsltransformation",
+                    ),
+                ),
+                ("content", models.TextField()),
+                ("stylesheet_hash", models.CharField(max_length=64)),
+                ("held_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Published stylesheet",
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated migration for the NexusLIMS record summary root paths
+
+from django.db import migrations
+
+
+def delete_relative_root_path_summaries(apps, schema_editor):
+    """Drop the summaries whose root path is relative, which may not hold
+    every location of their record: they are computed again when the
+    records are rendered"""
+    apps.get_model("nexuslims_overrides", "RecordSummary").objects.exclude(
+        root_path__startswith="/"
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nexuslims_overrides", "0010_publishedstylesheet"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_relative_root_path_summaries, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,246 @@
+"""
+NexusLIMS models.
+
+These models store NexusLIMS-specific data alongside the core MDCS models.
+"""
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.xsl_transformation.models import (
+    XslTransformation,
+)
+
+
+class RenderedRecord(models.Model):
+    """
+    Stored XSLT rendering (list or detail view) of a record.
+
+    Renderings are produced ahead of time (see nexuslims_overrides.tasks) and
+    identified by the same key as the rendered-HTML cache, which encodes the
+    record version, the stylesheet and the XSLT parameters. A stored rendering
+    is only served while its key matches the one computed for a request.
+
+    A record has one rendering of each type per stylesheet: while a
+    stylesheet change is staged (see PublishedStylesheet), the renderings
+    made with the published stylesheet are kept alongside the new ones.
+    """
+
+    data = models.ForeignKey(
+        Data, on_delete=models.CASCADE, related_name="+"
+    )
+    xslt_type = models.CharField(max_length=20)
+    # hash of the stylesheet content (see xml.get_stylesheet_hash)
+    stylesheet_hash = models.CharField(max_length=64, blank=True)
+    cache_key = models.CharField(max_length=255, db_index=True)
+    html = models.TextField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Rendered record"
+        unique_together = [("data", "xslt_type", "stylesheet_hash")]
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"{self.xslt_type} rendering of data {self.data_id}"
+
+
+class PublishedStylesheet(models.Model):
+    """
+    Content of an XSLT that pages keep rendering with while a change to it is
+    staged (see nexuslims_overrides.render_cache.hold_published_stylesheet).
+
+    It is the content the XSLT had before the change, and is released once
+    every record is pre-rendered with the new content, so that visitors
+    switch from the old renderings to the new ones at once.
+    """
+
+    xsl_transformation = models.OneToOneField(
+        XslTransformation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+    )
+    content = models.TextField()
+    # hash of the content (see xml.get_stylesheet_hash)
+    stylesheet_hash = models.CharField(max_length=64)
+    held_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Published stylesheet"
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"Published content of XSLT {self.xsl_transformation_id}"
+
+
+class RecordSummary(models.Model):
+    """
+    Values derived from the content of a record, computed once per version of
+    the record (see nexuslims_overrides.record_summary) rather than by the
+    stylesheets on every render. They also give a cheap overview of the
+    records, e.g. for statistics.
+
+    A summary is only used while its content hash matches the content of the
+    record.
+    """
+
+    data = models.OneToOneField(
+        Data, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    content_hash = models.CharField(max_length=64, db_index=True)
+    root_path = models.TextField(blank=True)
+    dataset_count = models.PositiveIntegerField(default=0)
+    activity_count = models.PositiveIntegerField(default=0)
+    # file extension -> number of datasets
+    extension_counts = models.JSONField(default=dict)
+    instrument_pid = models.CharField(max_length=255, blank=True)
+    # duration of the last full rendering of the detail view, in seconds
+    # (see select_render_strategy in templatetags/nexuslims_xsl_transform.py)
+    render_seconds = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Record summary"
+        verbose_name_plural = "Record summaries"
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"Summary of data {self.data_id}"
+
+
+class RecordInstrument(models.Model):
+    """
+    Instrument PID of a record (a record may list several instruments).
+
+    Filtering search results by instrument (the instrument-pid search
+    operator, used by the instrument badges) would otherwise compare a value
+    inside the stored content of every record. The PIDs are extracted when a
+    record is saved (see nexuslims_overrides.instrument_index) into this
+    table, whose index the filter uses instead.
+    """
+
+    data = models.ForeignKey(
+        Data, on_delete=models.CASCADE, related_name="+"
+    )
+    instrument_pid = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Record instrument"
+        unique_together = [("data", "instrument_pid")]
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"Instrument {self.instrument_pid} of data {self.data_id}"
+
+
+class RecordSearchDocument(models.Model):
+    """
+    Full-text search document of a record, used by keyword searches when the
+    PostgreSQL full-text backend is selected (see
+    nexuslims_overrides.fulltext).
+
+    The document only holds the fields visitors search for (title,
+    experimenters, samples, instruments and dataset paths), weighted by
+    importance, and is built when the record is saved.
+    """
+
+    data = models.OneToOneField(
+        Data, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    search_vector = SearchVectorField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Record search document"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="nx_search_vector_gin"),
+        ]
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"Search document of data {self.data_id}"
+
+
+class RecordSearchName(models.Model):
+    """
+    Name by which a record can be looked up approximately: its title, or the
+    name of one of its samples or experimenters.
+
+    The names are extracted when a record is saved, with fuzzy search
+    enabled (see nexuslims_overrides.fuzzy_search), and have a trigram index
+    so that misspelled or partial names still find them.
+    """
+
+    TITLE = "title"
+    SAMPLE = "sample"
+    EXPERIMENTER = "experimenter"
+    FIELD_CHOICES = [
+        (TITLE, "Title"),
+        (SAMPLE, "Sample"),
+        (EXPERIMENTER, "Experimenter"),
+    ]
+
+    data = models.ForeignKey(
+        Data, on_delete=models.CASCADE, related_name="+"
+    )
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        """Meta"""
+
+        verbose_name = "Record search name"
+        unique_together = [("data", "field", "name")]
+        indexes = [
+            GinIndex(
+                fields=["name"],
+                name="nx_search_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        """String representation of an object.
+
+        Returns:
+            String representation
+
+        """
+        return f"{self.get_field_display()} {self.name} of data {self.data_id}"
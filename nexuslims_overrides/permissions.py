@@ -0,0 +1,97 @@
+"""
+Batched data permission lookup.
+
+Search result pages show the edit and open buttons of the records the user
+can write. core_main_app's data permission endpoint checks one record at a
+time (fetching it, and the user's workspaces, for each record), so a page of
+results used to send one request per record. get_data_write_permissions
+answers for a whole page at once: the records are fetched in a single query,
+and the workspaces the user can read and write are looked up once.
+
+The rules are those the endpoint applies to each record
+(check_can_read_document, then check_can_write, from
+core_main_app.access_control.api).
+"""
+from core_main_app.access_control.api import has_perm_publish
+from core_main_app.access_control.exceptions import AccessControlError
+from core_main_app.components.data.models import Data
+from core_main_app.components.workspace import api as workspace_api
+from core_main_app.permissions import rights
+
+
+def _can_publish_data(user):
+    """Check whether a user can write records of their own in a public
+    workspace (see check_can_write)"""
+    try:
+        has_perm_publish(user, rights.PUBLISH_DATA)
+        return True
+    except AccessControlError:
+        return False
+
+
+def get_data_write_permissions(data_ids, user):
+    """Check whether a user can write each data of a list
+
+    Args:
+        data_ids: ids of the data, as strings
+        user: user to check the permissions of
+
+    Returns:
+        dict: data id -> True if the user can read and write the data. Ids
+        that are not valid, or of data that do not exist, are False
+
+    """
+    permissions = {data_id: False for data_id in data_ids}
+    if user is None or user.is_anonymous:
+        return permissions
+
+    pks = {data_id: int(data_id) for data_id in data_ids if str(data_id).isdigit()}
+    documents = {
+        pk: (user_id, workspace_id, workspace_is_public)
+        for pk, user_id, workspace_id, workspace_is_public in Data.objects.filter(
+            pk__in=pks.values()
+        ).values_list("pk", "user_id", "workspace_id", "workspace__is_public")
+    }
+    if user.is_superuser:
+        for data_id, pk in pks.items():
+            permissions[data_id] = pk in documents
+        return permissions
+
+    user_id = str(user.id)
+    workspace_ids = {
+        workspace_id for _, workspace_id, _ in documents.values() if workspace_id
+    }
+    readable_workspaces = writable_workspaces = set()
+    if any(owner != user_id for owner, _, _ in documents.values()):
+        readable_workspaces = set(
+            workspace_api.get_all_workspaces_with_read_access_by_user(user)
+            .filter(pk__in=workspace_ids)
+            .values_list("pk", flat=True)
+        )
+    if workspace_ids:
+        writable_workspaces = set(
+            workspace_api.get_all_workspaces_with_write_access_by_user(user)
+            .filter(pk__in=workspace_ids)
+            .values_list("pk", flat=True)
+        )
+    can_publish = None
+
+    for data_id, pk in pks.items():
+        if pk not in documents:
+            continue
+        owner, workspace_id, workspace_is_public = documents[pk]
+        is_owner = owner == user_id
+        # check_can_read_document
+        if not is_owner and workspace_id not in readable_workspaces:
+            continue
+        # check_can_write
+        if workspace_id is not None:
+            if workspace_is_public and is_owner:
+                if can_publish is None:
+                    can_publish = _can_publish_data(user)
+                if not can_publish:
+                    continue
+            elif workspace_id not in writable_workspaces:
+                continue
+        permissions[data_id] = True
+    return permissions
@@ -0,0 +1,377 @@
+"""
+Pre-rendering of records.
+
+The detail and list views of a record are rendered when the record is saved
+(see the post_save handler in signals.py and tasks.prerender_data_task) and
+stored in the database, so that the first visitor of a record, or of a search
+page listing it, does not pay for the XSLT transformation.
+
+Pages look the stored renderings up by the same key as the rendered-HTML
+cache (see render_cache.py): a rendering made with another stylesheet or with
+other XSLT parameters is simply ignored, and the record is rendered on demand.
+
+A stylesheet change changes every key at once, so changes to the content of
+an XSLT are staged (see render_cache.hold_published_stylesheet): pages keep
+rendering with the previous (published) content, and serving the renderings
+stored for it, while rerender_all_data pre-renders the whole repository with
+the new content next to them. Once every record is pre-rendered, the
+published content is released in a single transaction, and pages switch to
+the new renderings together rather than rendering every record on demand.
+"""
+import logging
+import multiprocessing
+import time
+import uuid
+
+from django.db import connections, transaction
+from django.urls import reverse
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+
+from nexuslims_overrides.record_summary import get_record_summary
+from nexuslims_overrides.render_cache import (
+    get_render_cache,
+    get_stylesheet_hashes,
+    release_published_stylesheets,
+)
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    clear_xslt_string_cache,
+    render_xml_as_html_detail,
+    render_xml_as_html_list,
+)
+
+logger = logging.getLogger(__name__)
+
+RERENDER_PROGRESS_KEY_PREFIX = "nx:rerender-progress"
+# the progress of a re-rendering is kept for a week after it was last updated
+RERENDER_PROGRESS_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def get_data_detail_url(data):
+    """Get the detail URL of a data, as built by core_explore_common_app for
+    local search results (it is part of the key of list renderings)
+
+    Args:
+        data: Data
+
+    Returns:
+        str: URL of the data detail page
+
+    """
+    return f"{reverse('core_main_app_data_detail')}?id={data.id}"
+
+
+def prerender_data(data, staged=False):
+    """Render the detail and list views of a data and store them, along with
+    the record summary
+
+    The XSLT parameters are the same as the ones passed by the data detail
+    page and the search result pages, so that the stored renderings are found
+    by these pages, with the rendering strategy the detail page selects.
+    Renderings already stored for the current version of the data and
+    stylesheets are not redone.
+
+    Args:
+        data: Data, with an XSD template
+        staged: If True, render with the current content of the stylesheets
+            rather than the published one of those whose change is staged
+
+    Raises:
+        CoreError: if a view of the data fails to render (or is known to
+            fail, see report_render_failures)
+
+    """
+    logger.debug(f"Pre-rendering data {data.id}")
+    get_record_summary(data.content, data_id=data.id)
+    detail_kwargs = dict(
+        xmlName=data.title,
+        data_id=data.id,
+        last_modification_date=data.last_modification_date,
+        xml_content=data.content,
+        template_id=data.template.id,
+        template_hash=data.template.hash,
+        # the detail page passes the request, which adds the permission URL
+        request=None,
+        prerender_data_id=data.id,
+        staged_stylesheet=staged,
+    )
+    render_xml_as_html_detail(**detail_kwargs)
+    # A full rendering stores its duration, which can select another
+    # rendering strategy for the page (e.g. lazy), and the strategy is part
+    # of the key of the rendering: render the page again with the strategy
+    # page views now select, so that they find it. Nothing is rendered when
+    # the strategy is unchanged, since the rendering is already stored.
+    render_xml_as_html_detail(**detail_kwargs)
+    render_xml_as_html_list(
+        xml_content=data.content,
+        template_id=data.template.id,
+        template_hash=data.template.hash,
+        detail_url=get_data_detail_url(data),
+        prerender_data_id=data.id,
+        staged_stylesheet=staged,
+    )
+
+
+def get_prerendered_data_chunks(chunk_size):
+    """Split the ids of the data that can be pre-rendered in chunks
+
+    Args:
+        chunk_size: maximum number of ids per chunk
+
+    Returns:
+        list: lists of ids of the data with an XSD template, in id order
+
+    """
+    data_ids = list(
+        Data.objects.filter(template__format=Template.XSD)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    return [
+        data_ids[start : start + chunk_size]
+        for start in range(0, len(data_ids), chunk_size)
+    ]
+
+
+def prerender_data_chunk(data_ids):
+    """Pre-render a chunk of data with the current content of the
+    stylesheets (including those whose change is staged)
+
+    The renderings of the chunk are stored in a single transaction. A data
+    that cannot be rendered (including one known to fail, see
+    report_render_failures) is logged, counted as failed and skipped.
+
+    Args:
+        data_ids: ids of the data to render
+
+    Returns:
+        tuple: number of data rendered, number of data that failed
+
+    """
+    rendered = failed = 0
+    # the stylesheets resolved by a long-lived worker may predate the change
+    # being pre-rendered (they are only checked periodically)
+    clear_xslt_string_cache()
+    data_list = Data.objects.filter(pk__in=data_ids).select_related("template")
+    with transaction.atomic():
+        for data in data_list:
+            try:
+                with transaction.atomic():
+                    prerender_data(data, staged=True)
+                rendered += 1
+            except Exception as e:
+                logger.warning(f"Could not pre-render data {data.id}: {e}")
+                failed += 1
+    return rendered, failed
+
+
+def rerender_all_data(workers=1, chunk_size=50, progress_callback=None):
+    """Pre-render every data again, e.g. after a stylesheet was changed
+
+    The data are split in chunks, rendered by a pool of worker processes.
+    Renderings already stored for the current stylesheets are kept. Once
+    every data is rendered, the staged stylesheet changes are released (see
+    render_cache.release_published_stylesheets).
+
+    Args:
+        workers: number of worker processes (1 renders in this process)
+        chunk_size: number of data rendered per chunk
+        progress_callback: called after each chunk with the number of data
+            processed so far, the total number of data, and the number of
+            seconds elapsed
+
+    Returns:
+        tuple: number of data rendered, number of data that failed
+
+    """
+    rendered_hashes = get_stylesheet_hashes()
+    chunks = get_prerendered_data_chunks(chunk_size)
+    total = sum(len(chunk) for chunk in chunks)
+    rendered = failed = 0
+    start_time = time.monotonic()
+
+    def _report(chunk_rendered, chunk_failed):
+        nonlocal rendered, failed
+        rendered += chunk_rendered
+        failed += chunk_failed
+        if progress_callback:
+            progress_callback(
+                rendered + failed, total, time.monotonic() - start_time
+            )
+
+    if workers <= 1:
+        for chunk in chunks:
+            _report(*prerender_data_chunk(chunk))
+    else:
+        # forked workers must not share the database connections of this
+        # process, close them so that each worker opens its own
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for result in pool.imap_unordered(prerender_data_chunk, chunks):
+                _report(*result)
+
+    publish_staged_stylesheets(rendered_hashes)
+    return rendered, failed
+
+
+def publish_staged_stylesheets(rendered_hashes):
+    """Switch the pages to the stylesheets every data was pre-rendered with
+
+    Args:
+        rendered_hashes: XslTransformation id -> hash of the content the data
+            were pre-rendered with (see render_cache.get_stylesheet_hashes),
+            taken before the pre-rendering started
+
+    Returns:
+        int: number of staged stylesheet changes released
+
+    """
+    released = release_published_stylesheets(rendered_hashes)
+    if released:
+        clear_xslt_string_cache()
+        logger.info(f"Published {released} staged stylesheet changes")
+    return released
+
+
+def format_rerender_progress(processed, total, elapsed):
+    """Describe the progress and throughput of a re-rendering
+
+    Args:
+        processed: number of data processed so far
+        total: total number of data
+        elapsed: number of seconds elapsed
+
+    Returns:
+        str: description
+
+    """
+    rate = processed / elapsed if elapsed else 0
+    remaining = (total - processed) / rate if rate else 0
+    return (
+        f"{processed}/{total} records processed "
+        f"({rate:.1f} records/s, ~{remaining:.0f}s remaining)"
+    )
+
+
+def start_rerender_progress(total):
+    """Record the start of a re-rendering run by the Celery workers, whose
+    chunks report their progress with add_rerender_progress
+
+    Args:
+        total: number of data to render
+
+    Returns:
+        str: id of the run
+
+    """
+    run_id = uuid.uuid4().hex
+    cache = get_render_cache()
+    try:
+        cache.set_many(
+            {
+                f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}": {
+                    "total": total,
+                    "started_at": time.time(),
+                    "finished_at": None,
+                },
+                f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}:rendered": 0,
+                f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}:failed": 0,
+                f"{RERENDER_PROGRESS_KEY_PREFIX}:latest": run_id,
+            },
+            timeout=RERENDER_PROGRESS_TIMEOUT,
+        )
+    except Exception as e:
+        logger.warning(f"Could not store re-rendering progress: {e}")
+    return run_id
+
+
+def add_rerender_progress(run_id, rendered, failed):
+    """Add the data rendered by a chunk to the progress of a re-rendering run
+
+    The counters are incremented in the cache, since the chunks are
+    rendered concurrently.
+
+    Args:
+        run_id: id of the run (see start_rerender_progress)
+        rendered: number of data rendered by the chunk
+        failed: number of data of the chunk that failed
+
+    Returns:
+        dict: progress of the run (see get_rerender_progress), or None if it
+        is not known
+
+    """
+    cache = get_render_cache()
+    try:
+        for name, count in (("rendered", rendered), ("failed", failed)):
+            if count:
+                cache.incr(f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}:{name}", count)
+    except Exception as e:
+        logger.warning(f"Could not update re-rendering progress: {e}")
+    return get_rerender_progress(run_id)
+
+
+def finish_rerender_progress(run_id):
+    """Record the end of a re-rendering run
+
+    Args:
+        run_id: id of the run (see start_rerender_progress)
+
+    Returns:
+        dict: progress of the run (see get_rerender_progress), or None if it
+        is not known
+
+    """
+    key = f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}"
+    cache = get_render_cache()
+    try:
+        run = cache.get(key)
+        if run is not None:
+            run["finished_at"] = time.time()
+            cache.set(key, run, timeout=RERENDER_PROGRESS_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Could not store re-rendering progress: {e}")
+    return get_rerender_progress(run_id)
+
+
+def get_rerender_progress(run_id=None):
+    """Get the progress of a re-rendering run by the Celery workers
+
+    Args:
+        run_id: id of the run (default: the last run started)
+
+    Returns:
+        dict: total number of data, numbers of data rendered, failed and
+        processed, seconds elapsed (until the end of the run, if finished),
+        records per second and whether the run is finished, or None if the
+        run is not known
+
+    """
+    cache = get_render_cache()
+    try:
+        if run_id is None:
+            run_id = cache.get(f"{RERENDER_PROGRESS_KEY_PREFIX}:latest")
+            if run_id is None:
+                return None
+        key = f"{RERENDER_PROGRESS_KEY_PREFIX}:{run_id}"
+        values = cache.get_many([key, f"{key}:rendered", f"{key}:failed"])
+    except Exception as e:
+        logger.warning(f"Could not read re-rendering progress: {e}")
+        return None
+    run = values.get(key)
+    if run is None:
+        return None
+    rendered = values.get(f"{key}:rendered", 0)
+    failed = values.get(f"{key}:failed", 0)
+    elapsed = (run["finished_at"] or time.time()) - run["started_at"]
+    return {
+        "run_id": run_id,
+        "total": run["total"],
+        "rendered": rendered,
+        "failed": failed,
+        "processed": rendered + failed,
+        "elapsed": elapsed,
+        "rate": (rendered + failed) / elapsed if elapsed else 0,
+        "finished": run["finished_at"] is not None,
+    }
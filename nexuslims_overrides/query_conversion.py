@@ -0,0 +1,133 @@
+"""
+Extension of the conversion of JSON queries to Django queries.
+
+core_main_app converts the JSON (MongoDB-like) queries built by the search
+apps to Django queries on the stored content of the records
+(core_main_app.utils.query.mongo.prepare.convert_to_django). NexusLIMS
+answers some criteria from its own indexed tables instead (see
+nexuslims_overrides.instrument_index, nexuslims_overrides.fulltext and
+nexuslims_overrides.fuzzy_search), by wrapping that conversion with
+wrap_convert_to_django.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from core_main_app.commons.constants import DATA_JSON_FIELD
+
+
+def wrap_convert_to_django(wrap):
+    """Wrap core_main_app's conversion of JSON queries to Django queries
+
+    Args:
+        wrap: function taking the conversion function and returning the
+            function to use instead
+
+    """
+    from core_main_app.components.data import api as data_api
+    from core_main_app.utils.query.mongo import prepare
+
+    convert_to_django = wrap(prepare.convert_to_django)
+    # prepare.convert_to_django converts the sub-queries of "$and" and "$or"
+    # queries through the module attribute
+    prepare.convert_to_django = convert_to_django
+    data_api.convert_to_django = convert_to_django
+
+
+def require_postgresql(feature):
+    """Check that the records are queried in PostgreSQL, for features using
+    its indexes
+
+    Args:
+        feature: description of the feature (e.g. the setting enabling it)
+
+    Raises:
+        ImproperlyConfigured: if the database is not PostgreSQL, or if the
+            records are queried in MongoDB
+
+    """
+    if settings.MONGODB_INDEXING or connection.vendor != "postgresql":
+        raise ImproperlyConfigured(
+            f"{feature} requires the PostgreSQL database backend "
+            "(and MONGODB_INDEXING = False)"
+        )
+
+
+def get_search_operator_value(sub_queries, dot_notation_list):
+    """Get the value filtered by a search operator query
+
+    build_search_operator_query produces
+    ``{"$or": [{path: value}, ..., {path + ".#text": value}, ...]}``, for each
+    path of the dot notation list of the operator, prefixed with the data JSON
+    field once the query is prepared for execution.
+
+    Args:
+        sub_queries: sub-queries of a "$or" query
+        dot_notation_list: dot notation list of the search operator
+
+    Returns:
+        str or re.Pattern: value filtered, or None if the sub-queries are not
+        those of a query with the search operator
+
+    """
+    if not isinstance(sub_queries, list) or not sub_queries:
+        return None
+    paths = {}
+    for sub_query in sub_queries:
+        if not isinstance(sub_query, dict) or len(sub_query) != 1:
+            return None
+        path, value = next(iter(sub_query.items()))
+        if not isinstance(value, (str, re.Pattern)):
+            return None
+        paths[path] = value
+    values = set(paths.values())
+    if len(values) != 1:
+        return None
+    for root in ("", f"{DATA_JSON_FIELD}."):
+        expected = {
+            f"{root}{dot_notation}{suffix}"
+            for dot_notation in dot_notation_list
+            for suffix in ("", ".#text")
+        }
+        if set(paths) == expected:
+            return values.pop()
+    return None
+
+
+def filter_search_operator_queries(func, dot_notation_list, get_filter):
+    """Wrap the conversion of JSON queries to Django queries, so that the
+    queries of a search operator are converted by a function of their value
+
+    Args:
+        func: conversion function
+        dot_notation_list: dot notation list of the search operator
+        get_filter: function returning the Django query (Q) of a value, or
+            None to let func convert the query
+
+    Returns:
+        function: conversion function
+
+    """
+
+    @functools.wraps(func)
+    def wrapper(query_dict):
+        value = None
+        if isinstance(query_dict, dict):
+            value = get_search_operator_value(
+                query_dict.get("$or"), dot_notation_list
+            )
+        query = get_filter(value) if value is not None else None
+        if query is None:
+            return func(query_dict)
+
+        other_criteria = {
+            key: criteria for key, criteria in query_dict.items() if key != "$or"
+        }
+        if other_criteria:
+            query &= func(other_criteria)
+        return query
+
+    return wrapper
@@ -0,0 +1,278 @@
+"""
+Record summaries.
+
+Some values displayed by the stylesheets are derived from the whole record,
+such as the number of datasets, the file extensions, or the root path of the
+file listing, which the detail stylesheet would otherwise compute on every
+render by comparing every dataset location with every prefix of the first
+one. These values are computed in Python, stored with the record (see
+nexuslims_overrides.models.RecordSummary) and passed to the stylesheets as
+XSLT parameters.
+
+A summary is computed the first time a version of a record is rendered,
+which, with record pre-rendering enabled, is when the record is saved.
+Search results do not know the id of their data, so list renderings look
+the summaries up by content hash, and do not store the ones they compute.
+"""
+import logging
+from collections import Counter
+
+from lxml import etree
+
+from nexuslims_overrides.models import RecordSummary
+from nexuslims_overrides.xml import get_content_hash, get_parsed_xml
+
+logger = logging.getLogger(__name__)
+
+EXPERIMENT_NAMESPACE = "https://data.nist.gov/od/dm/nexus/experiment/v1.0"
+
+SUMMARY_FIELDS = (
+    "root_path",
+    "dataset_count",
+    "activity_count",
+    "extension_counts",
+    "instrument_pid",
+    "render_seconds",
+)
+
+_namespaces = {"nx": EXPERIMENT_NAMESPACE}
+_find_dataset_locations = etree.XPath(
+    "//nx:dataset/nx:location", namespaces=_namespaces
+)
+_count_datasets = etree.XPath("count(//nx:dataset)", namespaces=_namespaces)
+_count_activities = etree.XPath(
+    "count(//nx:acquisitionActivity)", namespaces=_namespaces
+)
+_get_instrument_pid = etree.XPath(
+    "string(/nx:Experiment/nx:summary/nx:instrument/@pid)",
+    namespaces=_namespaces,
+)
+
+
+def get_filelist_root_path(locations):
+    """Find the root path of the file listing of a record
+
+    The locations are stored in a trie of path components, counting the
+    locations below each node. The root path is the deepest folder of the
+    first location that holds all of them (relative locations only have one
+    when they share their top-level folder).
+
+    Args:
+        locations: list of forward-slash separated dataset locations
+
+    Returns:
+        str: root path, without trailing slash ("/" if there is no common
+        folder)
+
+    """
+    if not locations:
+        return "/"
+
+    # component -> [number of locations below, children]
+    trie = {}
+    for location in locations:
+        node = trie
+        for component in location.split("/"):
+            entry = node.setdefault(component, [0, {}])
+            entry[0] += 1
+            node = entry[1]
+
+    # the last component of the first location is the file name
+    folders = locations[0].split("/")[:-1]
+    root_path = "/"
+    node = trie
+    for depth, component in enumerate(folders):
+        count, node = node[component]
+        if count < len(locations):
+            break
+        root_path = "/".join(folders[: depth + 1]) or "/"
+    return root_path
+
+
+def get_extension_counts(locations):
+    """Count the file extensions of the dataset locations of a record, like
+    the get-unique-extensions template (files without extension are not
+    counted)
+
+    Args:
+        locations: list of dataset locations
+
+    Returns:
+        dict: extension -> number of datasets, sorted by extension
+
+    """
+    counts = Counter(
+        file_name.rpartition(".")[2]
+        for file_name in (location.rpartition("/")[2] for location in locations)
+        if "." in file_name
+    )
+    return dict(sorted(counts.items()))
+
+
+def compute_record_summary(xml_tree):
+    """Compute the summary of a record
+
+    Args:
+        xml_tree: parsed record
+
+    Returns:
+        dict: RecordSummary field -> value
+
+    """
+    locations = [
+        location.text or "" for location in _find_dataset_locations(xml_tree)
+    ]
+    return {
+        "root_path": get_filelist_root_path(locations),
+        "dataset_count": int(_count_datasets(xml_tree)),
+        "activity_count": int(_count_activities(xml_tree)),
+        "extension_counts": get_extension_counts(locations),
+        "instrument_pid": _get_instrument_pid(xml_tree),
+        # measured when the version is fully rendered
+        "render_seconds": None,
+    }
+
+
+def get_record_summary(xml_string, data_id=None):
+    """Get the summary of a version of a record, computing it if no summary
+    is stored for this version (the duration of the last full rendering is
+    then the one of the previous version, if any)
+
+    Args:
+        xml_string: content of the data
+        data_id: id of the data. If provided, a computed summary is stored,
+            otherwise a summary stored for the same content is looked up
+
+    Returns:
+        dict: RecordSummary field -> value
+
+    """
+    content_hash = get_content_hash(xml_string)
+    summaries = RecordSummary.objects.filter(content_hash=content_hash)
+    if data_id is not None:
+        summaries = summaries.filter(data_id=data_id)
+    try:
+        summary = summaries.values(*SUMMARY_FIELDS).first()
+    except Exception as e:
+        logger.warning(f"Could not read record summary: {e}")
+        summary = None
+    if summary is not None:
+        return summary
+
+    summary = compute_record_summary(get_parsed_xml(xml_string))
+    if data_id is None:
+        return summary
+    # The duration of the last full rendering of the previous version is
+    # kept until this version is measured: a new version of a record that
+    # was too slow to render in a request is most likely too slow as well
+    defaults = dict(summary, content_hash=content_hash)
+    del defaults["render_seconds"]
+    try:
+        record_summary, _ = RecordSummary.objects.update_or_create(
+            data_id=data_id, defaults=defaults
+        )
+        summary["render_seconds"] = record_summary.render_seconds
+    except Exception as e:
+        # Never fail a page render because the summary cannot be stored,
+        # it will be computed again
+        logger.warning(f"Could not store summary of data {data_id}: {e}")
+    return summary
+
+
+def store_render_time(data_id, render_seconds):
+    """Store the duration of the full rendering of the detail view of a
+    record in its summary
+
+    Args:
+        data_id: id of the data
+        render_seconds: duration of the rendering, in seconds
+
+    """
+    try:
+        RecordSummary.objects.filter(data_id=data_id).update(
+            render_seconds=render_seconds
+        )
+    except Exception as e:
+        logger.warning(f"Could not store render time of data {data_id}: {e}")
+
+
+def get_stored_record_summaries(content_hashes):
+    """Get the summaries stored for several record contents
+
+    Args:
+        content_hashes: list of hashes of record contents (see
+            get_content_hash)
+
+    Returns:
+        dict: content hash -> summary, for the contents with a stored summary
+
+    """
+    try:
+        return {
+            summary["content_hash"]: summary
+            for summary in RecordSummary.objects.filter(
+                content_hash__in=set(content_hashes)
+            ).values("content_hash", *SUMMARY_FIELDS)
+        }
+    except Exception as e:
+        logger.warning(f"Could not read record summaries: {e}")
+        return {}
+
+
+def format_extension_counts(extension_counts):
+    """Format extension counts for the stylesheets, as "count:extension/"
+    items (extensions cannot contain a "/")
+
+    Args:
+        extension_counts: dict of extension -> number of datasets
+
+    Returns:
+        str: formatted counts, sorted by extension
+
+    """
+    return "".join(
+        f"{count}:{extension}/"
+        for extension, count in sorted(extension_counts.items())
+    )
+
+
+def get_summary_xslt_params(summary):
+    """Get the XSLT parameters passing the values of a record summary
+
+    Args:
+        summary: dict returned by get_record_summary
+
+    Returns:
+        dict: XSLT parameters
+
+    """
+    # paths and extensions may contain quotes, which cannot be written in an
+    # XPath literal
+    return {
+        "filelistRootPath": etree.XSLT.strparam(summary["root_path"]),
+        "datasetCount": str(summary["dataset_count"]),
+        "activityCount": str(summary["activity_count"]),
+        "extensionCounts": etree.XSLT.strparam(
+            format_extension_counts(summary["extension_counts"])
+        ),
+    }
+
+
+def get_summary_item_params(summary):
+    """Get the attributes passing the values of a record summary to the list
+    stylesheet for an item of a batched rendering (see xsl_transform_batch)
+
+    Args:
+        summary: dict returned by get_record_summary
+
+    Returns:
+        dict: attribute name -> value
+
+    """
+    return {
+        "dataset_count": str(summary["dataset_count"]),
+        "activity_count": str(summary["activity_count"]),
+        "extension_counts": format_extension_counts(
+            summary["extension_counts"]
+        ),
+    }
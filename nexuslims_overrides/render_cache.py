@@ -0,0 +1,593 @@
+"""
+Shared cache of rendered XSLT output.
+
+Rendered HTML fragments are stored in a Django cache (Redis in production,
+see ``config/settings/prod_settings.py``) so that every gunicorn worker and
+replica can reuse a render instead of running the XSLT again.
+
+A cache key combines:
+- the type of rendering (list or detail)
+- an identifier of the record version being rendered (provided by the caller)
+- a hash of the stylesheet content
+- a fingerprint of the XSLT parameters (including those derived from NX_*
+  settings, such as the instrument color mappings)
+
+so that a change to any of these results in a new key, and stale entries
+simply expire.
+
+Renderings produced ahead of time by the pre-rendering tasks are also stored
+in the database (see nexuslims_overrides.models.RenderedRecord) under the same
+key, so they survive cache evictions and restarts.
+
+Since a stylesheet change changes every key, changes to the content of an XSLT
+are staged (with NX_STAGE_STYLESHEET_CHANGES): the previous content stays
+published (see nexuslims_overrides.models.PublishedStylesheet), so pages keep
+rendering with it and serving the renderings stored for it, while the records
+are pre-rendered with the new content (see prerender.rerender_all_data). The
+published content is then released for every record at once.
+
+Records that fail to render are remembered too (a negative cache), keyed on
+the type of rendering, a hash of the record content and a hash of the
+stylesheet, so that a malformed record is not parsed and transformed again,
+only to fail again, on every page including it.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from core_main_app.components.xsl_transformation.models import (
+    XslTransformation,
+)
+
+from nexuslims_overrides.models import PublishedStylesheet, RenderedRecord
+from nexuslims_overrides.xml import get_content_hash, get_stylesheet_hash
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_KEY_PREFIX = "nx:render"
+RENDER_FAILURE_KEY_PREFIX = "nx:render-failure"
+STYLESHEET_CONFIG_VERSION_KEY = "nx:stylesheet-config-version"
+
+
+def get_render_cache():
+    """Return the Django cache used to store rendered fragments
+
+    Returns:
+        BaseCache: the cache configured by NX_RENDER_CACHE_ALIAS, or the
+            "default" cache when CACHES does not define it
+
+    """
+    alias = getattr(settings, "NX_RENDER_CACHE_ALIAS", "renders")
+    if alias not in settings.CACHES:
+        alias = "default"
+    return caches[alias]
+
+
+def is_render_cache_enabled():
+    """Check whether rendered fragments should be cached
+
+    Returns:
+        bool: False if NX_RENDER_CACHE_TIMEOUT is set to 0
+
+    """
+    return getattr(settings, "NX_RENDER_CACHE_TIMEOUT", 604800) != 0
+
+
+def is_prerender_enabled():
+    """Check whether records should be pre-rendered and their stored
+    renderings served
+
+    Returns:
+        bool: value of NX_PRERENDER_RECORDS
+
+    """
+    return getattr(settings, "NX_PRERENDER_RECORDS", True)
+
+
+def get_params_fingerprint(xslt_params):
+    """Compute a stable fingerprint of the parameters passed to the XSLT
+
+    Args:
+        xslt_params: dict of XSLT parameters
+
+    Returns:
+        str: hex digest of the sorted parameters
+
+    """
+    serialized = "\n".join(
+        f"{name}={value}" for name, value in sorted(xslt_params.items())
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def make_render_cache_key(xslt_type, record_version, xslt_string, xslt_params):
+    """Build the cache key of a rendered fragment
+
+    Args:
+        xslt_type: type of rendering (list or detail)
+        record_version: string identifying the version of the record
+        xslt_string: content of the stylesheet
+        xslt_params: dict of XSLT parameters
+
+    Returns:
+        str: cache key
+
+    """
+    return ":".join(
+        [
+            RENDER_CACHE_KEY_PREFIX,
+            xslt_type.lower(),
+            str(record_version),
+            get_stylesheet_hash(xslt_string)[:16],
+            get_params_fingerprint(xslt_params)[:16],
+        ]
+    )
+
+
+def get_render(cache_key):
+    """Get a rendered fragment from the cache or, failing that, from the
+    renderings stored in the database (which are then put back in the cache)
+
+    Args:
+        cache_key: key built by make_render_cache_key
+
+    Returns:
+        str: rendered HTML, or None if neither cached nor stored
+
+    """
+    html_string = None
+    if is_render_cache_enabled():
+        html_string = get_cached_render(cache_key)
+    if html_string is None and is_prerender_enabled():
+        html_string = get_stored_render(cache_key)
+        if html_string is not None:
+            set_cached_render(cache_key, html_string)
+    return html_string
+
+
+def get_renders(cache_keys):
+    """Get several rendered fragments from the cache or, failing that, from
+    the renderings stored in the database
+
+    Args:
+        cache_keys: list of keys built by make_render_cache_key
+
+    Returns:
+        dict: cache key -> rendered HTML, for the keys found
+
+    """
+    renders = {}
+    if is_render_cache_enabled():
+        renders.update(get_cached_renders(cache_keys))
+    missing = [key for key in cache_keys if key not in renders]
+    if missing and is_prerender_enabled():
+        stored = get_stored_renders(missing)
+        for cache_key, html_string in stored.items():
+            set_cached_render(cache_key, html_string)
+        renders.update(stored)
+    return renders
+
+
+def get_cached_render(cache_key):
+    """Get a rendered fragment from the cache
+
+    Args:
+        cache_key: key built by make_render_cache_key
+
+    Returns:
+        str: rendered HTML, or None if not cached or the cache is unavailable
+
+    """
+    try:
+        return get_render_cache().get(cache_key)
+    except Exception as e:
+        # Never fail a page render because the cache is unavailable
+        logger.warning(f"Could not read rendered fragment from cache: {e}")
+        return None
+
+
+def get_cached_renders(cache_keys):
+    """Get several rendered fragments from the cache in one round trip
+
+    Args:
+        cache_keys: list of keys built by make_render_cache_key
+
+    Returns:
+        dict: cache key -> rendered HTML, for the keys found in the cache
+
+    """
+    try:
+        return get_render_cache().get_many(cache_keys)
+    except Exception as e:
+        logger.warning(f"Could not read rendered fragments from cache: {e}")
+        return {}
+
+
+def set_cached_render(cache_key, html_string):
+    """Store a rendered fragment in the cache
+
+    Args:
+        cache_key: key built by make_render_cache_key
+        html_string: rendered HTML
+
+    """
+    if not is_render_cache_enabled():
+        return
+    try:
+        get_render_cache().set(
+            cache_key,
+            html_string,
+            timeout=getattr(settings, "NX_RENDER_CACHE_TIMEOUT", 604800),
+        )
+    except Exception as e:
+        logger.warning(f"Could not store rendered fragment in cache: {e}")
+
+
+def get_stored_render(cache_key):
+    """Get a pre-rendered fragment stored in the database
+
+    Args:
+        cache_key: key built by make_render_cache_key
+
+    Returns:
+        str: rendered HTML, or None if no current rendering is stored
+
+    """
+    try:
+        return (
+            RenderedRecord.objects.filter(cache_key=cache_key)
+            .values_list("html", flat=True)
+            .first()
+        )
+    except Exception as e:
+        logger.warning(f"Could not read stored rendering: {e}")
+        return None
+
+
+def get_stored_renders(cache_keys):
+    """Get several pre-rendered fragments stored in the database
+
+    Args:
+        cache_keys: list of keys built by make_render_cache_key
+
+    Returns:
+        dict: cache key -> rendered HTML, for the keys found in the database
+
+    """
+    try:
+        return dict(
+            RenderedRecord.objects.filter(
+                cache_key__in=cache_keys
+            ).values_list("cache_key", "html")
+        )
+    except Exception as e:
+        logger.warning(f"Could not read stored renderings: {e}")
+        return {}
+
+
+def has_stored_render(data_id, xslt_type, cache_key):
+    """Check whether the stored rendering of a data is current
+
+    Args:
+        data_id: id of the rendered data
+        xslt_type: type of rendering (list or detail)
+        cache_key: key built by make_render_cache_key
+
+    Returns:
+        bool: True if a rendering with this key is stored for the data
+
+    """
+    return RenderedRecord.objects.filter(
+        data_id=data_id, xslt_type=xslt_type, cache_key=cache_key
+    ).exists()
+
+
+def store_render(data_id, xslt_type, cache_key, html_string, stylesheet_hash):
+    """Store the pre-rendered fragment of a data in the database (replacing
+    any previous rendering of the same type, except the ones made with a
+    published stylesheet while a change to it is staged) and in the cache
+
+    Args:
+        data_id: id of the rendered data
+        xslt_type: type of rendering (list or detail)
+        cache_key: key built by make_render_cache_key
+        html_string: rendered HTML
+        stylesheet_hash: hash of the stylesheet content
+
+    """
+    RenderedRecord.objects.update_or_create(
+        data_id=data_id,
+        xslt_type=xslt_type,
+        stylesheet_hash=stylesheet_hash,
+        defaults={"cache_key": cache_key, "html": html_string},
+    )
+    kept_hashes = get_published_stylesheet_hashes() | {stylesheet_hash}
+    RenderedRecord.objects.filter(data_id=data_id, xslt_type=xslt_type).exclude(
+        stylesheet_hash__in=kept_hashes
+    ).delete()
+    set_cached_render(cache_key, html_string)
+
+
+def get_render_failure_timeout():
+    """Get the lifetime of the render failures kept in the negative cache
+
+    Returns:
+        int: value of NX_RENDER_FAILURE_TIMEOUT in seconds (0 if disabled)
+
+    """
+    return getattr(settings, "NX_RENDER_FAILURE_TIMEOUT", 24 * 60 * 60)
+
+
+def make_render_failure_key(xslt_type, xml_string, xslt_string):
+    """Build the negative cache key of the rendering of a record
+
+    Args:
+        xslt_type: type of rendering (list or detail)
+        xml_string: content of the record
+        xslt_string: content of the stylesheet
+
+    Returns:
+        str: cache key
+
+    """
+    return ":".join(
+        [
+            RENDER_FAILURE_KEY_PREFIX,
+            xslt_type.lower(),
+            get_content_hash(xml_string)[:16],
+            get_stylesheet_hash(xslt_string)[:16],
+        ]
+    )
+
+
+def get_error_log(exception):
+    """Get the lxml error log of an exception raised while rendering, looking
+    at the exceptions it was raised from
+
+    Args:
+        exception: exception raised while rendering
+
+    Returns:
+        list: messages of the error log, empty if there is none
+
+    """
+    while exception is not None:
+        error_log = getattr(exception, "error_log", None)
+        if error_log:
+            return [str(entry) for entry in error_log]
+        exception = exception.__cause__ or exception.__context__
+    return []
+
+
+def get_render_failures(failure_keys):
+    """Get the render failures known for several records
+
+    Args:
+        failure_keys: list of keys built by make_render_failure_key
+
+    Returns:
+        dict: failure key -> failure (see set_render_failure), for the keys
+        found in the negative cache
+
+    """
+    if not failure_keys or not get_render_failure_timeout():
+        return {}
+    try:
+        return get_render_cache().get_many(failure_keys)
+    except Exception as e:
+        logger.warning(f"Could not read render failures from cache: {e}")
+        return {}
+
+
+def get_render_failure(failure_key):
+    """Get the render failure known for a record
+
+    Args:
+        failure_key: key built by make_render_failure_key
+
+    Returns:
+        dict: failure (see set_render_failure), or None if none is known
+
+    """
+    return get_render_failures([failure_key]).get(failure_key)
+
+
+def set_render_failure(failure_key, exception, data_id=None):
+    """Remember that a record failed to render, for NX_RENDER_FAILURE_TIMEOUT
+    seconds
+
+    Args:
+        failure_key: key built by make_render_failure_key
+        exception: exception raised while rendering
+        data_id: id of the data, if known (search results only carry the
+            record content)
+
+    """
+    timeout = get_render_failure_timeout()
+    if not timeout:
+        return
+    cause = exception.__cause__ or exception
+    failure = {
+        "data_id": data_id,
+        "error": f"{type(cause).__name__}: {cause}",
+        "error_log": get_error_log(exception),
+        "failed_at": timezone.now().isoformat(),
+    }
+    try:
+        get_render_cache().set(failure_key, failure, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Could not store render failure in cache: {e}")
+
+
+def get_stylesheet_config_version():
+    """Get the version of the stylesheet configuration, shared by all
+    processes, which changes whenever an XSLT or a template's XSLT rendering
+    is saved or deleted
+
+    Returns:
+        int: version number, or None if the cache is unavailable
+
+    """
+    try:
+        return get_render_cache().get(STYLESHEET_CONFIG_VERSION_KEY, 0)
+    except Exception as e:
+        logger.warning(f"Could not read stylesheet configuration version: {e}")
+        return None
+
+
+def bump_stylesheet_config_version():
+    """Change the version of the stylesheet configuration, so that every
+    process drops the stylesheets it resolved"""
+    cache = get_render_cache()
+    try:
+        try:
+            cache.incr(STYLESHEET_CONFIG_VERSION_KEY)
+        except ValueError:
+            # key does not exist yet
+            cache.set(STYLESHEET_CONFIG_VERSION_KEY, 1, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not update stylesheet configuration version: {e}")
+
+
+def is_stylesheet_staging_enabled():
+    """Check whether changes to the content of an XSLT should be staged until
+    every record is pre-rendered with the new content
+
+    Returns:
+        bool: value of NX_STAGE_STYLESHEET_CHANGES, False if pre-rendering
+        is disabled
+
+    """
+    return is_prerender_enabled() and getattr(
+        settings, "NX_STAGE_STYLESHEET_CHANGES", True
+    )
+
+
+def get_published_stylesheet(xsl_transformation_id):
+    """Get the content pages render with for an XSLT whose change is staged
+
+    Args:
+        xsl_transformation_id: id of the XslTransformation
+
+    Returns:
+        str: published content, or None if no change to the XSLT is staged
+        (pages then render with its current content)
+
+    """
+    try:
+        return (
+            PublishedStylesheet.objects.filter(
+                xsl_transformation_id=xsl_transformation_id
+            )
+            .values_list("content", flat=True)
+            .first()
+        )
+    except Exception as e:
+        logger.warning(f"Could not read published stylesheet: {e}")
+        return None
+
+
+def get_published_stylesheet_hashes():
+    """Get the hashes of the contents pages render with for the XSLTs whose
+    change is staged
+
+    Returns:
+        set: stylesheet hashes
+
+    """
+    return set(
+        PublishedStylesheet.objects.values_list("stylesheet_hash", flat=True)
+    )
+
+
+def hold_published_stylesheet(xsl_transformation):
+    """Stage a change to the content of an XSLT, about to be saved: its
+    stored content stays published until release_published_stylesheets
+    (unless a previous change is already staged, whose published content is
+    kept)
+
+    Args:
+        xsl_transformation: XslTransformation being saved
+
+    Returns:
+        bool: True if a change to the XSLT is staged
+
+    """
+    if xsl_transformation.pk is None:
+        return False
+    if PublishedStylesheet.objects.filter(
+        xsl_transformation_id=xsl_transformation.pk
+    ).exists():
+        return True
+    stored = XslTransformation.objects.filter(pk=xsl_transformation.pk).first()
+    if stored is None:
+        return False
+    content = stored.content
+    if content == xsl_transformation.content:
+        return False
+    PublishedStylesheet.objects.get_or_create(
+        xsl_transformation_id=xsl_transformation.pk,
+        defaults={
+            "content": content,
+            "stylesheet_hash": get_stylesheet_hash(content),
+        },
+    )
+    return True
+
+
+def get_stylesheet_hashes():
+    """Get the hashes of the current contents of the XSLTs
+
+    Returns:
+        dict: XslTransformation id -> stylesheet hash
+
+    """
+    return {
+        xsl_transformation.pk: get_stylesheet_hash(xsl_transformation.content)
+        for xsl_transformation in XslTransformation.objects.all()
+    }
+
+
+def release_published_stylesheets(rendered_hashes):
+    """Release the published contents of the XSLTs whose current content
+    every record was pre-rendered with, so that pages switch to the new
+    renderings at once, and delete the renderings made with the released
+    contents
+
+    The staged changes are released in a single transaction, and every
+    process drops the stylesheets it resolved (within
+    NX_STYLESHEET_VERSION_CHECK_INTERVAL seconds). Changes made to an XSLT
+    since the records were pre-rendered stay staged.
+
+    Args:
+        rendered_hashes: XslTransformation id -> hash of the content the
+            records were pre-rendered with (see get_stylesheet_hashes)
+
+    Returns:
+        int: number of staged changes released
+
+    """
+    current_hashes = get_stylesheet_hashes()
+    with transaction.atomic():
+        released = [
+            published
+            for published in PublishedStylesheet.objects.select_for_update()
+            if current_hashes.get(published.xsl_transformation_id)
+            == rendered_hashes.get(published.xsl_transformation_id)
+        ]
+        if not released:
+            return 0
+        PublishedStylesheet.objects.filter(
+            pk__in=[published.pk for published in released]
+        ).delete()
+        # a content that is current again (e.g. a reverted change) is kept
+        released_hashes = {
+            published.stylesheet_hash for published in released
+        } - set(current_hashes.values())
+        RenderedRecord.objects.filter(stylesheet_hash__in=released_hashes).delete()
+        transaction.on_commit(bump_stylesheet_config_version)
+    return len(released)
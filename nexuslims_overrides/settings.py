@@ -40,6 +40,51 @@ NX_INSTRUMENT_COLOR_MAPPINGS = {
 # Set to 0 to disable the simple display entirely. Default is 100.
 NX_MAX_DATASET_DISPLAY_COUNT = 100
 
+# This value controls whether the dataset table of the "simple" display is
+# loaded from the server a page at a time (searched and sorted on the server),
+# rather than rendered with every dataset in the page. The rows of a record are
+# extracted once per version and kept in the rendered HTML cache. Default is
+# True.
+NX_DATASET_TABLE_SERVER_SIDE = True
+
+# This value controls whether the detail page only renders a placeholder per
+# acquisition activity, and loads the details of each activity when it scrolls
+# into view. The first paint of records with many activities then only waits
+# for the record summary. Default is False.
+NX_LAZY_ACTIVITIES = False
+
+# These values control how the detail view of a record is rendered: fully,
+# with the "simple" display (above NX_MAX_DATASET_DISPLAY_COUNT datasets), with
+# its activities loaded when displayed (lazy), or only ahead of time
+# (cached-only). The strategy is selected from the size of the record (in
+# characters), its number of datasets and the duration of its last full
+# rendering, and logged along with the reason it was selected:
+# - records whose full rendering took NX_RENDER_LAZY_SECONDS or more, or of
+#   NX_RENDER_LAZY_SIZE or more, are rendered lazily
+# - records whose full rendering took NX_RENDER_CACHED_ONLY_SECONDS or more, or
+#   of NX_RENDER_CACHED_ONLY_SIZE or more, are fully rendered but never while a
+#   page is requested: their rendering is queued (as a Celery task) and the
+#   page shows a placeholder until it is ready. Full renderings grow faster
+#   than the records (about 20 s for 2 MB, 2000 datasets), so large records
+#   are rendered ahead of time before they are ever measured.
+# The duration of the last full rendering is kept when a record changes,
+# until the new version is measured. None disables a threshold. Defaults are
+# 5, 10000000, 30 and 2000000.
+NX_RENDER_LAZY_SECONDS = 5
+NX_RENDER_LAZY_SIZE = 10000000
+NX_RENDER_CACHED_ONLY_SECONDS = 30
+NX_RENDER_CACHED_ONLY_SIZE = 2000000
+
+# The placeholder of a record whose rendering is queued checks every
+# NX_RENDER_POLL_INTERVAL seconds whether it is ready, and reloads the page
+# when it is. A rendering that cannot be queued, or is not ready after
+# NX_RENDER_POLL_TIMEOUT seconds (e.g. no Celery worker is running), is lost:
+# the record is displayed with the simple display, and its rendering is only
+# queued again after NX_RENDER_FAILURE_TIMEOUT more seconds. Defaults are 3
+# and 600.
+NX_RENDER_POLL_INTERVAL = 3
+NX_RENDER_POLL_TIMEOUT = 600
+
 # This value controls whether messages and errors from the XSLT will be
 # output to the Django application's console. Default is False.
 # This is useful if you are working on the XSLT and trying to profile/debug
@@ -49,6 +94,155 @@ NX_MAX_DATASET_DISPLAY_COUNT = 100
 # left as False in production.
 NX_XSLT_DEBUG = False
 
+# This value controls whether every XSLT transformation is run with lxml's
+# profiler, printing to the console the number of calls and the self time
+# (excluding the templates it applies or calls) of each template of the
+# stylesheet. Default is False. Profiling slows the transformations down, so
+# leave it as False in production and use
+# "python manage.py profile_xslt <data_id>" to profile a single record.
+NX_XSLT_PROFILE = False
+
+# Maximum number of compiled XSLT stylesheets kept in memory by each worker
+# thread. Compiling the detail stylesheet is expensive, so compiled
+# stylesheets are reused until the stylesheet content changes. Set to 0 to
+# disable the cache and compile the stylesheet on every render. Default is 8.
+NX_XSLT_CACHE_SIZE = 8
+
+# The stylesheet configured for each template is looked up once per process,
+# until an XSLT or a template's XSLT rendering is saved or deleted, which
+# changes a version shared through the NX_RENDER_CACHE_ALIAS cache. Each
+# process reads that version at most every NX_STYLESHEET_VERSION_CHECK_INTERVAL
+# seconds, so other processes pick a stylesheet change up within that delay.
+# Default is 5.
+NX_STYLESHEET_VERSION_CHECK_INTERVAL = 5
+
+# This value controls whether the string-handling templates of the stylesheets
+# (decode, string-replace-all, tokenize-path, localize-date, ...) run the
+# Python implementations of nexuslims_overrides/xslt_functions.py instead of
+# their recursive XSLT versions, which are much slower on long values. The
+# output is the same either way. Default is True.
+NX_XSLT_EXTENSION_FUNCTIONS = True
+
+# Memory budget, in bytes, of the parsed record documents kept by each worker
+# process (shared by its threads), so that a record displayed again (e.g. in
+# its list and detail views) is not parsed again. The memory used by a parsed
+# document is estimated at 8 times the size of its XML, so records of up to
+# NX_XML_TREE_CACHE_BYTES / 8 bytes are kept (32 MB, about 25,000 datasets,
+# by default); larger ones are parsed on every render. Set to 0 to parse the
+# records on every render. Default is 256 MB.
+NX_XML_TREE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Rendered record HTML is stored in a Django cache so that every worker and
+# replica can reuse it instead of running the XSLT again. Entries are keyed
+# on the record version, stylesheet content and XSLT parameters, so they
+# never need to be invalidated manually. NX_RENDER_CACHE_ALIAS selects the
+# cache (from the CACHES setting) and NX_RENDER_CACHE_TIMEOUT is the entry
+# lifetime in seconds. Set the timeout to 0 to disable the cache. Default is
+# one week.
+#
+# The production settings define a "renders" cache in its own Redis instance,
+# limited by RENDER_REDIS_MAXMEMORY and evicting the least recently used
+# entries, so that renders never evict the sessions kept in "default". A
+# detail render takes about 0.5-1 MB (records of 50-200 datasets) and a search
+# result about 8 KB: allow about 1 MB per regularly displayed record. When
+# CACHES has no "renders" entry (development, tests), "default" is used.
+NX_RENDER_CACHE_ALIAS = "renders"
+NX_RENDER_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+# Records that fail to render are remembered, per record content and
+# stylesheet, for NX_RENDER_FAILURE_TIMEOUT seconds (in the cache selected by
+# NX_RENDER_CACHE_ALIAS): they are displayed as their XML without being
+# transformed again. "python manage.py report_render_failures" lists them with
+# their lxml error logs. Set to 0 to disable. Default is one day.
+NX_RENDER_FAILURE_TIMEOUT = 24 * 60 * 60
+
+# The workspaces and workspace permissions each user (or the anonymous group)
+# can read and write are resolved once and kept in a Django cache, instead of
+# being queried on every search and detail request. Entries are dropped when
+# a workspace, group or permission, or the groups or permissions of a user,
+# change. NX_ACCESS_CACHE_ALIAS selects the cache (it must be shared by all
+# processes, e.g. Redis, for changes to be seen by all of them) and
+# NX_ACCESS_CACHE_TIMEOUT is the entry lifetime in seconds. Set the timeout to
+# 0 to disable the cache. Defaults are "default" and 300.
+NX_ACCESS_CACHE_ALIAS = "default"
+NX_ACCESS_CACHE_TIMEOUT = 300
+
+# The instrument PIDs of the records are kept in an indexed table, updated
+# when a record is saved, and filtering by instrument (the instrument-pid
+# search operator used by the instrument badges) queries that table instead
+# of the content of every record. Run "python manage.py
+# backfill_instrument_pids" once after migrating, or after enabling the
+# index, to index the existing records. Set to False to filter on the record
+# content. Default is True.
+NX_INSTRUMENT_PID_INDEX = True
+
+# Backend of keyword searches. "default" lets core MDCS compare each keyword
+# with the content of every record. "postgres" (PostgreSQL databases only)
+# matches the keywords against a full-text search document of each record,
+# with a GIN index, built when the record is saved from its title,
+# experimenters, sample names, instruments and dataset paths, and orders the
+# results by relevance unless another sort order is chosen. Run "python
+# manage.py backfill_search_documents" after selecting it to index the
+# existing records. NX_FULLTEXT_SEARCH_CONFIG is the PostgreSQL text search
+# configuration (language) of the documents; run the command again after
+# changing it. Defaults are "default" and "english".
+NX_KEYWORD_SEARCH_BACKEND = "default"
+NX_FULLTEXT_SEARCH_CONFIG = "english"
+
+# Fuzzy search (PostgreSQL databases only): the titles, sample names and
+# experimenter names of the records are kept in a table with a trigram index
+# (pg_trgm), updated when a record is saved. They are looked up by the
+# "fuzzy:<name>" search operator, which finds misspelled or partial names,
+# and suggested by the keyword search box as the visitor types (at most
+# NX_FUZZY_SUGGESTIONS_LIMIT names). Run "python manage.py
+# backfill_search_documents" after enabling it to index the existing
+# records. Defaults are False and 10.
+NX_FUZZY_SEARCH = False
+NX_FUZZY_SUGGESTIONS_LIMIT = 10
+
+# Render the list view of all the records of a search result page in a single
+# XSLT pass, rather than running the list XSLT once per record. Requires a
+# batch-aware list stylesheet (see xslt/list_stylesheet.xsl); other
+# stylesheets are applied record by record. Default is True.
+NX_LIST_BATCH_RENDERING = True
+
+# Pre-render the detail and list views of a record (in a Celery task) when it
+# is saved, and store the renderings in the database so that they survive
+# cache evictions and restarts. Pages serve a stored rendering as long as it
+# was made with the current stylesheet and XSLT parameters. Default is True.
+NX_PRERENDER_RECORDS = True
+
+# Number of worker processes and number of records per chunk used by
+# "python manage.py rerender_records" (and its Celery task, for the chunk
+# size) to re-render every record after a stylesheet change. Each chunk is
+# stored in a single transaction. A worker count of None uses one worker per
+# CPU. Defaults are None and 50.
+NX_RERENDER_WORKERS = None
+NX_RERENDER_CHUNK_SIZE = 50
+
+# Stage changes to the content of an XSLT (e.g. made with update-xslt.sh or
+# the admin): pages keep rendering with the previous content, and serving the
+# renderings stored for it, while every record is pre-rendered with the new
+# content (queued on the Celery workers when the change is saved, or with
+# "python manage.py rerender_records"). Pages then switch to the new
+# renderings at once, instead of rendering every record on demand. Without a
+# Celery worker, changes are only displayed once rerender_records has run.
+# Ignored when NX_PRERENDER_RECORDS is False. Default is True.
+NX_STAGE_STYLESHEET_CHANGES = True
+
+# Record the timings (XML parsing, stylesheet compilation, transformation and
+# serialization), sizes and dataset counts of the XSLT transformations, as
+# histograms labelled by stylesheet and rendering type. They are exposed in
+# the Prometheus text format at /nexuslims/metrics, for staff users or for
+# requests sending "Authorization: Bearer <NX_METRICS_TOKEN>". Each process
+# publishes its histograms in the NX_RENDER_CACHE_ALIAS cache every
+# NX_METRICS_PUBLISH_INTERVAL seconds (when it recorded new values), and the
+# endpoint adds up those of every process. Defaults are True, None (no token
+# access) and 10.
+NX_XSLT_METRICS = True
+NX_METRICS_TOKEN = None
+NX_METRICS_PUBLISH_INTERVAL = 10
+
 # ============================================================================
 # HOMEPAGE CONFIGURATION
 # ============================================================================
@@ -1,10 +1,56 @@
 """
-NexusLIMS post-migration signal handlers.
+NexusLIMS signal handlers.
 """
+import logging
 
-from django.db.models.signals import post_migrate
+from django.db import transaction
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
 from django.dispatch import receiver
 
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+from core_main_app.components.template_xsl_rendering.models import (
+    TemplateXslRendering,
+)
+from core_main_app.components.workspace.models import Workspace
+from core_main_app.components.xsl_transformation.models import (
+    XslTransformation,
+)
+
+from nexuslims_overrides.access_cache import bump_access_version
+from nexuslims_overrides.fulltext import (
+    is_fulltext_search_enabled,
+    update_search_document,
+)
+from nexuslims_overrides.fuzzy_search import (
+    is_fuzzy_search_enabled,
+    update_search_names,
+)
+from nexuslims_overrides.instrument_index import (
+    is_instrument_index_enabled,
+    update_record_instruments,
+)
+from nexuslims_overrides.render_cache import (
+    bump_stylesheet_config_version,
+    hold_published_stylesheet,
+    is_prerender_enabled,
+    is_stylesheet_staging_enabled,
+)
+from nexuslims_overrides.tasks import prerender_data_task, rerender_all_data_task
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    clear_xslt_string_cache,
+)
+from nexuslims_overrides.xml import clear_xslt_cache
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_migrate)
 def grant_anonymous_explore_permission(sender, **kwargs):
@@ -39,3 +85,194 @@ def grant_anonymous_explore_permission(sender, **kwargs):
     except Exception as e:
         # Don't fail migrations if this fails
         print(f"Warning: Could not grant anonymous explore permission: {e}")
+
+
+@receiver(post_save, sender=XslTransformation)
+@receiver(post_delete, sender=XslTransformation)
+def invalidate_xslt_cache(sender, instance, **kwargs):
+    """
+    Drop compiled stylesheets when an XslTransformation is upserted.
+
+    Cache entries are keyed by content hash so an edited stylesheet never
+    reuses a stale compilation, but clearing keeps the old entries from
+    occupying the cache until they are evicted.
+    """
+    clear_xslt_cache()
+
+
+@receiver(pre_save, sender=XslTransformation)
+def stage_stylesheet_change(sender, instance, **kwargs):
+    """
+    Keep publishing the current content of an XslTransformation whose content
+    is about to change, until every record is pre-rendered with the new one.
+
+    Every stored and cached rendering is keyed on the stylesheet, so pages
+    would otherwise render every record on demand until the re-rendering is
+    done.
+    """
+    instance._nx_stylesheet_staged = False
+    if not is_stylesheet_staging_enabled():
+        return
+    try:
+        instance._nx_stylesheet_staged = hold_published_stylesheet(instance)
+    except Exception as e:
+        # Never fail a save because the change cannot be staged, pages then
+        # render with the new stylesheet straight away
+        logger.warning(f"Could not stage change of XSLT {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=XslTransformation)
+def rerender_staged_stylesheet(sender, instance, **kwargs):
+    """
+    Re-render every record with a staged stylesheet change once it is
+    committed, on the Celery workers. The re-rendering releases the
+    published content of the stylesheet when it finishes.
+    """
+    if not getattr(instance, "_nx_stylesheet_staged", False):
+        return
+
+    def _schedule_rerender():
+        try:
+            rerender_all_data_task.apply_async()
+        except Exception as e:
+            logger.warning(
+                f"Could not schedule re-rendering for XSLT {instance.pk}, "
+                f"run rerender_records to publish it: {e}"
+            )
+
+    transaction.on_commit(_schedule_rerender)
+
+
+@receiver(post_save, sender=XslTransformation)
+@receiver(post_delete, sender=XslTransformation)
+@receiver(post_save, sender=TemplateXslRendering)
+@receiver(post_delete, sender=TemplateXslRendering)
+def invalidate_xslt_resolution(sender, instance, **kwargs):
+    """
+    Drop the template -> stylesheet resolutions when the XSLT configuration
+    changes.
+
+    The shared version is bumped as well, since the change may be made from
+    another process than the ones serving pages (e.g. update-xslt.sh).
+    """
+    clear_xslt_string_cache()
+    bump_stylesheet_config_version()
+
+
+@receiver(post_save, sender=Data)
+def prerender_saved_data(sender, instance, **kwargs):
+    """
+    Pre-render the detail and list views of a record when it is saved.
+
+    The rendering runs in a Celery task once the transaction is committed,
+    so that saving a record (e.g. through the REST API during harvesting)
+    is not slowed down by the XSLT transformations.
+    """
+    if not is_prerender_enabled():
+        return
+    if instance.template.format != Template.XSD:
+        return
+
+    def _schedule_prerender():
+        try:
+            prerender_data_task.apply_async((instance.id,))
+        except Exception as e:
+            # Never fail a save because the broker is unavailable, the
+            # record will be rendered on first display instead
+            logger.warning(f"Could not schedule pre-rendering of data {instance.id}: {e}")
+
+    transaction.on_commit(_schedule_prerender)
+
+
+@receiver(post_save, sender=Data)
+def index_saved_data_instruments(sender, instance, **kwargs):
+    """
+    Index the instrument PIDs of a record when it is saved.
+
+    The index is updated in the same transaction as the record, so that
+    filtering by instrument finds the record as soon as it is saved. The
+    entries of a deleted record are deleted with it (the foreign key
+    cascades).
+    """
+    if not is_instrument_index_enabled():
+        return
+    if instance.template.format != Template.XSD:
+        return
+    try:
+        update_record_instruments(instance)
+    except Exception as e:
+        # Never fail a save because the record cannot be indexed (e.g. it
+        # cannot be parsed), backfill_instrument_pids will retry
+        logger.warning(f"Could not index instruments of data {instance.id}: {e}")
+
+
+@receiver(post_save, sender=Data)
+def index_saved_data_search_document(sender, instance, **kwargs):
+    """
+    Build the full-text search document of a record when it is saved, with
+    the PostgreSQL keyword search backend.
+
+    Like the instrument index, the document is updated in the same
+    transaction as the record, and deleted with it.
+    """
+    if not is_fulltext_search_enabled():
+        return
+    if instance.template.format != Template.XSD:
+        return
+    try:
+        update_search_document(instance)
+    except Exception as e:
+        # Never fail a save because the record cannot be indexed,
+        # backfill_search_documents will retry
+        logger.warning(
+            f"Could not build search document of data {instance.id}: {e}"
+        )
+
+
+@receiver(post_save, sender=Data)
+def index_saved_data_search_names(sender, instance, **kwargs):
+    """
+    Index the title, sample names and experimenter names of a record when it
+    is saved, with fuzzy search enabled.
+
+    Like the instrument index, the names are updated in the same transaction
+    as the record, and deleted with it.
+    """
+    if not is_fuzzy_search_enabled():
+        return
+    if instance.template.format != Template.XSD:
+        return
+    try:
+        update_search_names(instance)
+    except Exception as e:
+        # Never fail a save because the record cannot be indexed,
+        # backfill_search_documents will retry
+        logger.warning(f"Could not index names of data {instance.id}: {e}")
+
+
+@receiver(post_save, sender=Workspace)
+@receiver(post_delete, sender=Workspace)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_access_cache(sender, **kwargs):
+    """
+    Drop the workspaces and permissions resolved for each user when a
+    workspace (e.g. made public), a group, a permission or the groups and
+    permissions of a user or group change.
+
+    Workspace access is granted through the permissions of users and groups
+    (including the anonymous group), so these are all the changes that can
+    change it.
+
+    The version is bumped once the change is committed (straight away
+    outside a transaction): m2m_changed is sent inside the transaction of the
+    related manager, and a request reading the new version before the commit
+    would cache the access resolved from the old rows under it.
+    """
+    if kwargs.get("action", "post_").startswith("post_"):
+        transaction.on_commit(bump_access_version)
@@ -7,6 +7,7 @@
  * - Removed highlight.js code highlighting for JSON/XML content
  * - Removed leaveNotice() function calls for external links
  * - Error notification style adjustments
+ * - Permissions of all the results of a page checked in a single request
  */
 
 /**
@@ -142,37 +143,45 @@ var get_data_source_results = function(result_page, data_source_url) {
 
 /*
  * Display the edit icon according to the user permissions
+ * NexusLIMS: check the permissions of all the results of the page at once,
+ * with a single request per data source, instead of one request per result
  */
 var getDataPermission = function() {
-    $("input.input-permission-url").map(function(){
+    // permission endpoint -> data id -> permission input elements
+    var requests = {};
+    $("input.input-permission-url").each(function() {
         var inputElement = $(this);
-        var dataPermissionUrl = inputElement.attr("value");
+        var dataPermissionUrl = new URL(inputElement.attr("value"), window.location.origin);
+        var ids;
+        try {
+            ids = JSON.parse(dataPermissionUrl.searchParams.get("ids"));
+        } catch (e) {
+            return;
+        }
+        // results of this instance are checked by the batched endpoint, the
+        // others by the endpoint of their instance (which accepts lists too)
+        var endpoint = dataPermissionUrl.origin === window.location.origin ?
+            $("#data-permissions-url").text() || dataPermissionUrl.pathname :
+            dataPermissionUrl.origin + dataPermissionUrl.pathname;
+        requests[endpoint] = requests[endpoint] || {};
+        $.each(ids, function(index, id) {
+            requests[endpoint][id] = requests[endpoint][id] || [];
+            requests[endpoint][id].push(inputElement);
+        });
+    });
+
+    $.each(requests, function(endpoint, inputsById) {
         $.ajax({
-            url: dataPermissionUrl,
-            type: "POST",
-            contentType:"application/json; charset=utf-8",
+            url: endpoint,
+            type: "GET",
+            data: { ids: JSON.stringify(Object.keys(inputsById)) },
+            dataType: "json",
             success: function(data) {
-                for(id in data) {
-                    if (data[id]) {
-                        // show the edit icon
-                        var editLinkElement = inputElement.siblings(".permissions-link");
-                        editLinkElement.css('display', "inline");
-                        // create the click event listener
-                            (function () {
-                                var target_id = id;
-                                $(editLinkElement).click(function() {
-                                  openEditRecord(target_id,$(editLinkElement));
-                                });
-                            }());
-                        // show the open icon
-                        var openLinkElement = inputElement.siblings(".permissions-link-open");
-                        var dataFormat = inputElement.siblings(".data-template-format").val();
-                        openLinkElement.css('display', "inline");
-                        // add link to text editor
-                        if(dataFormat == "XSD") openLinkElement.attr("href", openXMLRecordUrl + '?id=' + id);
-                        else if (dataFormat == "JSON") openLinkElement.attr("href", openJSONRecordUrl + '?id=' + id);
-                        else $.notify("Error while initializing the text editor URL page. Unsupported data format.", 'danger');
-
+                for (var id in data) {
+                    if (data[id] && inputsById[id]) {
+                        $.each(inputsById[id], function(index, inputElement) {
+                            showDataEditLinks(inputElement, id);
+                        });
                     }
                 }
             },
@@ -180,8 +189,31 @@ var getDataPermission = function() {
                var errors = $.parseJSON(data.responseText);
                $.notify(errors.message, "danger");
             }
-        })
+        });
+    });
+}
+
+/*
+ * Show the edit and open icons of a result the user can write
+ * @param {jQuery} inputElement permission input of the result
+ * @param {string} id of the data
+ */
+var showDataEditLinks = function(inputElement, id) {
+    // show the edit icon
+    var editLinkElement = inputElement.siblings(".permissions-link");
+    editLinkElement.css('display', "inline");
+    // create the click event listener
+    $(editLinkElement).click(function() {
+        openEditRecord(id, $(editLinkElement));
     });
+    // show the open icon
+    var openLinkElement = inputElement.siblings(".permissions-link-open");
+    var dataFormat = inputElement.siblings(".data-template-format").val();
+    openLinkElement.css('display', "inline");
+    // add link to text editor
+    if(dataFormat == "XSD") openLinkElement.attr("href", openXMLRecordUrl + '?id=' + id);
+    else if (dataFormat == "JSON") openLinkElement.attr("href", openJSONRecordUrl + '?id=' + id);
+    else $.notify("Error while initializing the text editor URL page. Unsupported data format.", 'danger');
 }
 
 /*
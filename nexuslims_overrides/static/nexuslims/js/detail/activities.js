@@ -0,0 +1,95 @@
+/**
+ * NexusLIMS Detail Page - Lazy Activities
+ *
+ * When NX_LAZY_ACTIVITIES is enabled, the detail page only holds a placeholder
+ * per acquisition activity. The details of an activity are loaded when its
+ * placeholder scrolls into view (or is clicked), and replace the placeholder.
+ */
+
+(function($, window) {
+    'use strict';
+
+    var Detail = window.NexusLIMSDetail;
+
+    /**
+     * Set up the contents of an activity inserted in the page
+     * @param {jQuery} $activity - The activity element
+     */
+    function initializeActivity($activity) {
+        // Replace placeholder images, as done for the page in main.js
+        $activity.find('img.preview-placeholder')
+            .attr('src', $('#placeholder-preview-src').text())
+            .removeClass('preview-placeholder');
+
+        Detail.DataTables.initializeActivity($activity[0]);
+
+        $activity.find('[data-bs-toggle="tooltip"]').each(function() {
+            bootstrap.Tooltip.getOrCreateInstance(this);
+        });
+    }
+
+    /**
+     * Load the details of an activity and replace its placeholder
+     * @param {Element} skeleton - The placeholder of the activity
+     */
+    function loadActivity(skeleton) {
+        var $skeleton = $(skeleton);
+        if ($skeleton.data('loading')) {
+            return;
+        }
+        $skeleton.data('loading', true);
+
+        $.ajax({
+            url: $skeleton.data('fragment-url'),
+            data: { index: $skeleton.data('activity-index') },
+            dataType: 'html',
+            success: function(html) {
+                var $activity = $($.parseHTML(html, document, false)).filter('div');
+                // The navigation table and the image gallery link to the
+                // anchor of the placeholder
+                $activity.find('span.aa_header').attr('id', $skeleton.find('span.aa_header').attr('id'));
+                $skeleton.replaceWith($activity);
+                initializeActivity($activity);
+            },
+            error: function() {
+                $skeleton.data('loading', false);
+                $skeleton.find('.aa-lazy-load').html(
+                    "<i class='fas fa-exclamation-triangle'></i> Could not load this activity, click to try again"
+                );
+            }
+        });
+    }
+
+    $(document).ready(function() {
+        var skeletons = $('.aa-lazy');
+        if (skeletons.length === 0) {
+            return;
+        }
+
+        $(document).on('click', '.aa-lazy .aa-lazy-load', function() {
+            $(this).blur();
+            loadActivity($(this).closest('.aa-lazy')[0]);
+        });
+
+        if (!('IntersectionObserver' in window)) {
+            skeletons.each(function() {
+                loadActivity(this);
+            });
+            return;
+        }
+
+        // Start loading activities a little before they scroll into view
+        var observer = new IntersectionObserver(function(entries) {
+            entries.forEach(function(entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    loadActivity(entry.target);
+                }
+            });
+        }, { rootMargin: '200px 0px' });
+        skeletons.each(function() {
+            observer.observe(this);
+        });
+    });
+
+})(jQuery, window);
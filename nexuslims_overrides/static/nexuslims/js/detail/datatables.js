@@ -442,9 +442,10 @@
 
     /**
      * Initialize metadata tables
+     * @param {Element} [container] - Only initialize the tables in this element
      */
-    function initializeMetadataTables() {
-        $('.meta-table').each(function() {
+    function initializeMetadataTables(container) {
+        $(container || document).find('.meta-table').each(function() {
             new DataTable(this, {
                 destroy: true,
                 pagingType: "simple_numbers",
@@ -473,9 +474,10 @@
 
     /**
      * Initialize activity tables with image preview
+     * @param {Element} [container] - Only initialize the tables in this element
      */
-    function initializeActivityTables() {
-        $('.aa-table').each(function() {
+    function initializeActivityTables(container) {
+        $(container || document).find('.aa-table').each(function() {
             var this_table = new DataTable(this, {
                 destroy: true,
                 pagingType: "simple_numbers",
@@ -527,8 +529,115 @@
         });
     }
 
+    /**
+     * Escape a value for insertion in HTML
+     * @param {*} value - The value to escape
+     * @returns {string} The escaped value
+     */
+    function escapeHtml(value) {
+        var entities = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'};
+        return String(value === null || value === undefined ? '' : value).replace(/[&<>"']/g, function(c) {
+            return entities[c];
+        });
+    }
+
+    /**
+     * Build the columns of the simple file list table when its rows are loaded
+     * from the server, rendering the cells like the simple-filelist-table
+     * template of the detail stylesheet
+     * @param {string} datasetBaseUrl - The base URL of the datasets
+     * @param {string} previewBaseUrl - The base URL of the previews and metadata
+     * @returns {Array} The DataTables column definitions
+     */
+    function getSimpleFileListServerColumns(datasetBaseUrl, previewBaseUrl) {
+        return [
+            {
+                data: 'number',
+                className: 'text-center',
+                render: function(data) {
+                    return "<a class='dataset_anchor' name='dataset-" + escapeHtml(data) + "'></a>" + escapeHtml(data);
+                }
+            },
+            { data: 'activity', className: 'text-center', render: escapeHtml },
+            { data: 'name', render: escapeHtml },
+            {
+                data: 'path',
+                className: 'filepath',
+                render: function(data, type, row) {
+                    return "<code><a href='" + escapeHtml(datasetBaseUrl + row.path_link) +
+                        "' download='' target='_blank'>" + escapeHtml(data) + "</a></code>";
+                }
+            },
+            { data: 'type', render: escapeHtml },
+            {
+                data: 'preview',
+                orderable: false,
+                className: 'text-center',
+                render: function(data) {
+                    if (data === null) {
+                        return "<a data-bs-toggle='tooltip' data-bs-placement='left' data-bs-html='true' " +
+                            "title='No preview available for this image' disabled=''>" +
+                            "<i class='fa fa-image fa-border param-button' style='margin-left: 0;' disabled=''></i></a>";
+                    }
+                    var previewLocation = escapeHtml(previewBaseUrl + data);
+                    return "<a href='" + previewLocation + "' onclick='$(this).blur()' target='_blank' " +
+                        "data-bs-toggle='tooltip' data-bs-placement='right' data-bs-html='true' " +
+                        "title='Click to download this dataset&#39;s preview image' style='position: relative;' " +
+                        "class='simple-filelist-preview'>" +
+                        "<img src='" + previewLocation + "' class='simple-filelist-preview'>" +
+                        "<i class='fa fa-image fa-border preview-button' style='margin-left:0;'></i></a>";
+                }
+            },
+            {
+                data: 'metadata',
+                orderable: false,
+                className: 'text-center',
+                render: function(data) {
+                    return "<a href='" + escapeHtml(previewBaseUrl + data) + "' onclick='$(this).blur()' target='_blank' " +
+                        "data-bs-toggle='tooltip' data-bs-placement='left' data-bs-html='true' " +
+                        "title='Click to download this dataset&#39;s metadata in JSON format'>" +
+                        "<i class='fa fa-download fa-border param-button' style='margin-left:0;'></i></a>";
+                }
+            },
+            {
+                data: 'location',
+                orderable: false,
+                className: 'text-center',
+                render: function(data, type, row) {
+                    return "<a class='filelisting-dl-cell' href='" + escapeHtml(datasetBaseUrl + data) + "' " +
+                        "onclick='$(this).blur()' download='' data-bs-toggle='tooltip' data-bs-placement='left' " +
+                        "data-bs-html='true' title='Click to download &#013;" + escapeHtml(row.name) + "'>" +
+                        "<i class='fa fa-download fa-border param-button' style='margin-left:0;'></i></a>";
+                }
+            }
+        ];
+    }
+
+    /**
+     * Show a dataset of the simple file list table when its rows are loaded
+     * from the server: go to the page of the dataset and highlight its row
+     * @param {DataTable} table - The simple file list table
+     * @param {number} number - The number of the dataset in the record
+     */
+    function showSimpleFileListDataset(table, number) {
+        table.one('draw', function() {
+            var row = $("#simple-filelist-table a.dataset_anchor[name='dataset-" + number + "']").closest('tr');
+            row.addClass('table-warning');
+            if (row.length) {
+                row[0].scrollIntoView();
+            }
+        });
+        // The rows are numbered in document order
+        table.search('').order([0, 'asc']);
+        table.page(Math.floor((number - 1) / table.page.len())).draw(false);
+    }
+
     /**
      * Initialize the simple file list table as a DataTable
+     *
+     * When the table has a data-rows-url attribute, its rows are loaded from
+     * that URL a page at a time (DataTables server-side processing), otherwise
+     * the rows rendered in the page are used.
      * @returns {DataTable} The initialized simple file list table
      */
     function initializeSimpleFileListTable() {
@@ -537,35 +646,82 @@
             return null;
         }
 
-        var simpleTable = new DataTable('#simple-filelist-table', {
-            destroy: true,
-            paging: false,  // No pagination
-            ordering: false,  // No sorting
-            searching: true,  // Enable search
-            info: true,       // Enable info display
-            lengthChange: false,
-            columns: [
-              { searchable: false, className: 'text-center' },
-              { searchable: false, className: 'text-center' },
-              null,
-              { searchable: false },
-              { searchable: false },
-              { searchable: false, className: 'text-center' },
-              { searchable: false, className: 'text-center' },
-              { searchable: false, className: 'text-center' },
-            ],
-            layout: {
-                topStart: 'search',  // Search bar at top left
-                topEnd: 'info',      // Info display at top right
-                bottomStart: null,
-                bottomEnd: null
-            },
-            language: {
-                search: 'Search:',
-                searchPlaceholder: 'Filter on dataset names...',
-                info: 'Showing _TOTAL_ datasets'
-            }
-        });
+        var rowsUrl = $('#simple-filelist-table').data('rows-url');
+        var simpleTable;
+        if (rowsUrl) {
+            simpleTable = new DataTable('#simple-filelist-table', {
+                destroy: true,
+                serverSide: true,
+                processing: true,
+                ajax: rowsUrl,
+                paging: true,
+                pageLength: 100,
+                lengthMenu: [25, 100, 250, 1000],
+                ordering: true,
+                order: [[0, 'asc']],
+                searching: true,
+                searchDelay: 400,
+                info: true,
+                columns: getSimpleFileListServerColumns(
+                    $('#simple-filelist-table').data('dataset-base-url'),
+                    $('#simple-filelist-table').data('preview-base-url')
+                ),
+                layout: {
+                    topStart: 'search',  // Search bar at top left
+                    topEnd: 'info',      // Info display at top right
+                    bottomStart: 'pageLength',
+                    bottomEnd: 'paging'
+                },
+                language: {
+                    search: 'Search:',
+                    searchPlaceholder: 'Filter on dataset names...',
+                    info: 'Showing _START_ to _END_ of _TOTAL_ datasets'
+                },
+                drawCallback: function() {
+                    // The rows are replaced on every draw, so their tooltips
+                    // are initialized here rather than with the rest of the page
+                    $(this.api().table().body()).find('[data-bs-toggle="tooltip"]').each(function() {
+                        bootstrap.Tooltip.getOrCreateInstance(this);
+                    });
+                }
+            });
+
+            // Gallery links to datasets that may not be on the current page
+            $(document).on('click', 'a[data-dataset-number]', function(e) {
+                e.preventDefault();
+                showSimpleFileListDataset(simpleTable, $(this).data('dataset-number'));
+            });
+        } else {
+            simpleTable = new DataTable('#simple-filelist-table', {
+                destroy: true,
+                paging: false,  // No pagination
+                ordering: false,  // No sorting
+                searching: true,  // Enable search
+                info: true,       // Enable info display
+                lengthChange: false,
+                columns: [
+                  { searchable: false, className: 'text-center' },
+                  { searchable: false, className: 'text-center' },
+                  null,
+                  { searchable: false },
+                  { searchable: false },
+                  { searchable: false, className: 'text-center' },
+                  { searchable: false, className: 'text-center' },
+                  { searchable: false, className: 'text-center' },
+                ],
+                layout: {
+                    topStart: 'search',  // Search bar at top left
+                    topEnd: 'info',      // Info display at top right
+                    bottomStart: null,
+                    bottomEnd: null
+                },
+                language: {
+                    search: 'Search:',
+                    searchPlaceholder: 'Filter on dataset names...',
+                    info: 'Showing _TOTAL_ datasets'
+                }
+            });
+        }
 
         // Enable fixed header for the simple file list table
         if (typeof $.fn.dataTable.FixedHeader !== 'undefined') {
@@ -591,6 +747,15 @@
         initializeActivityTables();
     }
 
+    /**
+     * Initialize the tables of an activity loaded after the page (see activities.js)
+     * @param {Element} container - The element holding the activity
+     */
+    function initializeActivity(container) {
+        initializeMetadataTables(container);
+        initializeActivityTables(container);
+    }
+
     /**
      * Update FixedHeader offset based on current navbar height
      */
@@ -633,6 +798,7 @@
     window.NexusLIMSDetail = window.NexusLIMSDetail || {};
     window.NexusLIMSDetail.DataTables = {
         initializeFileList: initializeFileList,
+        initializeActivity: initializeActivity,
         initializeNavigationAndMetadata: initializeNavigationAndMetadata,
         initializeSimpleFileListTable: initializeSimpleFileListTable,
         setupDynamicHeader: setupDynamicHeader,
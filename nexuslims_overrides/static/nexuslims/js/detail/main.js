@@ -94,11 +94,12 @@
             // Initialize simple file list table as DataTable
             Detail.DataTables.initializeSimpleFileListTable();
 
-            $("a.simple-filelist-preview").mouseover(function() {
+            // Delegated, as the rows may be loaded from the server page by page
+            $("#simple-filelist-table").on('mouseover', 'a.simple-filelist-preview', function() {
                 $("a.simple-filelist-preview img").css("display", "none");
                 $(this).find("img").css("display", "inline-block");
             });
-            $("a.simple-filelist-preview").mouseout(function() {
+            $("#simple-filelist-table").on('mouseout', 'a.simple-filelist-preview', function() {
                 $("a.simple-filelist-preview img").css("display", "none");
             });
         }
@@ -0,0 +1,54 @@
+/**
+ * NexusLIMS Detail Page - Pending Rendering
+ *
+ * Records that are only rendered ahead of time (cached-only rendering
+ * strategy) display a placeholder until their rendering is ready. The
+ * placeholder polls the status of the rendering, and the page is reloaded
+ * when it is ready, to be served the stored rendering.
+ */
+
+(function($, window) {
+    'use strict';
+
+    $(document).ready(function() {
+        var $pending = $('.nexuslims-render-pending[data-status-url]');
+        if ($pending.length === 0) {
+            return;
+        }
+
+        var statusUrl = $pending.data('status-url');
+        var interval = ($pending.data('poll-interval') || 3) * 1000;
+        var deadline = Date.now() + ($pending.data('poll-timeout') || 600) * 1000;
+
+        function showError(message) {
+            $pending.find('.alert').removeClass('alert-info').addClass('alert-warning');
+            $pending.find('.fa-spinner').removeClass('fa-spinner fa-spin').addClass('fa-exclamation-triangle');
+            $pending.find('.render-pending-message').text(
+                typeof message === 'string' ? message :
+                    'This record could not be prepared for display yet, please reload this page later.'
+            );
+        }
+
+        function poll() {
+            $.ajax({
+                url: statusUrl,
+                dataType: 'json',
+                success: function(response) {
+                    if (response.status === 'ready') {
+                        window.location.reload();
+                    } else if (response.status === 'failed') {
+                        showError('This record could not be displayed, please contact an administrator.');
+                    } else if (Date.now() < deadline) {
+                        window.setTimeout(poll, interval);
+                    } else {
+                        showError();
+                    }
+                },
+                error: showError
+            });
+        }
+
+        window.setTimeout(poll, interval);
+    });
+
+})(jQuery, window);
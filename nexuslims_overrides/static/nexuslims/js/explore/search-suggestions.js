@@ -0,0 +1,41 @@
+/**
+ * Search Suggestions
+ * Suggests record titles, sample names and experimenter names similar to
+ * what is typed in the keyword search box (trigram similarity, see
+ * nexuslims_overrides/fuzzy_search.py), instead of the words extracted by
+ * core_explore_keyword_app from a keyword search over the records.
+ */
+(function() {
+    'use strict';
+
+    document.addEventListener('DOMContentLoaded', function() {
+        // jQuery ready handlers run in order: this one runs after the one of
+        // search.js, which initializes the search box
+        $(initializeSearchSuggestions);
+    });
+
+    function initializeSearchSuggestions() {
+        const suggestionsUrl = $('#nx-search-suggestions-url').text();
+        const tagit = $('#id_keywords').data('ui-tagit');
+
+        if (!suggestionsUrl || !tagit) {
+            return;
+        }
+
+        tagit.tagInput.autocomplete('option', 'source', function(request, response) {
+            $.ajax({
+                type: 'GET',
+                url: suggestionsUrl,
+                data: { term: request.term },
+                dataType: 'json',
+                success: function(data) {
+                    response(data.suggestions);
+                },
+                error: function() {
+                    response([]);
+                }
+            });
+        });
+    }
+
+})();
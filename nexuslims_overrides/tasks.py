@@ -0,0 +1,146 @@
+""" NexusLIMS Celery tasks
+"""
+import logging
+
+from celery import chord, shared_task
+from django.conf import settings
+
+from core_main_app.components.data.models import Data
+
+from nexuslims_overrides.prerender import (
+    add_rerender_progress,
+    finish_rerender_progress,
+    format_rerender_progress,
+    get_prerendered_data_chunks,
+    prerender_data,
+    prerender_data_chunk,
+    publish_staged_stylesheets,
+    start_rerender_progress,
+)
+from nexuslims_overrides.render_cache import (
+    get_published_stylesheet_hashes,
+    get_stylesheet_hashes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prerender_data_task(data_id):
+    """Render the detail and list views of a data and store them, with the
+    published stylesheets and, while stylesheet changes are staged, with
+    the new ones as well
+
+    Args:
+        data_id: id of the data
+
+    """
+    try:
+        data = Data.objects.select_related("template").get(pk=data_id)
+    except Data.DoesNotExist:
+        # deleted before the task ran
+        logger.info(f"Data {data_id} no longer exists, not pre-rendering it")
+        return
+
+    try:
+        prerender_data(data)
+        if get_published_stylesheet_hashes():
+            prerender_data(data, staged=True)
+    except Exception as e:
+        # e.g. the record cannot be rendered, it is displayed as its XML
+        logger.warning(f"Could not pre-render data {data_id}: {e}")
+
+
+@shared_task
+def prerender_data_chunk_task(data_ids, run_id=None):
+    """Render the detail and list views of a chunk of data and store them
+
+    Args:
+        data_ids: ids of the data
+        run_id: id of the re-rendering run the chunk belongs to, whose
+            progress is updated (see start_rerender_progress)
+
+    Returns:
+        tuple: number of data rendered, number of data that failed
+
+    """
+    rendered, failed = prerender_data_chunk(data_ids)
+    logger.info(
+        f"Pre-rendered {rendered} data ({failed} failed), "
+        f"ids {data_ids[0]} to {data_ids[-1]}"
+    )
+    if run_id is not None:
+        progress = add_rerender_progress(run_id, rendered, failed)
+        if progress is not None:
+            logger.info(
+                "Re-rendering: "
+                + format_rerender_progress(
+                    progress["processed"], progress["total"], progress["elapsed"]
+                )
+            )
+    return rendered, failed
+
+
+@shared_task
+def finish_rerender_task(results, run_id, rendered_hashes):
+    """Report the totals and throughput of a re-rendering run, once all its
+    chunks are rendered, and release the staged stylesheet changes
+
+    Args:
+        results: (rendered, failed) tuples of the chunks
+        run_id: id of the run (see start_rerender_progress)
+        rendered_hashes: XslTransformation id -> hash of the content the
+            data were rendered with (see publish_staged_stylesheets)
+
+    Returns:
+        tuple: number of data rendered, number of data that failed
+
+    """
+    rendered = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    progress = finish_rerender_progress(run_id)
+    elapsed = progress["elapsed"] if progress is not None else 0
+    rate = (rendered + failed) / elapsed if elapsed else 0
+    logger.info(
+        f"Re-rendered {rendered} records ({failed} failed) in {elapsed:.0f}s "
+        f"({rate:.1f} records/s)"
+    )
+    # task arguments are serialized as JSON, whose object keys are strings
+    publish_staged_stylesheets(
+        {int(pk): value for pk, value in rendered_hashes.items()}
+    )
+    return rendered, failed
+
+
+@shared_task
+def rerender_all_data_task(chunk_size=None):
+    """Render every data again, e.g. after a stylesheet was changed
+
+    The data are split in chunks rendered in parallel by the Celery workers
+    (see the rerender_records management command to use a local process
+    pool instead). Each chunk logs the progress and throughput of the run,
+    which is also kept in the cache (see get_rerender_progress, and
+    "python manage.py rerender_records --status"), and the totals are
+    logged once every chunk is rendered. The staged stylesheet changes are
+    then released (see publish_staged_stylesheets).
+
+    Args:
+        chunk_size: number of data per chunk (default: NX_RERENDER_CHUNK_SIZE)
+
+    Returns:
+        str: id of the run
+
+    """
+    chunk_size = chunk_size or getattr(settings, "NX_RERENDER_CHUNK_SIZE", 50)
+    rendered_hashes = get_stylesheet_hashes()
+    chunks = get_prerendered_data_chunks(chunk_size)
+    run_id = start_rerender_progress(sum(len(chunk) for chunk in chunks))
+    logger.info(f"Re-rendering data in {len(chunks)} chunks (run {run_id})")
+    if not chunks:
+        finish_rerender_progress(run_id)
+        publish_staged_stylesheets(rendered_hashes)
+        return run_id
+    chord(
+        prerender_data_chunk_task.s(chunk, run_id) for chunk in chunks
+    )(finish_rerender_task.s(run_id, rendered_hashes))
+    return run_id
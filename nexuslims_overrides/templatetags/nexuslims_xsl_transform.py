@@ -10,10 +10,18 @@ Changes from core_main_app version:
 4. Specifically handles detail_url for list views and xmlName for detail views
 """
 
+import logging
+import os
+import time
+
 from django import template
 from django.conf import settings
 from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
 
+from core_explore_common_app.templatetags.result_to_html import (
+    result_list_html,
+)
 from core_main_app.commons import exceptions
 from core_main_app.components.template_xsl_rendering import (
     api as template_xsl_rendering_api,
@@ -24,11 +32,60 @@ from core_main_app.components.xsl_transformation import (
 from core_main_app.settings import DEFAULT_DATA_RENDERING_XSLT
 from core_main_app.utils.file import read_file_content
 
+from nexuslims_overrides.dataset_table import is_dataset_table_server_side
+from nexuslims_overrides.metrics import (
+    clear_stylesheet_names,
+    set_stylesheet_name,
+)
+from nexuslims_overrides.record_summary import (
+    get_record_summary,
+    get_stored_record_summaries,
+    get_summary_item_params,
+    get_summary_xslt_params,
+    store_render_time,
+)
+from nexuslims_overrides.render_cache import (
+    get_render,
+    get_render_cache,
+    get_render_failure,
+    get_render_failure_timeout,
+    get_render_failures,
+    get_renders,
+    get_published_stylesheet,
+    get_stylesheet_config_version,
+    has_stored_render,
+    is_prerender_enabled,
+    is_render_cache_enabled,
+    make_render_cache_key,
+    make_render_failure_key,
+    set_cached_render,
+    set_render_failure,
+    store_render,
+)
 # Use custom xsl_transform that supports parameter passing
-from nexuslims_overrides.xml import xsl_transform
+from nexuslims_overrides.xml import (
+    get_content_hash,
+    get_stylesheet_hash,
+    is_batch_aware,
+    xsl_transform,
+    xsl_transform_batch,
+)
+
+logger = logging.getLogger(__name__)
 
 register = template.Library()
 
+# Stylesheet content resolved for each (xslt type, template id, template hash,
+# xslt id, staged), see _get_xslt_string. Entries are dropped when the shared
+# stylesheet configuration version changes (XslTransformation or
+# TemplateXslRendering saved or deleted, in any process), which is checked at
+# most every NX_STYLESHEET_VERSION_CHECK_INTERVAL seconds.
+_xslt_string_cache = {}
+_xslt_string_cache_version = None
+_xslt_string_cache_checked_at = None
+# Content of the default data rendering XSLT, read once per process
+_default_xslt_string = None
+
 
 class XSLType:
     """XSLType"""
@@ -37,6 +94,22 @@ class XSLType:
     type_detail = "Detail"
 
 
+class RenderStrategy:
+    """Ways of rendering the detail view of a record (see
+    select_render_strategy)"""
+
+    # every activity rendered in the page
+    full = "full"
+    # table of datasets instead of the activities
+    simple = "simple"
+    # activities loaded when displayed (see views.activity_fragment)
+    lazy = "lazy"
+    # every activity rendered in the page, but never while a page is
+    # requested: only pre-rendered or cached renderings are served, and a
+    # placeholder waits for the queued rendering
+    cached_only = "cached-only"
+
+
 @register.simple_tag(name="xsl_transform_list")
 def render_xml_as_html_list(*args, **kwargs):
     """Render an XML to HTML using the list xslt.
@@ -59,9 +132,215 @@ def render_xml_as_html_list(*args, **kwargs):
     if 'detail_url' in kwargs:
         kwargs['detail_url'] = f"\"{kwargs['detail_url']}\""
 
+    # List renderings only depend on the record content (plus the stylesheet
+    # and XSLT parameters such as detail_url), so cache them by content hash
+    if kwargs.get('xml_content'):
+        kwargs['render_cache_id'] = get_content_hash(kwargs['xml_content'])
+        kwargs['summarize'] = True
+
     return _render_xml_as_html(XSLType.type_list, *args, **kwargs)
 
 
+@register.simple_tag(name="xsl_transform_list_batch")
+def render_xml_as_html_list_batch(results):
+    """Render the list view of a page of search results.
+
+    When NX_LIST_BATCH_RENDERING is enabled, the results that are not in the
+    rendered-HTML cache are transformed together, in a single XSLT pass per
+    list stylesheet (see xsl_transform_batch). Otherwise, or if the
+    stylesheet is not batch-aware, each result is rendered on its own with
+    render_xml_as_html_list.
+
+    Args:
+        results: list of results (Result objects or dicts)
+
+    Returns:
+        list: (result, html_string) tuples, in the order of results. The
+        html_string is None for non-XSD results without an HTML rendering
+
+    """
+    html_strings = [None] * len(results)
+    # (template_id, template_hash) -> indices of results to transform
+    pending = {}
+
+    for index, result in enumerate(results):
+        # Custom HTML renderings configured for the template take precedence
+        html_strings[index] = result_list_html(result)
+        template_info = _get_result_field(result, "template_info") or {}
+        if html_strings[index] or template_info.get("format") != "XSD":
+            continue
+
+        if getattr(settings, "NX_LIST_BATCH_RENDERING", True):
+            template_key = (template_info.get("id"), template_info.get("hash"))
+            pending.setdefault(template_key, []).append(index)
+        else:
+            html_strings[index] = _render_result_list_html(result)
+
+    for (template_id, template_hash), indices in pending.items():
+        _render_list_batch(
+            [results[index] for index in indices],
+            template_id,
+            template_hash,
+            html_strings,
+            indices,
+        )
+
+    return list(zip(results, html_strings))
+
+
+def _render_list_batch(results, template_id, template_hash, html_strings, indices):
+    """Render the list view of results sharing the same template, storing
+    the output of results[i] in html_strings[indices[i]].
+
+    Args:
+        results: list of results using the same template
+        template_id (str): Template ID for XSLT lookup
+        template_hash (str): Template hash for XSLT lookup
+        html_strings: list of rendered HTML of the whole page
+        indices: position of each result in html_strings
+
+    """
+    try:
+        xslt_string = _get_xslt_string(
+            XSLType.type_list, template_id, template_hash, None
+        )
+    except Exception:
+        xslt_string = None
+
+    if not xslt_string or not is_batch_aware(xslt_string):
+        for result, index in zip(results, indices):
+            html_strings[index] = _render_result_list_html(result)
+        return
+
+    settings_params = _get_settings_xslt_params()
+    cache_keys = []
+    for result in results:
+        # Same parameters as render_xml_as_html_list, so that batched and
+        # single renderings share their cache entries
+        xslt_params = dict(settings_params)
+        if _get_result_field(result, "detail_url"):
+            xslt_params['detail_url'] = (
+                f"\"{_get_result_field(result, 'detail_url')}\""
+            )
+        cache_keys.append(
+            make_render_cache_key(
+                XSLType.type_list,
+                get_content_hash(_get_result_field(result, "content") or ""),
+                xslt_string,
+                xslt_params,
+            )
+        )
+
+    cached = get_renders(cache_keys)
+    missing = []
+    for result, index, cache_key in zip(results, indices, cache_keys):
+        if cache_key in cached:
+            html_strings[index] = cached[cache_key]
+        else:
+            missing.append((result, index, cache_key))
+
+    # Records known to fail are displayed as their XML, like
+    # _render_xml_as_html does, without being parsed for the batch
+    failure_keys = [
+        make_render_failure_key(
+            XSLType.type_list,
+            _get_result_field(result, "content") or "",
+            xslt_string,
+        )
+        for result, _, _ in missing
+    ]
+    failures = get_render_failures(failure_keys)
+    if failures:
+        remaining = []
+        for item, failure_key in zip(missing, failure_keys):
+            if failure_key in failures:
+                result, index, _ = item
+                html_strings[index] = _get_result_field(result, "content")
+            else:
+                remaining.append(item)
+        missing = remaining
+
+    if not missing:
+        return
+
+    try:
+        # The summaries stored for the records are passed along, the
+        # stylesheet computes the values of the others
+        contents = [
+            _get_result_field(result, "content") or "" for result, _, _ in missing
+        ]
+        content_hashes = [get_content_hash(content) for content in contents]
+        summaries = get_stored_record_summaries(content_hashes)
+        batch_items = []
+        for (result, _, _), content, content_hash in zip(
+            missing, contents, content_hashes
+        ):
+            item_params = {}
+            if _get_result_field(result, "detail_url"):
+                item_params["detail_url"] = _get_result_field(
+                    result, "detail_url"
+                )
+            summary = summaries.get(content_hash)
+            if summary is not None:
+                item_params.update(get_summary_item_params(summary))
+            batch_items.append((content, item_params))
+        outputs = xsl_transform_batch(
+            batch_items,
+            xslt_string,
+            xslt_type=XSLType.type_list,
+            **settings_params,
+        )
+    except Exception:
+        outputs = [None] * len(missing)
+
+    for (result, index, cache_key), html_string in zip(missing, outputs):
+        if html_string is None:
+            # Not rendered in the batch: render on its own, which falls back
+            # to the raw XML if the record cannot be transformed
+            html_strings[index] = _render_result_list_html(result)
+            continue
+        html_strings[index] = html_string
+        set_cached_render(cache_key, html_string)
+
+
+def _render_result_list_html(result):
+    """Render the list view of a single result.
+
+    Args:
+        result: Result object or dict
+
+    Returns:
+        str: Transformed HTML
+
+    """
+    template_info = _get_result_field(result, "template_info") or {}
+    kwargs = {
+        "xml_content": _get_result_field(result, "content"),
+        "template_id": template_info.get("id"),
+        "template_hash": template_info.get("hash"),
+    }
+    if _get_result_field(result, "detail_url"):
+        kwargs["detail_url"] = _get_result_field(result, "detail_url")
+    return render_xml_as_html_list(**kwargs)
+
+
+def _get_result_field(result, field):
+    """Get a field of a result, which is a Result object for local results
+    and a dict for remote ones.
+
+    Args:
+        result: Result object or dict
+        field (str): name of the field
+
+    Returns:
+        value of the field, or None
+
+    """
+    if isinstance(result, dict):
+        return result.get(field)
+    return getattr(result, field, None)
+
+
 @register.simple_tag(name="xsl_transform_detail")
 def render_xml_as_html_detail(*args, **kwargs):
     """Render an XML to HTML using the detail xslt.
@@ -74,6 +353,20 @@ def render_xml_as_html_detail(*args, **kwargs):
             template_hash (str, optional): Template hash for XSLT lookup
             xslt_id (str, optional): Direct XSLT transformation ID
             xmlName (str, optional): Name of the XML document (passed to XSLT)
+            data_id (str, optional): ID of the data (passed to XSLT)
+            last_modification_date (datetime, optional): Last modification
+                date of the data; together with data_id, enables the
+                shared rendered-HTML cache
+            activityIndex (str, optional): Number of the activity to render
+                on its own (from 1), instead of the whole record
+            render_pending (bool, optional): If False, None is returned
+                instead of the placeholder of a record being rendered ahead
+                of time (see views.render_status)
+            render_strategy (str, optional): RenderStrategy to render with,
+                instead of the one selected for the record (with data_id)
+            measure_render (bool, optional): If False, the duration of a full
+                rendering is not stored in the record summary (e.g. when
+                profiling)
             **extra: Additional parameters passed to XSLT
 
     Returns:
@@ -85,8 +378,31 @@ def render_xml_as_html_detail(*args, **kwargs):
         kwargs['xmlName'] = f"\"{kwargs['xmlName']}\""
 
     # Add data ID if provided
+    last_modification_date = kwargs.pop('last_modification_date', None)
+    render_strategy = kwargs.pop('render_strategy', None)
     if 'data_id' in kwargs:
-        kwargs['dataId'] = f"\"{kwargs.pop('data_id')}\""
+        data_id = kwargs.pop('data_id')
+        kwargs['dataId'] = f"\"{data_id}\""
+        kwargs['summarize'] = True
+        kwargs['summary_data_id'] = data_id
+        # The simple display loads the dataset rows from the server
+        if is_dataset_table_server_side():
+            try:
+                from django.urls import reverse
+                rows_url = reverse('nexuslims_dataset_rows', args=[data_id])
+                kwargs['datasetRowsUrl'] = f"\"{rows_url}\""
+            except Exception:
+                # Without the URL, the rows are rendered in the page
+                pass
+        kwargs.update(
+            _get_render_strategy_params(data_id, kwargs, render_strategy)
+        )
+        # A record's rendering only changes when its content does, so
+        # the (id, last modification date) pair identifies the render
+        if last_modification_date:
+            kwargs['render_cache_id'] = (
+                f"{data_id}@{last_modification_date.isoformat()}"
+            )
 
     # Add permission URL if request is provided
     if 'request' in kwargs:
@@ -101,6 +417,215 @@ def render_xml_as_html_detail(*args, **kwargs):
     return _render_xml_as_html(XSLType.type_detail, *args, **kwargs)
 
 
+def select_render_strategy(xml_string, summary):
+    """Select how to render the detail view of a record, from the size of the
+    record, its number of datasets and the duration of its last full
+    rendering, compared with the NX_RENDER_* thresholds.
+
+    Args:
+        xml_string: content of the record
+        summary: record summary (see get_record_summary)
+
+    Returns:
+        tuple: RenderStrategy value, and the reason it was selected
+
+    """
+    size = len(xml_string)
+    render_seconds = summary.get("render_seconds")
+
+    max_seconds = getattr(settings, "NX_RENDER_CACHED_ONLY_SECONDS", 30)
+    if max_seconds and render_seconds is not None and render_seconds >= max_seconds:
+        return RenderStrategy.cached_only, (
+            f"last full rendering took {render_seconds:.2f}s "
+            f"(NX_RENDER_CACHED_ONLY_SECONDS = {max_seconds})"
+        )
+    max_size = getattr(settings, "NX_RENDER_CACHED_ONLY_SIZE", 2000000)
+    if max_size and size >= max_size:
+        return RenderStrategy.cached_only, (
+            f"record size is {size} (NX_RENDER_CACHED_ONLY_SIZE = {max_size})"
+        )
+
+    max_datasets = int(getattr(settings, "NX_MAX_DATASET_DISPLAY_COUNT", 100))
+    if max_datasets > 0 and summary["dataset_count"] > max_datasets:
+        return RenderStrategy.simple, (
+            f"record has {summary['dataset_count']} datasets "
+            f"(NX_MAX_DATASET_DISPLAY_COUNT = {max_datasets})"
+        )
+
+    if getattr(settings, "NX_LAZY_ACTIVITIES", False):
+        return RenderStrategy.lazy, "NX_LAZY_ACTIVITIES is enabled"
+    lazy_seconds = getattr(settings, "NX_RENDER_LAZY_SECONDS", 5)
+    if lazy_seconds and render_seconds is not None and render_seconds >= lazy_seconds:
+        return RenderStrategy.lazy, (
+            f"last full rendering took {render_seconds:.2f}s "
+            f"(NX_RENDER_LAZY_SECONDS = {lazy_seconds})"
+        )
+    lazy_size = getattr(settings, "NX_RENDER_LAZY_SIZE", 10000000)
+    if lazy_size and size >= lazy_size:
+        return RenderStrategy.lazy, (
+            f"record size is {size} (NX_RENDER_LAZY_SIZE = {lazy_size})"
+        )
+
+    return RenderStrategy.full, "record is below every threshold"
+
+
+def _get_render_strategy_params(data_id, kwargs, strategy=None):
+    """Select the rendering strategy of the detail view of a data, and get
+    the XSLT parameters (and rendering options) implementing it.
+
+    Args:
+        data_id: id of the data
+        kwargs: keyword arguments of the detail tag
+        strategy: RenderStrategy to use instead of selecting one
+
+    Returns:
+        dict: keyword arguments to add to those of the detail tag
+
+    """
+    xml_string = kwargs.get('xml_content', '')
+    if 'activityIndex' in kwargs:
+        # An activity is only rendered on its own for a lazy page
+        strategy, reason = RenderStrategy.lazy, "rendering a single activity"
+        summary = None
+    else:
+        try:
+            summary = get_record_summary(xml_string, data_id=data_id)
+            if strategy is None:
+                strategy, reason = select_render_strategy(xml_string, summary)
+            else:
+                reason = "requested by the caller"
+        except Exception as e:
+            # e.g. the record cannot be parsed, so it cannot be rendered
+            # either: leave the display to the stylesheet
+            logger.warning(f"Could not select a rendering strategy for data {data_id}: {e}")
+            return {}
+        logger.info(f"Rendering data {data_id} with the {strategy} strategy: {reason}")
+
+    params = {}
+    if strategy == RenderStrategy.lazy:
+        try:
+            from django.urls import reverse
+            fragment_url = reverse('nexuslims_activity_fragment', args=[data_id])
+            params['activityFragmentUrl'] = f"\"{fragment_url}\""
+        except Exception:
+            # Without the URL, the activities are rendered in the page
+            strategy = RenderStrategy.full
+    # cached-only records are fully rendered, in the background
+    xslt_strategy = (
+        RenderStrategy.full if strategy == RenderStrategy.cached_only else strategy
+    )
+    params.update(
+        renderStrategy=f"\"{xslt_strategy}\"",
+        render_strategy=strategy,
+        summary=summary,
+    )
+    return params
+
+
+def _queue_render(data_id, cache_key):
+    """Queue the pre-rendering of a data whose detail view is only rendered
+    ahead of time, unless it was already queued (for all the visitors).
+
+    A rendering that cannot be queued (e.g. the Celery broker is down), or
+    that is still not stored NX_RENDER_POLL_TIMEOUT seconds after it was
+    queued (e.g. no Celery worker is running), is considered lost: it is
+    only queued again after NX_RENDER_FAILURE_TIMEOUT more seconds.
+
+    Args:
+        data_id: id of the data
+        cache_key: key of the pending rendering
+
+    Returns:
+        bool: True if the rendering is pending, False if it is lost
+
+    """
+    poll_timeout = getattr(settings, "NX_RENDER_POLL_TIMEOUT", 600)
+    queued_key = f"nx:render-queued:{cache_key}"
+    timeout = poll_timeout + get_render_failure_timeout()
+    cache = get_render_cache()
+    try:
+        queued_at = cache.get(queued_key)
+        if queued_at is None and not cache.add(
+            queued_key, time.time(), timeout=timeout
+        ):
+            # queued by another visitor in the meantime
+            return True
+    except Exception as e:
+        logger.warning(f"Could not check pending rendering of data {data_id}: {e}")
+        queued_at = None
+    if queued_at is not None:
+        return time.time() - queued_at < poll_timeout
+
+    from nexuslims_overrides.tasks import prerender_data_task
+    try:
+        prerender_data_task.delay(data_id)
+    except Exception as e:
+        logger.warning(f"Could not queue rendering of data {data_id}: {e}")
+        try:
+            # lost, so that the next visitors do not wait for the broker
+            cache.set(queued_key, 0, timeout=timeout)
+        except Exception:
+            pass
+        return False
+    return True
+
+
+def _render_pending_html(data_id):
+    """Get the HTML displayed instead of the detail view of a data while it is
+    rendered ahead of time, which polls the nexuslims_render_status view and
+    reloads the page when the rendering is ready.
+
+    Args:
+        data_id: id of the data
+
+    Returns:
+        str: HTML of the placeholder
+
+    """
+    try:
+        from django.urls import reverse
+        status_url = reverse('nexuslims_render_status', args=[data_id])
+    except Exception:
+        # Without the URL, the visitor reloads the page
+        status_url = ""
+    return render_to_string(
+        "nexuslims_overrides/fragments/render_pending.html",
+        {
+            "status_url": status_url,
+            "poll_interval": getattr(settings, "NX_RENDER_POLL_INTERVAL", 3),
+            "poll_timeout": getattr(settings, "NX_RENDER_POLL_TIMEOUT", 600),
+        },
+    )
+
+
+def get_data_render_failures(data):
+    """Get the render failures known for the detail and list views of a data
+    (see the report_render_failures management command).
+
+    Args:
+        data: Data, with an XSD template
+
+    Returns:
+        dict: XSLType value -> failure (see render_cache.set_render_failure),
+        for the views known to fail with the current stylesheets
+
+    """
+    failure_keys = {}
+    for xslt_type in (XSLType.type_detail, XSLType.type_list):
+        xslt_string = _get_xslt_string(
+            xslt_type, data.template.id, data.template.hash, None
+        )
+        failure_keys[xslt_type] = make_render_failure_key(
+            xslt_type, data.content, xslt_string
+        )
+    failures = get_render_failures(list(failure_keys.values()))
+    return {
+        xslt_type: failures[failure_key]
+        for xslt_type, failure_key in failure_keys.items()
+        if failure_key in failures
+    }
+
+
 def _render_xml_as_html(xslt_type, *args, **kwargs):
     """Render an XML to HTML according to an xslt type (list or detail).
 
@@ -110,11 +635,42 @@ def _render_xml_as_html(xslt_type, *args, **kwargs):
         template_hash (str, optional): Template hash for XSLT lookup
         xslt_type (str): Type of XSLT (list or detail)
         xsl_transform_id (str, optional): Direct XSLT transformation ID
+        render_cache_id (str, optional): Identifier of the record version
+            being rendered. If provided, the output is stored in (and read
+            from) the shared rendered-HTML cache
+        prerender_data_id (str, optional): ID of the data being pre-rendered.
+            If provided (with render_cache_id), the output is stored in the
+            database unless a current rendering is already stored, and a
+            rendering that fails raises instead of returning the XML
+        staged_stylesheet (bool, optional): If True, render with the current
+            content of the stylesheet, rather than the published one while a
+            change to it is staged (see render_cache.hold_published_stylesheet)
+        summarize (bool, optional): If True, the values of the record
+            summary are passed to the XSLT
+        summary_data_id (str, optional): ID of the data being rendered, used
+            to store its record summary
+        summary (dict, optional): Record summary, if already looked up
+        render_strategy (str, optional): RenderStrategy of a detail
+            rendering. A cached-only rendering that is not cached is queued
+            instead of rendered (unless pre-rendering, or if the queued
+            rendering is lost, in which case the simple display is rendered),
+            and the duration of full renderings is stored in the record
+            summary
+        render_pending (bool, optional): If False, None is returned instead
+            of the placeholder of a queued cached-only rendering
+        measure_render (bool, optional): If False, the duration of a full
+            rendering is not stored in the record summary
         **kwargs: Additional keyword arguments passed to XSLT transformer
             These become XSLT parameters accessible in the stylesheet
 
     Returns:
-        str: Transformed HTML, or original XML string on error
+        str: Transformed HTML, or original XML string on error (None when
+        pre-rendering a data whose current rendering is already stored, or
+        when a cached-only rendering is queued and render_pending is False)
+
+    Raises:
+        CoreError: if pre-rendering and the record fails to render, or is
+            known to fail (see set_render_failure)
 
     """
     # NexusLIMS: pop these kwargs instead of get so they're not in kwargs
@@ -125,6 +681,144 @@ def _render_xml_as_html(xslt_type, *args, **kwargs):
     template_hash = kwargs.pop("template_hash", None)
     xsl_transform_id = kwargs.pop("xslt_id", None)
     request = kwargs.pop("request", None)
+    render_cache_id = kwargs.pop("render_cache_id", None)
+    prerender_data_id = kwargs.pop("prerender_data_id", None)
+    summarize = kwargs.pop("summarize", False)
+    summary_data_id = kwargs.pop("summary_data_id", None)
+    summary = kwargs.pop("summary", None)
+    render_strategy = kwargs.pop("render_strategy", None)
+    render_pending = kwargs.pop("render_pending", True)
+    measure_render = kwargs.pop("measure_render", True)
+    staged_stylesheet = kwargs.pop("staged_stylesheet", False)
+
+    # Add XSLT parameters derived from NexusLIMS settings
+    kwargs.update(_get_settings_xslt_params())
+
+    # Extract useful string values from request if provided
+    # (request object itself can't be serialized for XSLT)
+    if request:
+        pass
+        # Could add base URL or other request info as XSLT parameters if needed
+        # e.g., kwargs['baseUrl'] = f'"{request.build_absolute_uri("/")}"'
+
+    # NexusLIMS custom parameters xmlName and detail_url are
+    # still in kwargs and should be passed to xsl_transform()
+
+    try:
+        xslt_string = _get_xslt_string(
+            xslt_type,
+            template_id,
+            template_hash,
+            xsl_transform_id,
+            staged=staged_stylesheet,
+        )
+
+        cache_key = None
+        if render_cache_id:
+            cache_key = make_render_cache_key(
+                xslt_type, render_cache_id, xslt_string, kwargs
+            )
+            if prerender_data_id is None:
+                html_string = get_render(cache_key)
+                if html_string is not None:
+                    return html_string
+            elif has_stored_render(prerender_data_id, xslt_type, cache_key):
+                return None
+
+        # A record known to fail with this stylesheet fails again
+        failure_key = make_render_failure_key(xslt_type, xml_string, xslt_string)
+        if get_render_failure(failure_key) is not None:
+            if prerender_data_id is not None:
+                raise exceptions.CoreError(
+                    "The record is known to fail to render with this "
+                    "stylesheet (see report_render_failures)"
+                )
+            return xml_string
+
+        # The queued rendering is found by the key (stored in the cache and
+        # the database), so the record is rendered here if it cannot be
+        if (
+            render_strategy == RenderStrategy.cached_only
+            and cache_key
+            and prerender_data_id is None
+            and (is_render_cache_enabled() or is_prerender_enabled())
+        ):
+            if _queue_render(summary_data_id, cache_key):
+                if render_pending:
+                    return _render_pending_html(summary_data_id)
+                return None
+            # The rendering is lost (see _queue_render): display the record
+            # like a simple one, which is cheap enough to render here
+            render_strategy = RenderStrategy.simple
+            kwargs['renderStrategy'] = f"\"{RenderStrategy.simple}\""
+            cache_key = make_render_cache_key(
+                xslt_type, render_cache_id, xslt_string, kwargs
+            )
+            html_string = get_render(cache_key)
+            if html_string is not None:
+                return html_string
+
+        try:
+            # Detail views already looked the summary up to select their
+            # rendering strategy, which is part of the cache key (so a cache
+            # hit still costs a summary lookup). The list views only look it
+            # up when rendering: it is derived from the record content, which
+            # their cache key already identifies
+            if summarize:
+                if summary is None:
+                    summary = get_record_summary(xml_string, data_id=summary_data_id)
+                kwargs.update(get_summary_xslt_params(summary))
+
+            # Pass kwargs through to xsl_transform to enable XSLT parameters
+            start = time.perf_counter()
+            html_string = xsl_transform(
+                xml_string, xslt_string, xslt_type=xslt_type, **kwargs
+            )
+            render_seconds = time.perf_counter() - start
+        except Exception as e:
+            set_render_failure(
+                failure_key, e, data_id=summary_data_id or prerender_data_id
+            )
+            raise
+    except Exception:
+        # pre-renderings are counted as failed by their callers, rather
+        # than storing the XML
+        if prerender_data_id is not None:
+            raise
+        return xml_string
+
+    # Measure full renderings (including the cached-only ones, rendered
+    # ahead of time), which select_render_strategy compares with the
+    # NX_RENDER_*_SECONDS thresholds
+    if (
+        render_strategy in (RenderStrategy.full, RenderStrategy.cached_only)
+        and summary_data_id is not None
+        and measure_render
+    ):
+        store_render_time(summary_data_id, render_seconds)
+
+    # Errors storing a pre-rendering are left to the caller
+    if cache_key and prerender_data_id is not None:
+        store_render(
+            prerender_data_id,
+            xslt_type,
+            cache_key,
+            html_string,
+            get_stylesheet_hash(xslt_string),
+        )
+    elif cache_key:
+        set_cached_render(cache_key, html_string)
+    return html_string
+
+
+def _get_settings_xslt_params():
+    """Get the XSLT parameters derived from NexusLIMS settings.
+
+    Returns:
+        dict: XSLT parameters (as XPath string literals)
+
+    """
+    xslt_params = {}
 
     # Add instrument color mappings from Django settings
     if hasattr(settings, 'NX_INSTRUMENT_COLOR_MAPPINGS'):
@@ -133,69 +827,159 @@ def _render_xml_as_html(xslt_type, *args, **kwargs):
         # Create the format XSLT expects: '"pid1":"color1","pid2":"color2"'
         # Wrap the entire string in single quote to make it a valid XPath string literal
         xslt_format = ",".join([f"\"{pid}\":\"{color}\"" for pid, color in color_mappings.items()])
-        kwargs['instrColorMappings'] = f"'{xslt_format}'"
+        xslt_params['instrColorMappings'] = f"'{xslt_format}'"
 
     # Add max dataset display count from Django settings
     if hasattr(settings, 'NX_MAX_DATASET_DISPLAY_COUNT'):
         try:
             max_count = int(settings.NX_MAX_DATASET_DISPLAY_COUNT)
             xslt_format = f'"{max_count}"'
-            kwargs['maxDatasetCount'] = xslt_format
+            xslt_params['maxDatasetCount'] = xslt_format
         except ValueError as e:
             print(f"WARNING: Could not parse NX_MAX_DATASET_DISPLAY_COUNT setting: {e}")
 
-    # Extract useful string values from request if provided
-    # (request object itself can't be serialized for XSLT)
-    if request:
-        pass
-        # Could add base URL or other request info as XSLT parameters if needed
-        # e.g., kwargs['baseUrl'] = f'"{request.build_absolute_uri("/")}"'
+    return xslt_params
 
-    # NexusLIMS custom parameters xmlName and detail_url are
-    # still in kwargs and should be passed to xsl_transform()
 
+def clear_xslt_string_cache():
+    """Drop the stylesheets resolved by this process, and the names recorded
+    for their metrics."""
+    _xslt_string_cache.clear()
+    clear_stylesheet_names()
+
+
+def _get_default_xslt_string():
+    """Get the content of the default data rendering XSLT.
+
+    Returns:
+        str: XSLT content, read from disk on first use only
+
+    """
+    global _default_xslt_string
+    if _default_xslt_string is None:
+        default_xslt_path = finders.find(DEFAULT_DATA_RENDERING_XSLT)
+        _default_xslt_string = read_file_content(default_xslt_path)
+    # recorded again after the names are cleared with the resolved stylesheets
+    set_stylesheet_name(
+        _default_xslt_string, os.path.basename(DEFAULT_DATA_RENDERING_XSLT)
+    )
+    return _default_xslt_string
+
+
+def _get_xslt_string(
+    xslt_type, template_id, template_hash, xsl_transform_id, staged=False
+):
+    """Get the content of the stylesheet to use for a rendering.
+
+    Args:
+        xslt_type (str): Type of XSLT (list or detail)
+        template_id (str): Template ID for XSLT lookup
+        template_hash (str): Template hash for XSLT lookup
+        xsl_transform_id (str): Direct XSLT transformation ID
+        staged (bool): If True, get the current content of the XSLT rather
+            than the published one while a change to it is staged
+
+    Returns:
+        str: XSLT content, or the default data rendering XSLT if none is
+        configured for the template
+
+    """
+    # In development, the default per-process cache cannot propagate changes
+    # made from another process (e.g. update-xslt.sh), so always look up
+    if settings.DEBUG:
+        return _resolve_xslt_string(
+            xslt_type, template_id, template_hash, xsl_transform_id, staged
+        )
+
+    # The shared version is read from the cache, so it is only checked
+    # periodically rather than on every render
+    global _xslt_string_cache_version, _xslt_string_cache_checked_at
+    now = time.monotonic()
+    interval = getattr(settings, "NX_STYLESHEET_VERSION_CHECK_INTERVAL", 5)
+    if (
+        _xslt_string_cache_checked_at is None
+        or now - _xslt_string_cache_checked_at >= interval
+    ):
+        version = get_stylesheet_config_version()
+        if version is None or version != _xslt_string_cache_version:
+            clear_xslt_string_cache()
+        _xslt_string_cache_version = version
+        _xslt_string_cache_checked_at = now
+    version = _xslt_string_cache_version
+
+    cache_key = (xslt_type, template_id, template_hash, xsl_transform_id, staged)
+    xslt_string = _xslt_string_cache.get(cache_key)
+    if xslt_string is None:
+        xslt_string = _resolve_xslt_string(
+            xslt_type, template_id, template_hash, xsl_transform_id, staged
+        )
+        # without a shared version, entries could not be invalidated
+        if version is not None:
+            _xslt_string_cache[cache_key] = xslt_string
+    return xslt_string
+
+
+def _resolve_xslt_string(
+    xslt_type, template_id, template_hash, xsl_transform_id, staged=False
+):
+    """Look up the content of the stylesheet to use for a rendering.
+
+    Args:
+        xslt_type (str): Type of XSLT (list or detail)
+        template_id (str): Template ID for XSLT lookup
+        template_hash (str): Template hash for XSLT lookup
+        xsl_transform_id (str): Direct XSLT transformation ID
+        staged (bool): If True, get the current content of the XSLT rather
+            than the published one while a change to it is staged
+
+    Returns:
+        str: XSLT content, or the default data rendering XSLT if none is
+        configured for the template
+
+    """
     try:
-        try:
-            if xslt_type not in (XSLType.type_list, XSLType.type_detail):
-                raise Exception(
-                    "XSLT Type unknown. Default xslt will be used."
-                )
-            if xsl_transform_id:
-                xsl_transformation = xsl_transformation_api.get_by_id(
-                    xsl_transform_id
-                )
-            elif template_id or template_hash:
-                if template_id:
-                    template_xsl_rendering = (
-                        template_xsl_rendering_api.get_by_template_id(
-                            template_id
-                        )
+        if xslt_type not in (XSLType.type_list, XSLType.type_detail):
+            raise Exception(
+                "XSLT Type unknown. Default xslt will be used."
+            )
+        if xsl_transform_id:
+            xsl_transformation = xsl_transformation_api.get_by_id(
+                xsl_transform_id
+            )
+        elif template_id or template_hash:
+            if template_id:
+                template_xsl_rendering = (
+                    template_xsl_rendering_api.get_by_template_id(
+                        template_id
                     )
-                else:
-                    template_xsl_rendering = (
-                        template_xsl_rendering_api.get_by_template_hash(
-                            template_hash
-                        )
+                )
+            else:
+                template_xsl_rendering = (
+                    template_xsl_rendering_api.get_by_template_hash(
+                        template_hash
                     )
+                )
 
-                if xslt_type == XSLType.type_list:
-                    xsl_transformation = template_xsl_rendering.list_xslt
-                else:
-                    xsl_transformation = (
-                        template_xsl_rendering.default_detail_xslt
-                    )
+            if xslt_type == XSLType.type_list:
+                xsl_transformation = template_xsl_rendering.list_xslt
             else:
-                raise Exception(
-                    "No template information provided. Default xslt will be used."
+                xsl_transformation = (
+                    template_xsl_rendering.default_detail_xslt
                 )
-
-            xslt_string = xsl_transformation.content
-
-        except (Exception, exceptions.DoesNotExist):
-            default_xslt_path = finders.find(DEFAULT_DATA_RENDERING_XSLT)
-            xslt_string = read_file_content(default_xslt_path)
-
-        # Pass kwargs through to xsl_transform to enable XSLT parameters
-        return xsl_transform(xml_string, xslt_string, **kwargs)
-    except Exception:
-        return xml_string
+        else:
+            raise Exception(
+                "No template information provided. Default xslt will be used."
+            )
+
+        xslt_string = xsl_transformation.content
+        if not staged:
+            # pages keep rendering with the published content until the
+            # records are pre-rendered with the new one
+            xslt_string = (
+                get_published_stylesheet(xsl_transformation.pk) or xslt_string
+            )
+        set_stylesheet_name(xslt_string, xsl_transformation.name)
+        return xslt_string
+
+    except (Exception, exceptions.DoesNotExist):
+        return _get_default_xslt_string()
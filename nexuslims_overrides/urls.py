@@ -9,4 +9,36 @@ from . import views
 urlpatterns = [
     # Override the tiles view from mdcs_home
     path('home/tiles', views.tiles, name='core_main_app_homepage_tiles'),
+    # XSLT rendering metrics, in the Prometheus text format
+    path('nexuslims/metrics', views.metrics, name='nexuslims_metrics'),
+    # Rows of the dataset table of a record, loaded page by page
+    path(
+        'nexuslims/data/<int:data_id>/datasets',
+        views.dataset_rows,
+        name='nexuslims_dataset_rows',
+    ),
+    # Details of an acquisition activity of a record, loaded when displayed
+    path(
+        'nexuslims/data/<int:data_id>/activity',
+        views.activity_fragment,
+        name='nexuslims_activity_fragment',
+    ),
+    # Whether the queued rendering of a record is ready, polled by its page
+    path(
+        'nexuslims/data/<int:data_id>/render-status',
+        views.render_status,
+        name='nexuslims_render_status',
+    ),
+    # Write permissions of the records of a search result page, at once
+    path(
+        'nexuslims/data/permissions',
+        views.data_permissions,
+        name='nexuslims_data_permissions',
+    ),
+    # Record names similar to a term, suggested by the keyword search box
+    path(
+        'nexuslims/search/suggestions',
+        views.search_suggestions,
+        name='nexuslims_search_suggestions',
+    ),
 ]
@@ -5,13 +5,53 @@ These views override or extend the default MDCS views.
 
 File overrides:
 - tiles() -> overrides mdcs_home/views.py::tiles()
+
+NexusLIMS views:
+- metrics() -> XSLT rendering metrics, in the Prometheus text format
+- dataset_rows() -> rows of the dataset table of a record, for DataTables
+- activity_fragment() -> details of an acquisition activity of a record
+- render_status() -> whether the queued rendering of a record is ready
+- data_permissions() -> whether the user can write each record of a page
+- search_suggestions() -> record names similar to a term, for the search box
 """
+import hmac
+import json
 import logging
 
 from django.conf import settings
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseServerError,
+    JsonResponse,
+)
 from django.shortcuts import render
 from django.urls import reverse
 
+from core_explore_keyword_app.permissions import rights
+from core_main_app.access_control.exceptions import AccessControlError
+from core_main_app.commons.exceptions import DoesNotExist
+from core_main_app.components.data import api as data_api
+from core_main_app.utils import decorators
+
+from nexuslims_overrides.dataset_table import (
+    MAX_PAGE_LENGTH,
+    format_dataset_row,
+    get_dataset_rows,
+    query_dataset_rows,
+)
+from nexuslims_overrides.fuzzy_search import (
+    get_name_suggestions,
+    is_fuzzy_search_enabled,
+)
+from nexuslims_overrides.metrics import render_metrics
+from nexuslims_overrides.permissions import get_data_write_permissions
+from nexuslims_overrides.record_summary import get_record_summary
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    render_xml_as_html_detail,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -81,3 +121,229 @@ def tiles(request):
         # context["tiles"].append(compose_tile)
 
     return render(request, "mdcs_home/tiles.html", context)
+
+
+def metrics(request):
+    """
+    XSLT rendering metrics of every application and Celery worker process,
+    in the Prometheus text format (see nexuslims_overrides/metrics.py).
+
+    Available to staff users, or to scrapers sending the NX_METRICS_TOKEN
+    setting as a bearer token.
+
+    :param request:
+    :return:
+    """
+    token = getattr(settings, "NX_METRICS_TOKEN", None)
+    authorization = request.headers.get("Authorization", "")
+    has_token = bool(token) and hmac.compare_digest(
+        authorization, f"Bearer {token}"
+    )
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _get_int_param(request, name, default):
+    """Read an integer query parameter, falling back to a default value"""
+    try:
+        return int(request.GET.get(name, default))
+    except ValueError:
+        return default
+
+
+def dataset_rows(request, data_id):
+    """
+    Rows of the dataset table of a record (simple display), in the DataTables
+    server-side processing format (see nexuslims_overrides/dataset_table.py).
+
+    Reads the draw, start, length, search[value], order[0][column] and
+    order[0][dir] parameters sent by DataTables.
+
+    :param request:
+    :param data_id:
+    :return:
+    """
+    try:
+        data = data_api.get_by_id(data_id, request.user)
+    except AccessControlError:
+        return HttpResponseForbidden()
+    except DoesNotExist:
+        raise Http404
+
+    rows = get_dataset_rows(data)
+    matching_rows = query_dataset_rows(
+        rows,
+        search=request.GET.get("search[value]", ""),
+        order_column=_get_int_param(request, "order[0][column]", 0),
+        descending=request.GET.get("order[0][dir]") == "desc",
+    )
+    start = max(_get_int_param(request, "start", 0), 0)
+    length = _get_int_param(request, "length", MAX_PAGE_LENGTH)
+    if not 0 < length <= MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+
+    return JsonResponse(
+        {
+            "draw": _get_int_param(request, "draw", 0),
+            "recordsTotal": len(rows),
+            "recordsFiltered": len(matching_rows),
+            "data": [
+                format_dataset_row(row)
+                for row in matching_rows[start : start + length]
+            ],
+        }
+    )
+
+
+def activity_fragment(request, data_id):
+    """
+    Details of an acquisition activity of a record, rendered on their own by
+    the detail stylesheet, for detail pages loading their activities when
+    they are displayed (NX_LAZY_ACTIVITIES).
+
+    Reads the index parameter, the number of the activity (from 1). The
+    renderings are cached like the detail page, per record version, activity
+    and stylesheet.
+
+    :param request:
+    :param data_id:
+    :return:
+    """
+    try:
+        data = data_api.get_by_id(data_id, request.user)
+    except AccessControlError:
+        return HttpResponseForbidden()
+    except DoesNotExist:
+        raise Http404
+
+    activity_index = _get_int_param(request, "index", 0)
+    summary = get_record_summary(data.content, data_id=data.id)
+    if not 1 <= activity_index <= summary["activity_count"]:
+        raise Http404
+
+    # Same parameters as the detail page (see detail_data.html), so that the
+    # activity is rendered as it would be in the page
+    html_string = render_xml_as_html_detail(
+        xmlName=data.title,
+        data_id=data.id,
+        last_modification_date=data.last_modification_date,
+        xml_content=data.content,
+        template_id=data.template.id,
+        template_hash=data.template.hash,
+        request=request,
+        activityIndex=str(activity_index),
+    )
+    # the XML is returned when the transformation fails
+    if html_string == data.content:
+        logger.error(f"Could not render activity {activity_index} of data {data.id}")
+        return HttpResponseServerError()
+    return HttpResponse(html_string)
+
+
+def render_status(request, data_id):
+    """
+    Whether the detail view of a record rendered ahead of time (cached-only
+    rendering strategy) is ready, polled by the placeholder displayed while
+    the rendering is queued.
+
+    Returns {"status": "ready"} once the rendering is stored (the page is then
+    reloaded), {"status": "failed"} if the record failed to render, and
+    {"status": "pending"} before. A lost rendering (not queued, or not ready
+    after NX_RENDER_POLL_TIMEOUT) is reported ready as well: the page is then
+    reloaded with the simple display.
+
+    :param request:
+    :param data_id:
+    :return:
+    """
+    try:
+        data = data_api.get_by_id(data_id, request.user)
+    except AccessControlError:
+        return HttpResponseForbidden()
+    except DoesNotExist:
+        raise Http404
+
+    # Same parameters as the detail page (see detail_data.html), so that the
+    # rendering of the page is looked up
+    html_string = render_xml_as_html_detail(
+        xmlName=data.title,
+        data_id=data.id,
+        last_modification_date=data.last_modification_date,
+        xml_content=data.content,
+        template_id=data.template.id,
+        template_hash=data.template.hash,
+        request=request,
+        render_pending=False,
+    )
+    if html_string is None:
+        status = "pending"
+    elif html_string == data.content:
+        # the XML is returned when the transformation fails
+        status = "failed"
+    else:
+        status = "ready"
+    return JsonResponse({"status": status})
+
+
+def data_permissions(request):
+    """
+    Whether the user can write each record of a list, like core_main_app's
+    data permission endpoint (core_main_app_rest_data_permissions), but
+    resolved for the whole list at once (see nexuslims_overrides/permissions.py),
+    so that a search result page checks all its records in a single request.
+
+    Reads the ids parameter, a JSON array of data ids, and returns a JSON
+    object mapping each id to a boolean. Ids of records that do not exist are
+    false, rather than failing the whole request.
+
+    :param request:
+    :return:
+    """
+    try:
+        data_ids = json.loads(request.GET.get("ids", "[]"))
+    except ValueError:
+        return JsonResponse({"message": "Invalid ids."}, status=400)
+    if not isinstance(data_ids, list):
+        return JsonResponse({"message": "Invalid ids."}, status=400)
+
+    return JsonResponse(
+        get_data_write_permissions(
+            [str(data_id) for data_id in data_ids], request.user
+        )
+    )
+
+
+@decorators.permission_required(
+    content_type=rights.EXPLORE_KEYWORD_CONTENT_TYPE,
+    permission=rights.EXPLORE_KEYWORD_ACCESS,
+)
+def search_suggestions(request):
+    """
+    Names of the records the user can read (titles, sample names and
+    experimenter names) similar to a term typed in the keyword search box,
+    looked up by trigram similarity (see nexuslims_overrides/fuzzy_search.py).
+
+    Reads the term parameter and returns {"suggestions": [{"label", "value"}]},
+    in the format of core_explore_keyword_app's suggestions.
+
+    :param request:
+    :return:
+    """
+    if not is_fuzzy_search_enabled():
+        raise Http404
+    term = request.GET.get("term", "").strip()
+    if len(term) < 2:
+        return JsonResponse({"suggestions": []})
+
+    try:
+        names = get_name_suggestions(term, request.user)
+    except AccessControlError:
+        # e.g. anonymous visitors, when they cannot read public records
+        names = []
+    return JsonResponse(
+        {"suggestions": [{"label": name, "value": name} for name in names]}
+    )
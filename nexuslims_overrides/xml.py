@@ -1,48 +1,569 @@
 """ Xml utils for the core applications
     Override of some functions in core_main_app.utils.xml
 """
+import hashlib
 import logging
+import re
+import threading
+import time
 import traceback
+from collections import OrderedDict
 
 from django.conf import settings
+from lxml import etree
 
 import core_main_app.commons.exceptions as exceptions
 from xml_utils.xsd_tree.xsd_tree import XSDTree
 
+from nexuslims_overrides import metrics
+
 logger = logging.getLogger(__name__)
 
-def xsl_transform(xml_string, xslt_string, **kwargs):
+# Namespace of the container document used for batched transformations. Only
+# stylesheets declaring this namespace know how to render a batch.
+BATCH_NAMESPACE = "https://datasophos.co/nexuslims/batch"
+BATCH_ITEM_MARKER = re.compile(r"<!--nx-batch-item:(\d+)-->")
+
+# libxslt measures the time spent in templates in 1/100000 s
+XSLT_PROFILE_TICKS_PER_MS = 100
+
+# Compiled XSLT cache
+# ----------------------------------------------------------------------------
+# etree.XSLT objects carry per-call state (e.g. error_log), so they must not
+# be shared between concurrently running threads (gunicorn gthread workers).
+# Each thread therefore keeps its own bounded LRU of compiled stylesheets,
+# keyed by a hash of the stylesheet content. Clearing the cache bumps a
+# generation counter; each thread drops its entries on its next lookup.
+_xslt_cache_local = threading.local()
+_xslt_cache_lock = threading.Lock()
+_xslt_cache_generation = 0
+_xslt_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Parsed document cache
+# ----------------------------------------------------------------------------
+# Parsed records are kept in an LRU keyed by content hash, so that rendering
+# the list and detail views of a record (and computing its summary and search
+# indexes) only parses it once. Like compiled stylesheets, a tree is only
+# reused by the thread that parsed it (with the thread's parser), but the
+# memory budget, NX_XML_TREE_CACHE_BYTES, is shared by all the threads of the
+# process: the least recently used tree of any thread is evicted first. The
+# memory used by a tree is estimated from the size of its XML: a parsed lxml
+# tree takes about 6 to 8 times the size of its XML (measured on records of
+# 5,000 to 20,000 datasets).
+PARSED_TREE_SIZE_FACTOR = 8
+_xml_parser_local = threading.local()
+_xml_tree_cache_lock = threading.Lock()
+# (parser of the thread, content hash) -> (tree, estimated size, hash of the
+# serialized tree when DEBUG is enabled)
+_xml_tree_cache = OrderedDict()
+_xml_tree_cache_size = 0
+
+
+def get_content_hash(content):
+    """Compute the hash used to identify an XML (or XSLT) document
+
+    Args:
+        content: document content, as str or bytes
+
+    Returns:
+        str: hex digest of the content
+
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_stylesheet_hash(xslt_string):
+    """Compute the content hash used to identify a stylesheet
+
+    Args:
+        xslt_string: XSLT content
+
+    Returns:
+        str: hex digest of the stylesheet content
+
+    """
+    return get_content_hash(xslt_string)
+
+
+def _get_thread_xslt_cache():
+    """Return the compiled XSLT cache of the current thread, dropping its
+    entries if the cache was cleared since they were compiled
+
+    Returns:
+        OrderedDict: stylesheet hash -> etree.XSLT
+
+    """
+    cache = getattr(_xslt_cache_local, "cache", None)
+    if (
+        cache is None
+        or getattr(_xslt_cache_local, "generation", None)
+        != _xslt_cache_generation
+    ):
+        cache = OrderedDict()
+        _xslt_cache_local.cache = cache
+        _xslt_cache_local.generation = _xslt_cache_generation
+    return cache
+
+
+def _record_xslt_cache_event(event):
+    """Increment one of the compiled XSLT cache counters
+
+    Args:
+        event: "hits", "misses" or "evictions"
+
+    """
+    with _xslt_cache_lock:
+        _xslt_cache_stats[event] += 1
+
+
+def get_compiled_xslt(xslt_string):
+    """Return a compiled etree.XSLT for a stylesheet, using the cache of the
+    current thread when possible
+
+    Args:
+        xslt_string: XSLT content
+
+    Returns:
+        etree.XSLT: compiled stylesheet, only to be used by the calling thread
+
+    """
+    max_size = getattr(settings, "NX_XSLT_CACHE_SIZE", 8)
+    if not max_size:
+        _record_xslt_cache_event("misses")
+        return XSDTree.transform_to_xslt(XSDTree.build_tree(xslt_string))
+
+    cache = _get_thread_xslt_cache()
+    key = get_stylesheet_hash(xslt_string)
+    transform = cache.get(key)
+    if transform is not None:
+        cache.move_to_end(key)
+        _record_xslt_cache_event("hits")
+        return transform
+
+    _record_xslt_cache_event("misses")
+    transform = XSDTree.transform_to_xslt(XSDTree.build_tree(xslt_string))
+    cache[key] = transform
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+        _record_xslt_cache_event("evictions")
+    return transform
+
+
+def clear_xslt_cache():
+    """Invalidate the compiled XSLT cache of every thread in this process"""
+    global _xslt_cache_generation
+    with _xslt_cache_lock:
+        _xslt_cache_generation += 1
+    logger.debug("Compiled XSLT cache cleared")
+
+
+def get_xslt_cache_stats():
+    """Return the compiled XSLT cache counters for this process
+
+    Returns:
+        dict: hits, misses and evictions since the process started
+
+    """
+    with _xslt_cache_lock:
+        return dict(_xslt_cache_stats)
+
+
+def get_xml_parser():
+    """Return the XML parser of the current thread
+
+    lxml parsers must not be shared between threads, but can be reused by
+    the thread that created them, which saves setting up a parser for each
+    document.
+
+    Returns:
+        etree.XMLParser: parser configured for (possibly very large) records
+
+    """
+    parser = getattr(_xml_parser_local, "parser", None)
+    if parser is None:
+        # huge_tree lifts libxml2's limits on the depth and size of text
+        # nodes, which records with thousands of datasets can exceed
+        parser = etree.XMLParser(remove_blank_text=True, huge_tree=True)
+        _xml_parser_local.parser = parser
+    return parser
+
+
+def parse_xml(xml_string):
+    """Parse an XML document with the parser of the current thread
+
+    Args:
+        xml_string: XML content, as str or bytes
+
+    Returns:
+        etree._ElementTree: parsed document
+
+    """
+    if isinstance(xml_string, str):
+        xml_string = xml_string.encode("utf-8")
+    return etree.fromstring(xml_string, parser=get_xml_parser()).getroottree()
+
+
+def get_parsed_xml(xml_string):
+    """Return the parsed tree of an XML document, using the parsed document
+    cache when possible
+
+    The returned tree may be shared with later calls of the same thread: it
+    must be treated as read-only (e.g. only used as the input of a
+    transformation or of XPath expressions). When DEBUG is enabled, a tree
+    modified by its user raises an error the next time it is reused.
+
+    Args:
+        xml_string: XML content, as str or bytes
+
+    Returns:
+        etree._ElementTree: parsed document, not to be modified
+
+    """
+    global _xml_tree_cache_size
+    max_bytes = getattr(settings, "NX_XML_TREE_CACHE_BYTES", 256 * 1024 * 1024)
+    if isinstance(xml_string, str):
+        xml_string = xml_string.encode("utf-8")
+    size = len(xml_string) * PARSED_TREE_SIZE_FACTOR
+    if not max_bytes or size > max_bytes:
+        return parse_xml(xml_string)
+
+    key = (get_xml_parser(), get_content_hash(xml_string))
+    with _xml_tree_cache_lock:
+        entry = _xml_tree_cache.get(key)
+        if entry is not None:
+            _xml_tree_cache.move_to_end(key)
+    if entry is not None:
+        tree, _, serialized_hash = entry
+        if serialized_hash is not None and (
+            serialized_hash != _get_tree_hash(tree)
+        ):
+            raise RuntimeError(
+                "A tree of the parsed document cache was modified, trees "
+                "returned by get_parsed_xml must be treated as read-only"
+            )
+        return tree
+
+    tree = parse_xml(xml_string)
+    serialized_hash = _get_tree_hash(tree) if settings.DEBUG else None
+    with _xml_tree_cache_lock:
+        _xml_tree_cache[key] = (tree, size, serialized_hash)
+        _xml_tree_cache_size += size
+        while _xml_tree_cache_size > max_bytes:
+            _, (_, evicted_size, _) = _xml_tree_cache.popitem(last=False)
+            _xml_tree_cache_size -= evicted_size
+    return tree
+
+
+def _get_tree_hash(tree):
+    """Hash the serialization of a tree, to detect changes to the trees of
+    the parsed document cache
+
+    Args:
+        tree: parsed document
+
+    Returns:
+        str: hex digest of the serialized tree
+
+    """
+    return get_content_hash(etree.tostring(tree))
+
+
+def xsl_transform(xml_string, xslt_string, xslt_type=None, **kwargs):
     """Apply transformation to xml, allowing for parameters to the XSLT
 
     Args:
         xml_string:
         xslt_string:
+        xslt_type: type of rendering (list or detail), used to label the
+            rendering metrics. Not passed to the XSLT
         kwargs : dict
             Other keyword arguments are passed as parameters to the XSLT object
 
     Returns:
 
     """
+    transform = None
+    timer = _TransformTimer()
     try:
-        # Build the XSD and XSLT etrees
-        xslt_tree = XSDTree.build_tree(xslt_string)
-        xsd_tree = XSDTree.build_tree(xml_string)
-
-        # Get the XSLT transformation and transform the XSD
-        transform = XSDTree.transform_to_xslt(xslt_tree)   # etree.XSLT object
-        transformed_tree = transform(xsd_tree, **kwargs)
-        return str(transformed_tree)
+        # Get the (cached) XSLT transformation and build the XML etree
+        transform = get_compiled_xslt(xslt_string)   # etree.XSLT object
+        timer.lap("nexuslims_xslt_stylesheet_compile_seconds")
+        xsd_tree = get_parsed_xml(xml_string)
+        timer.lap("nexuslims_xslt_xml_parse_seconds")
+
+        profile = getattr(settings, 'NX_XSLT_PROFILE', False)
+        transformed_tree = transform(
+            xsd_tree, profile_run=bool(profile), **kwargs
+        )
+        timer.lap("nexuslims_xslt_transform_seconds")
+        transformed_string = str(transformed_tree)
+        timer.lap("nexuslims_xslt_serialize_seconds")
+
+        # print the time spent in each template, if configured
+        if profile:
+            print(
+                f"NX_XSLT_PROFILE ({metrics.get_stylesheet_name(xslt_string)}, "
+                f"{(xslt_type or 'unknown').lower()} view):"
+            )
+            print(format_xslt_profile(get_xslt_profile(transformed_tree)))
+
+        if metrics.is_metrics_enabled():
+            _record_transform_metrics(
+                timer,
+                xslt_string,
+                xslt_type,
+                input_size=_get_size(xml_string),
+                output_size=_get_size(transformed_string),
+                dataset_count=_count_datasets(xsd_tree),
+            )
+        return transformed_string
     except Exception as e:
-        for error in transform.error_log:
-            print(f"LXML ERROR: {error}")
+        if transform is not None:
+            for error in transform.error_log:
+                print(f"LXML ERROR: {error}")
         traceback.print_exc()
         raise exceptions.CoreError("An unexpected exception happened while transforming the XML") from e
     finally:
         # print messages from transformation, if configured
         if hasattr(settings, 'NX_XSLT_DEBUG'):
-            if settings.NX_XSLT_DEBUG:
+            if settings.NX_XSLT_DEBUG and transform is not None:
                 if transform.error_log:
                     print("NX_XSLT_DEBUG output:")
                     print("-" * 21)
                 for entry in transform.error_log:
                     print(entry.message)
+
+
+def get_xslt_profile(transformed_tree):
+    """Get the profiling information of a transformation run with
+    profile_run=True
+
+    libxslt only measures self times: the time spent in a template itself,
+    excluding the templates it applies or calls. It does not record which
+    template called which, so inclusive times cannot be derived from it.
+
+    Args:
+        transformed_tree: result of the transformation
+
+    Returns:
+        list: one dict per template that was applied or called (name, match,
+        mode, calls, self_ms and average_self_ms), by decreasing self time
+
+    """
+    profile = []
+    for template in transformed_tree.xslt_profile.getroot():
+        time_ticks = int(template.get("time"))
+        calls = int(template.get("calls"))
+        profile.append(
+            {
+                "name": template.get("name"),
+                "match": template.get("match"),
+                "mode": template.get("mode"),
+                "calls": calls,
+                "self_ms": time_ticks / XSLT_PROFILE_TICKS_PER_MS,
+                "average_self_ms": time_ticks / XSLT_PROFILE_TICKS_PER_MS / calls
+                if calls
+                else 0,
+            }
+        )
+    profile.sort(key=lambda template: template["self_ms"], reverse=True)
+    return profile
+
+
+def format_xslt_profile(profile, limit=None):
+    """Format profiling information as a table
+
+    Args:
+        profile: list returned by get_xslt_profile
+        limit: maximum number of templates to list (all if None)
+
+    Returns:
+        str: one line per template, by decreasing self time
+
+    """
+    total_ms = sum(template["self_ms"] for template in profile)
+    lines = [
+        f"{'template':<50} {'calls':>8} {'self (ms)':>11} "
+        f"{'avg self (ms)':>14} {'% self':>7}"
+    ]
+    for template in profile[:limit]:
+        if template["name"]:
+            label = f"name={template['name']}"
+        else:
+            label = f"match={template['match']}"
+        if template["mode"]:
+            label += f" mode={template['mode']}"
+        share = 100 * template["self_ms"] / total_ms if total_ms else 0
+        lines.append(
+            f"{label[:50]:<50} {template['calls']:>8} "
+            f"{template['self_ms']:>11.2f} {template['average_self_ms']:>14.3f} "
+            f"{share:>6.1f}%"
+        )
+    lines.append(f"{'total':<50} {'':>8} {total_ms:>11.2f}")
+    lines.append(
+        "Self times: time spent in each template itself, excluding the "
+        "templates it applies or calls (lxml does not report inclusive times)"
+    )
+    return "\n".join(lines)
+
+
+class _TransformTimer:
+    """Measure the successive steps of a transformation"""
+
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        """Record the time elapsed since the previous step under name"""
+        now = time.perf_counter()
+        self.timings[name] = self.timings.get(name, 0) + now - self._last
+        self._last = now
+
+
+def _get_size(content):
+    """Get the size of a document, in bytes
+
+    Args:
+        content: document content, as str or bytes
+
+    Returns:
+        int: size of the UTF-8 encoded content
+
+    """
+    if isinstance(content, str):
+        return len(content.encode("utf-8"))
+    return len(content)
+
+
+def _count_datasets(tree):
+    """Count the dataset elements of a record
+
+    Args:
+        tree: XML etree, or element
+
+    Returns:
+        int: number of dataset elements, in any namespace
+
+    """
+    return sum(1 for _ in tree.iter("{*}dataset"))
+
+
+def _record_transform_metrics(
+    timer, xslt_string, xslt_type, input_size, output_size, dataset_count
+):
+    """Record the metrics of a transformation
+
+    Args:
+        timer: _TransformTimer of the transformation
+        xslt_string: XSLT content, identifying the stylesheet
+        xslt_type: type of rendering (list or detail)
+        input_size: size of the XML input, in bytes
+        output_size: size of the output, in bytes
+        dataset_count: number of datasets in the XML input
+
+    """
+    labels = {
+        "stylesheet": metrics.get_stylesheet_name(xslt_string),
+        "xslt_type": xslt_type or "unknown",
+    }
+    for name, value in timer.timings.items():
+        metrics.observe(name, value, **labels)
+    metrics.observe("nexuslims_xslt_input_bytes", input_size, **labels)
+    metrics.observe("nexuslims_xslt_output_bytes", output_size, **labels)
+    metrics.observe("nexuslims_xslt_datasets", dataset_count, **labels)
+
+
+def is_batch_aware(xslt_string):
+    """Check whether a stylesheet can render a batch of documents
+
+    Args:
+        xslt_string: XSLT content
+
+    Returns:
+        bool: True if the stylesheet handles the batch container document
+
+    """
+    return BATCH_NAMESPACE in xslt_string
+
+
+def xsl_transform_batch(items, xslt_string, xslt_type=None, **kwargs):
+    """Apply a batch-aware transformation to several xml documents at once
+
+    The documents are wrapped in a single container document and transformed
+    in one pass, so building the stylesheet, calling the transformation and
+    serializing the result only happen once per batch. The stylesheet must
+    precede the output of each document by a ``nx-batch-item`` marker comment
+    (see list_stylesheet.xsl).
+
+    Args:
+        items: list of (xml_string, item_params) tuples. item_params is a dict
+            of strings set as attributes of the element wrapping the document
+        xslt_string:
+        xslt_type: type of rendering (list or detail), used to label the
+            rendering metrics of the batch. Not passed to the XSLT
+        kwargs : dict
+            Other keyword arguments are passed as parameters to the XSLT object
+
+    Returns:
+        list: transformed string of each item, in the same order as items, or
+        None for the items that could not be parsed
+
+    """
+    timer = _TransformTimer()
+    container = etree.Element(
+        f"{{{BATCH_NAMESPACE}}}batch", nsmap={"nxb": BATCH_NAMESPACE}
+    )
+    for index, (xml_string, item_params) in enumerate(items):
+        try:
+            # not from the parsed document cache: the document is moved
+            # into the batch container
+            document = parse_xml(xml_string).getroot()
+        except Exception as e:
+            logger.warning(f"Could not parse batch item {index}: {e}")
+            continue
+        item = etree.SubElement(
+            container, f"{{{BATCH_NAMESPACE}}}item", index=str(index)
+        )
+        for name, value in item_params.items():
+            item.set(name, value)
+        item.append(document)
+    timer.lap("nexuslims_xslt_xml_parse_seconds")
+
+    transform = None
+    try:
+        transform = get_compiled_xslt(xslt_string)
+        timer.lap("nexuslims_xslt_stylesheet_compile_seconds")
+        transformed_tree = transform(etree.ElementTree(container), **kwargs)
+        timer.lap("nexuslims_xslt_transform_seconds")
+        transformed_string = str(transformed_tree)
+        timer.lap("nexuslims_xslt_serialize_seconds")
+    except Exception as e:
+        if transform is not None:
+            for error in transform.error_log:
+                print(f"LXML ERROR: {error}")
+        traceback.print_exc()
+        raise exceptions.CoreError("An unexpected exception happened while transforming the XML") from e
+    finally:
+        if getattr(settings, 'NX_XSLT_DEBUG', False) and transform is not None:
+            for entry in transform.error_log:
+                print(entry.message)
+
+    if metrics.is_metrics_enabled():
+        _record_transform_metrics(
+            timer,
+            xslt_string,
+            xslt_type,
+            input_size=sum(_get_size(xml_string) for xml_string, _ in items),
+            output_size=_get_size(transformed_string),
+            dataset_count=_count_datasets(container),
+        )
+
+    # split on the marker comments: [prefix, index, output, index, output...]
+    outputs = [None] * len(items)
+    parts = BATCH_ITEM_MARKER.split(transformed_string)
+    for index, output in zip(parts[1::2], parts[2::2]):
+        outputs[int(index)] = output.strip()
+    return outputs
@@ -0,0 +1,197 @@
+"""
+XSLT extension functions.
+
+The string-handling templates of the stylesheets (decode, string-replace-all,
+tokenize-path, ...) are recursive, one call per character or token, which is
+slow on long values and can exhaust libxslt's template depth on long paths.
+The functions of this module implement them in Python, in the
+NX_FUNCTION_NAMESPACE namespace (bound to the ``nx-fn`` prefix in the
+stylesheets).
+
+The stylesheets only call a function when ``function-available()`` reports
+it, and fall back to their recursive templates otherwise, so they keep
+working in other XSLT processors. Each function reproduces the output of the
+template it replaces, quirks included.
+"""
+import re
+
+from lxml import etree
+
+NX_FUNCTION_NAMESPACE = "https://datasophos.co/nexuslims/functions"
+
+# Characters decoded by the "decode" template (see the $ascii and $latin1
+# variables of detail_stylesheet.xsl)
+HEX_DIGITS = "0123456789ABCDEF"
+
+# Month names of the lookup.date.month key of the stylesheets
+MONTH_NAMES = {
+    "01": "January",
+    "02": "February",
+    "03": "March",
+    "04": "April",
+    "05": "May",
+    "06": "June",
+    "07": "July",
+    "08": "August",
+    "09": "September",
+    "10": "October",
+    "11": "November",
+    "12": "December",
+}
+
+_XPATH_WHITESPACE = re.compile(r"[ \t\r\n]+")
+
+
+def _to_string(value):
+    """Convert an XPath argument to a string, like the XPath string()
+    function
+
+    Args:
+        value: string, number, boolean or node-set passed by libxslt
+
+    Returns:
+        str: string value of the argument
+
+    """
+    if isinstance(value, list):
+        if not value:
+            return ""
+        value = value[0]
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, etree._Element):
+        return "".join(value.itertext())
+    return str(value)
+
+
+def _normalize_space(text):
+    """Python version of the XPath normalize-space() function"""
+    return _XPATH_WHITESPACE.sub(" ", text).strip(" ")
+
+
+def decode(context, encoded):
+    """Decode the %XX escapes of a URL (template "decode")
+
+    Escapes of printable ASCII and Latin-1 characters are decoded, other
+    escapes are replaced by "?".
+    """
+    encoded = _to_string(encoded)
+    parts = []
+    while "%" in encoded:
+        before, _, encoded = encoded.partition("%")
+        parts.append(before)
+        hex_pair = encoded[:2]
+        decimal = 0
+        for digit in hex_pair:
+            # anything but a hexadecimal digit reads as 0
+            decimal = decimal * 16 + max(HEX_DIGITS.find(digit.upper()), 0)
+        if len(hex_pair) < 2:
+            # the template reads a missing digit as 0
+            decimal *= 16 ** (2 - len(hex_pair))
+        if 31 < decimal < 127 or decimal > 159:
+            parts.append(chr(decimal))
+        else:
+            parts.append("?")
+        encoded = encoded[2:]
+    parts.append(encoded)
+    return "".join(parts)
+
+
+def replace_all(context, text, replace, by):
+    """Replace every occurrence of a string (templates "string-replace-all"
+    and "replace-string")"""
+    text = _to_string(text)
+    replace = _to_string(replace)
+    if not replace:
+        return text
+    return text.replace(replace, _to_string(by))
+
+
+def tokenize_path(context, path, separator="/", prepend=""):
+    """Split a path in progressively longer parts "/", "/first",
+    "/first/second", etc. (template "tokenize-path")
+
+    Returns:
+        list: <item> elements, one per part
+    """
+    path = _to_string(path)
+    separator = _to_string(separator)
+    prepend = _to_string(prepend)
+    parts = []
+    while separator and separator in path:
+        before, _, path = path.partition(separator)
+        this_part = prepend + _normalize_space(before)
+        parts.append(this_part or separator)
+        prepend = this_part + separator
+    parts.append(prepend + separator + _normalize_space(path))
+
+    items = []
+    for part in parts:
+        item = etree.Element("item")
+        item.text = part
+        items.append(item)
+    return items
+
+
+def tokenize_select(context, text, delim=" ", i=1):
+    """Split a string by a delimiter and select the i-th element, starting at
+    1 (template "tokenize-select")"""
+    text = _to_string(text)
+    delim = _to_string(delim)
+    # "not i >= 1" also rules out NaN
+    if not i >= 1 or i != int(i) or not delim:
+        return ""
+    tokens = text.split(delim)
+    return tokens[int(i) - 1] if i <= len(tokens) else ""
+
+
+def substring_after_last(context, string, char):
+    """Get the part of a string after the last occurrence of a character
+    (template "substring-after-last")"""
+    string = _to_string(string)
+    char = _to_string(char)
+    if not char:
+        return string
+    return string.rpartition(char)[2]
+
+
+def strip_tags(context, text):
+    """Remove the HTML tags of a string (template "strip-tags")"""
+    text = _to_string(text)
+    parts = []
+    while "<" in text:
+        parts.append(text.partition("<")[0])
+        # like the template, resume after the first ">" of the remaining text
+        text = text.partition(">")[2]
+    parts.append(text)
+    return "".join(parts)
+
+
+def localize_date(context, date):
+    """Format a yyyy-mm-dd date as e.g. "October 04, 2019" (template
+    "localize-date")"""
+    date = _to_string(date)
+    month = MONTH_NAMES.get(tokenize_select(context, date, "-", 2), "")
+    day = tokenize_select(context, date, "-", 3)
+    year = tokenize_select(context, date, "-", 1)
+    return f"{month} {day}, {year}"
+
+
+XSLT_FUNCTIONS = {
+    "decode": decode,
+    "replace-all": replace_all,
+    "tokenize-path": tokenize_path,
+    "tokenize-select": tokenize_select,
+    "substring-after-last": substring_after_last,
+    "strip-tags": strip_tags,
+    "localize-date": localize_date,
+}
+
+
+def register_xslt_functions():
+    """Register the extension functions with lxml, for every stylesheet
+    declaring NX_FUNCTION_NAMESPACE"""
+    namespace = etree.FunctionNamespace(NX_FUNCTION_NAMESPACE)
+    namespace.update(XSLT_FUNCTIONS)
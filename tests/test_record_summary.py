@@ -0,0 +1,84 @@
+""" Record summary values
+"""
+from django.test import SimpleTestCase
+
+from nexuslims_overrides.record_summary import get_filelist_root_path
+
+
+class TestGetFilelistRootPath(SimpleTestCase):
+    """get_filelist_root_path"""
+
+    def test_no_locations_is_root(self):
+        self.assertEqual(get_filelist_root_path([]), "/")
+
+    def test_single_location_is_its_folder(self):
+        self.assertEqual(
+            get_filelist_root_path(["/Titan/project/20181113/image.dm3"]),
+            "/Titan/project/20181113",
+        )
+
+    def test_common_folder_of_absolute_locations(self):
+        self.assertEqual(
+            get_filelist_root_path(
+                [
+                    "/Titan/project/20181113/image_001.dm3",
+                    "/Titan/project/20181113/eds/spectrum_001.dm3",
+                    "/Titan/project/20181114/image_002.dm3",
+                ]
+            ),
+            "/Titan/project",
+        )
+
+    def test_folder_of_the_first_location_holding_the_others(self):
+        self.assertEqual(
+            get_filelist_root_path(
+                ["/Titan/project/eds/spectrum.dm3", "/Titan/project/image.dm3"]
+            ),
+            "/Titan/project",
+        )
+
+    def test_folders_are_compared_by_component(self):
+        # not the /Titan/proj string prefix
+        self.assertEqual(
+            get_filelist_root_path(
+                ["/Titan/proj/image_001.dm3", "/Titan/project/image_002.dm3"]
+            ),
+            "/Titan",
+        )
+
+    def test_no_common_folder_of_absolute_locations_is_root(self):
+        self.assertEqual(
+            get_filelist_root_path(["/Titan/image.dm3", "/Quanta/image.tif"]),
+            "/",
+        )
+
+    def test_files_at_the_root_are_in_root(self):
+        # the first component of absolute locations is empty
+        self.assertEqual(
+            get_filelist_root_path(["/image.dm3", "/spectrum.dm3"]), "/"
+        )
+
+    def test_empty_first_component_is_kept(self):
+        self.assertEqual(
+            get_filelist_root_path(
+                ["//Titan/image_001.dm3", "//Titan/image_002.dm3"]
+            ),
+            "//Titan",
+        )
+
+    def test_common_folder_of_relative_locations(self):
+        self.assertEqual(
+            get_filelist_root_path(
+                ["Titan/project/image_001.dm3", "Titan/eds/spectrum_001.dm3"]
+            ),
+            "Titan",
+        )
+
+    def test_no_common_folder_of_relative_locations_is_root(self):
+        self.assertEqual(
+            get_filelist_root_path(["Titan/image.dm3", "Quanta/image.tif"]),
+            "/",
+        )
+
+    def test_relative_file_name_is_in_root(self):
+        self.assertEqual(get_filelist_root_path(["image.dm3"]), "/")
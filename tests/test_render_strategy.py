@@ -0,0 +1,187 @@
+""" Pre-rendered records served by the detail page, with every rendering
+strategy
+"""
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core_main_app.components.data.models import Data
+from core_main_app.components.template.models import Template
+from core_main_app.components.template_xsl_rendering.models import (
+    TemplateXslRendering,
+)
+from core_main_app.components.xsl_transformation.models import (
+    XslTransformation,
+)
+from nexuslims_overrides.models import RenderedRecord
+from nexuslims_overrides.prerender import prerender_data
+from nexuslims_overrides.render_cache import get_render_cache
+from nexuslims_overrides.templatetags import nexuslims_xsl_transform
+from nexuslims_overrides.templatetags.nexuslims_xsl_transform import (
+    RenderStrategy,
+    XSLType,
+)
+
+XSLT_DIR = Path(__file__).resolve().parent.parent / "xslt"
+
+RECORD = """<?xml version="1.0" encoding="UTF-8"?>
+<Experiment xmlns="https://data.nist.gov/od/dm/nexus/experiment/v1.0">
+  <title>Test record</title>
+  <id>1</id>
+  <summary>
+    <experimenter>Ned Land</experimenter>
+    <instrument pid="FEI-Titan-TEM">FEI Titan TEM</instrument>
+    <reservationStart>2018-11-13T10:00:00-07:00</reservationStart>
+    <reservationEnd>2018-11-13T15:00:00-07:00</reservationEnd>
+  </summary>
+  <acquisitionActivity seqno="0">
+    <startTime>2018-11-13T11:01:00-07:00</startTime>
+    <setup><param name="Spot">2</param></setup>
+    <dataset type="Image" role="Experimental">
+      <name>image_001.dm3</name>
+      <location>/Titan/project/image_001.dm3</location>
+      <meta name="Exposure Time (s)">1.0</meta>
+    </dataset>
+    <dataset type="Image" role="Experimental">
+      <name>image_002.dm3</name>
+      <location>/Titan/project/image_002.dm3</location>
+    </dataset>
+  </acquisitionActivity>
+  <acquisitionActivity seqno="1">
+    <startTime>2018-11-13T12:01:00-07:00</startTime>
+    <dataset type="Spectrum" role="Experimental">
+      <name>spectrum_001.dm3</name>
+      <location>/Titan/project/spectrum_001.dm3</location>
+    </dataset>
+  </acquisitionActivity>
+</Experiment>
+"""
+
+
+def _create_xslt(name):
+    """Create an XSLT from a stylesheet of the xslt folder"""
+    xslt = XslTransformation(name=name, filename=name)
+    with open(XSLT_DIR / name, encoding="utf-8") as xslt_file:
+        xslt.content = xslt_file.read()
+    xslt.save_object()
+    return xslt
+
+
+class TestPrerenderedDetailPage(TestCase):
+    """The detail page serves the rendering stored by prerender_data, with
+    the rendering strategy it selects"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        template = Template(
+            filename="nexus-experiment.xsd",
+            format=Template.XSD,
+            user=str(cls.user.id),
+            _hash="hash",
+        )
+        template.content = (
+            "<xs:schema xmlns:xs='http://www.w3.org/2001/XMLSchema'/>"
+        )
+        template.save()
+        TemplateXslRendering(
+            template=template,
+            list_xslt=_create_xslt("list_stylesheet.xsl"),
+            default_detail_xslt=_create_xslt("detail_stylesheet.xsl"),
+        ).save()
+        cls.data = Data(
+            template=template, user_id=str(cls.user.id), title="Test record"
+        )
+        cls.data.xml_content = RECORD
+        cls.data.last_modification_date = timezone.now()
+        cls.data.convert_to_file()
+        cls.data.save()
+
+    def setUp(self):
+        get_render_cache().clear()
+        nexuslims_xsl_transform.clear_xslt_string_cache()
+        self.client.force_login(self.user)
+
+    def _assert_page_serves_prerendering(self, strategy):
+        """Pre-render the data, then check that its detail page selects
+        the strategy, and serves the stored rendering without transforming
+        the record"""
+        prerender_data(self.data)
+        rendered = RenderedRecord.objects.get(
+            data=self.data, xslt_type=XSLType.type_detail
+        )
+        # served from the database, not from the cache
+        get_render_cache().clear()
+
+        looked_up_keys = []
+        selected_strategies = []
+        get_render = nexuslims_xsl_transform.get_render
+        get_params = nexuslims_xsl_transform._get_render_strategy_params
+
+        def _get_render(cache_key):
+            looked_up_keys.append(cache_key)
+            return get_render(cache_key)
+
+        def _get_params(*args, **kwargs):
+            params = get_params(*args, **kwargs)
+            selected_strategies.append(params["render_strategy"])
+            return params
+
+        with mock.patch.object(
+            nexuslims_xsl_transform, "get_render", side_effect=_get_render
+        ), mock.patch.object(
+            nexuslims_xsl_transform,
+            "_get_render_strategy_params",
+            side_effect=_get_params,
+        ), mock.patch.object(
+            nexuslims_xsl_transform, "xsl_transform"
+        ) as xsl_transform:
+            response = self.client.get(
+                reverse("core_main_app_data_detail"), {"id": self.data.id}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(selected_strategies, [strategy])
+        self.assertEqual(looked_up_keys, [rendered.cache_key])
+        xsl_transform.assert_not_called()
+        self.assertContains(response, rendered.html)
+
+    def test_full_rendering_is_served(self):
+        self._assert_page_serves_prerendering(RenderStrategy.full)
+
+    @override_settings(NX_LAZY_ACTIVITIES=True)
+    def test_lazy_rendering_is_served(self):
+        self._assert_page_serves_prerendering(RenderStrategy.lazy)
+
+    @override_settings(NX_MAX_DATASET_DISPLAY_COUNT=2)
+    def test_simple_rendering_is_served(self):
+        self._assert_page_serves_prerendering(RenderStrategy.simple)
+
+    @override_settings(NX_RENDER_CACHED_ONLY_SIZE=100)
+    def test_cached_only_rendering_is_served(self):
+        self._assert_page_serves_prerendering(RenderStrategy.cached_only)
+
+    @override_settings(NX_RENDER_LAZY_SECONDS=1e-9)
+    def test_rendering_is_served_after_its_duration_changes_the_strategy(self):
+        # the first (full) rendering is too slow, so the page is lazy
+        self._assert_page_serves_prerendering(RenderStrategy.lazy)
+
@@ -19,8 +19,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     # Extra apps
     "menu",
+    # NexusLIMS overrides (before the apps whose templates it overrides)
+    "nexuslims_overrides",
     # Local apps
     "core_main_app",
+    "core_explore_common_app",
+    "core_explore_keyword_app",
+    "django_celery_beat",
     "tests",
 ]
 
@@ -39,9 +44,9 @@ DATABASES = {
     },
 }
 MIDDLEWARE = (  # noqa
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
 )
 
 TEMPLATES = [
@@ -70,3 +75,7 @@ CELERYBEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 MEDIA_ROOT = "tests_media"
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.UnsaltedMD5PasswordHasher",)
 MONGODB_INDEXING = False
+CUSTOM_NAME = "NexusLIMS"
+
+# NexusLIMS customizations
+from nexuslims_overrides.settings import *  # noqa
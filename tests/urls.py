@@ -1,4 +1,32 @@
 """ Url router
 """
+from django.contrib import admin
+from django.http import HttpResponse
+from django.urls import include, path, re_path
 
-urlpatterns = []
+from core_main_app.admin import core_admin_site
+
+urlpatterns = [
+    re_path(r"^admin/", admin.site.urls),
+    re_path(r"^core-admin/", core_admin_site.urls),
+    re_path(r"^", include("nexuslims_overrides.urls")),
+    re_path(r"^", include("core_main_app.urls")),
+    re_path(r"^explore/common/", include("core_explore_common_app.urls")),
+    re_path(r"^explore/keyword/", include("core_explore_keyword_app.urls")),
+]
+
+# Pages of apps that are not installed, linked to by the menus
+urlpatterns += [
+    path(f"{name}/", lambda request: HttpResponse(), name=name)
+    for name in (
+        "core_website_app_terms",
+        "core_composer_index",
+        "core_dashboard_files",
+        "core_dashboard_forms",
+        "core_dashboard_queries",
+        "core_dashboard_records",
+        "core_dashboard_workspaces",
+        "core_explore_keyword_app_search",
+        "swagger_view",
+    )
+]
@@ -15,7 +15,8 @@ Remember to disable NX_XSLT_DEBUG before production deployment.
     xmlns:nx="https://data.nist.gov/od/dm/nexus/experiment/v1.0"
     xmlns:exslt="http://exslt.org/common"
     xmlns:math="http://exslt.org/math"
-    extension-element-prefixes="exslt"
+    xmlns:nx-fn="https://datasophos.co/nexuslims/functions"
+    extension-element-prefixes="exslt" exclude-result-prefixes="nx-fn"
     version="1.0">
     <xsl:output method="html" indent="yes" encoding="UTF-8"/>
 
@@ -52,13 +53,81 @@ Remember to disable NX_XSLT_DEBUG before production deployment.
     <!-- Maximum number of datasets before switching to "simple display" -->
     <xsl:param name="maxDatasetCount">100</xsl:param>
 
+    <!--
+        Root path of the file listing, computed when the record is saved (see
+        nexuslims_overrides/record_summary.py). When not provided, it is computed by the
+        find-root-filepath template.
+    -->
+    <xsl:param name="filelistRootPath" select="''"/>
+
+    <!--
+        Dataset and activity counts and file extension counts of the record, computed when
+        the record is saved (see nexuslims_overrides/record_summary.py). When not provided,
+        they are computed from the record.
+    -->
+    <xsl:param name="datasetCount" select="count(//nx:dataset)"/>
+    <xsl:param name="activityCount" select="count(//nx:acquisitionActivity)"/>
+    <xsl:param name="extensionCounts" select="''"/>
+
+    <!--
+        URL of the dataset rows of the record (see nexuslims_overrides/dataset_table.py).
+        When provided, the simple display table is rendered without rows, and loads them
+        from this URL a page at a time.
+    -->
+    <xsl:param name="datasetRowsUrl" select="''"/>
+
+    <!--
+        Lazy rendering of the activities (see nexuslims_overrides/views.py). When
+        activityFragmentUrl is provided, the page only holds a placeholder per activity,
+        whose details are loaded from this URL when the placeholder is displayed. When
+        activityIndex is provided, only the details of that activity (numbered from 1) are
+        rendered.
+    -->
+    <xsl:param name="activityFragmentUrl" select="''"/>
+    <xsl:param name="activityIndex" select="0"/>
+    <xsl:variable name="id-prefix">
+        <xsl:if test="$activityIndex > 0">aa<xsl:value-of select="$activityIndex"/>-</xsl:if>
+    </xsl:variable>
+
+    <!--
+        Rendering strategy selected for the record (see select_render_strategy in
+        nexuslims_overrides/templatetags/nexuslims_xsl_transform.py): 'simple' forces the
+        simple display, 'full' and 'lazy' disable it. When not provided, the simple display
+        is used above maxDatasetCount datasets.
+    -->
+    <xsl:param name="renderStrategy" select="''"/>
+
     <!--
         This variable control the limit for interactive dataset display. More than this
         number and the stylesheet will revert to a simple file list rather than an
         interactive display of each activity. A value of zero or below disables the simple
         display entirely.
     -->
-    <xsl:variable name="simpleDisplay" select="$maxDatasetCount > 0 and count(//nx:dataset) > $maxDatasetCount"/>
+    <xsl:variable
+        name="simpleDisplay"
+        select="$renderStrategy = 'simple' or ($renderStrategy = '' and $maxDatasetCount > 0 and $datasetCount > $maxDatasetCount)"/>
+
+    <!--
+        Ordinals of the activities and datasets of the record, numbered in a single pass so
+        that numbering a dataset or an activity (e.g. in the image gallery) is a key lookup
+        rather than a count of everything that precedes it. Look an ordinal up with:
+            <xsl:for-each select="$ordinals">
+                <xsl:value-of select="key('ordinal-by-id', $node-id)/@number"/>
+            </xsl:for-each>
+        where $node-id is the generate-id() of the activity or dataset (keys apply to the
+        document of the context node, hence the for-each).
+    -->
+    <xsl:variable name="ordinals-fragment">
+        <xsl:for-each select="//nx:acquisitionActivity">
+            <ordinal id="{generate-id()}" number="{position()}"/>
+        </xsl:for-each>
+        <xsl:for-each select="//nx:dataset">
+            <ordinal id="{generate-id()}" number="{position()}"/>
+        </xsl:for-each>
+    </xsl:variable>
+    <xsl:variable name="ordinals" select="exslt:node-set($ordinals-fragment)"/>
+    <xsl:key name="ordinal-by-id" match="ordinal" use="@id"/>
+    <xsl:variable name="preview-count" select="count(//nx:dataset[nx:preview])"/>
 
     <xsl:variable name="month-num-dictionary">
         <month month-number="01">January</month>
@@ -75,6 +144,8 @@ Remember to disable NX_XSLT_DEBUG before production deployment.
         <month month-number="12">December</month>
     </xsl:variable>
     <xsl:key name="lookup.date.month" match="month" use="@month-number"/>
+    <!-- ext elements of the fragments built by get-unique-extensions -->
+    <xsl:key name="extension-by-value" match="ext" use="value"/>
 
     <xsl:variable name="periodic-table-dictionary">
         <element symbol="H">1 - Hydrogen</element>
@@ -246,7 +317,16 @@ Use it like:
         select="exslt:node-set($extension-to-tooltip-lookup-fragment)" />
 
     <xsl:template match="/">
-        <xsl:apply-templates select="/nx:Experiment"/>
+        <xsl:choose>
+            <xsl:when test="$activityIndex > 0">
+                <xsl:apply-templates
+                    select="/nx:Experiment/nx:acquisitionActivity[position() = $activityIndex]"
+                    mode="activity-detail"/>
+            </xsl:when>
+            <xsl:otherwise>
+                <xsl:apply-templates select="/nx:Experiment"/>
+            </xsl:otherwise>
+        </xsl:choose>
     </xsl:template>
     <xsl:template match="nx:Experiment">
         <xsl:variable name="reservation-date-part">
@@ -270,31 +350,6 @@ Use it like:
             <xsl:value-of select="@pid"/>
         </xsl:variable>
 
-        <xsl:variable name="extension-fragment">
-            <xsl:element name="extensions">
-                <xsl:for-each select="//nx:dataset/nx:location">
-                    <xsl:call-template name="get-file-extension">
-                        <xsl:with-param name="path">
-                            <xsl:value-of select="."/>
-                        </xsl:with-param>
-                    </xsl:call-template>
-                </xsl:for-each>
-            </xsl:element>
-        </xsl:variable>
-
-        <xsl:variable name="extensionCount">
-            <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[not(preceding::value = value)]">
-                <xsl:variable name="thisExtension" select="value/text()"/>
-                <xsl:variable name="thisCount" select="count(exslt:node-set($extension-fragment)/extensions/ext[value = $thisExtension])"/>
-                <xsl:element name="extension">
-                    <xsl:attribute name="count">
-                        <xsl:value-of select="$thisCount"/>
-                    </xsl:attribute>
-                    <xsl:value-of select="$thisExtension"/>
-                </xsl:element>
-            </xsl:for-each>
-        </xsl:variable>
-
 
         <div style='display: none;' id="simpleDisplay">
             <xsl:value-of select="$simpleDisplay"/>
@@ -465,7 +520,7 @@ Use it like:
                                     title='Click to hide this warning'/>
                                 <div class="px-4 py-0">
                                  Heads up! This experiment record contains
-                                 more datasets (<xsl:value-of select="format-number(count(//nx:dataset),'#,###')"/>) than NexusLIMS can interactively
+                                 more datasets (<xsl:value-of select="format-number($datasetCount,'#,###')"/>) than NexusLIMS can interactively
                                  show, so a simplified representation is provided.
                                  To download your files, please access the central file storage directly, or click the individual download links for files of interest below.
                                 </div>
@@ -526,8 +581,8 @@ Use it like:
                                             <xsl:attribute name="data-bs-placement">bottom</xsl:attribute>
                                             <xsl:attribute name="title">Click to view a file listing of this record</xsl:attribute>
                                         </xsl:if>
-                                        <xsl:value-of select="count(//nx:dataset)"/> data file<xsl:if test="count(//nx:dataset)>1">s</xsl:if> in <xsl:value-of select="count(//nx:acquisitionActivity)"/> activit<xsl:choose>
-                                            <xsl:when test="count(//nx:acquisitionActivity) = 1">y</xsl:when>
+                                        <xsl:value-of select="$datasetCount"/> data file<xsl:if test="$datasetCount>1">s</xsl:if> in <xsl:value-of select="$activityCount"/> activit<xsl:choose>
+                                            <xsl:when test="$activityCount = 1">y</xsl:when>
                                             <xsl:otherwise>ies</xsl:otherwise>
                                         </xsl:choose>
                                     </xsl:element>
@@ -538,6 +593,7 @@ Use it like:
                                 <xsl:variable name="unique-extensions">
                                     <xsl:call-template name="get-unique-extensions">
                                         <xsl:with-param name="global" select="true()"/>
+                                        <xsl:with-param name="counts" select="$extensionCounts"/>
                                     </xsl:call-template>
                                 </xsl:variable>
                                 <xsl:call-template name="extensions-to-badges">
@@ -939,7 +995,12 @@ Use it like:
                     <div class="col-md-6 slideshow-col">
                         <div id="img_gallery">
                             <xsl:for-each select="//nx:dataset[nx:preview]">
-                                <xsl:variable name="aa_num" select="count(../preceding-sibling::nx:acquisitionActivity) + 1"/>
+                                <xsl:variable name="activity-id" select="generate-id(..)"/>
+                                <xsl:variable name="aa_num">
+                                    <xsl:for-each select="$ordinals">
+                                        <xsl:value-of select="key('ordinal-by-id', $activity-id)/@number"/>
+                                    </xsl:for-each>
+                                </xsl:variable>
                                 <figure class="slide">
                                     <img class="nx-img"><xsl:attribute name="src"><xsl:value-of select="$previewBaseUrl"/><xsl:value-of select="nx:preview"/></xsl:attribute></img>
                                     <figcaption class="nx-caption">
@@ -954,9 +1015,14 @@ Use it like:
                                                    </span>
                                                </a>
                                             </div>
-                                            <xsl:variable name="dataset-number" select="count(ancestor::nx:acquisitionActivity/preceding-sibling::nx:acquisitionActivity/nx:dataset) + count(preceding-sibling::nx:dataset) + 1"/>
+                                            <xsl:variable name="dataset-id" select="generate-id()"/>
+                                            <xsl:variable name="dataset-number">
+                                                <xsl:for-each select="$ordinals">
+                                                    <xsl:value-of select="key('ordinal-by-id', $dataset-id)/@number"/>
+                                                </xsl:for-each>
+                                            </xsl:variable>
                                             <div class="gallery-caption">
-                                                <span>Preview <xsl:value-of select="position()"/> of <xsl:value-of select="count(//nx:dataset[nx:preview])" />
+                                                <span>Preview <xsl:value-of select="position()"/> of <xsl:value-of select="$preview-count" />
                                                     (<xsl:choose>
                                                             <!-- if simple display, make dataset text a link -->
                                                             <xsl:when test="$simpleDisplay">
@@ -965,6 +1031,9 @@ Use it like:
                                                                    data-bs-placement='bottom'
                                                                    title='Jump to dataset {$dataset-number} details'
                                                                    onclick='$("#simple-filelist-table tr").removeClass("table-warning"); $("a[name={generate-id(current())}").parent().parent().addClass("table-warning")'>
+                                                                    <xsl:if test="$datasetRowsUrl != ''">
+                                                                        <xsl:attribute name="data-dataset-number"><xsl:value-of select="$dataset-number"/></xsl:attribute>
+                                                                    </xsl:if>
                                                                     dataset #<xsl:value-of select="$dataset-number"/><xsl:text> </xsl:text>
                                                                     <sup class="link-icon"><i class='fa fa-link'/></sup><xsl:text> </xsl:text>
                                                                 </a>
@@ -982,7 +1051,7 @@ Use it like:
                                                 <xsl:choose>
                                                     <xsl:when test="$simpleDisplay">
                                                         <!-- if simple display, just show activity text -->
-                                                        <span>Activity <xsl:value-of select="$aa_num"/> of <xsl:value-of select="count(//nx:acquisitionActivity)"/></span>
+                                                        <span>Activity <xsl:value-of select="$aa_num"/> of <xsl:value-of select="$activityCount"/></span>
                                                     </xsl:when>
                                                     <xsl:otherwise>
                                                         <!-- if not simple, make activity text a clickable link -->
@@ -990,7 +1059,7 @@ Use it like:
                                                            data-bs-toggle='tooltip'
                                                            data-bs-placement='bottom'
                                                            title='Jump to activity {$aa_num} in record'>
-                                                            Activity <xsl:value-of select="$aa_num"/> of <xsl:value-of select="count(//nx:acquisitionActivity)"/>
+                                                            Activity <xsl:value-of select="$aa_num"/> of <xsl:value-of select="$activityCount"/>
                                                             <xsl:text> </xsl:text><sup class="link-icon"><i class='fa fa-link'/></sup></a>
                                                     </xsl:otherwise>
                                                 </xsl:choose>
@@ -1026,422 +1095,16 @@ Use it like:
                    <xsl:otherwise>
                     <!-- Loop through and show details of each acquisition activity -->
                     <xsl:for-each select="nx:acquisitionActivity">
-                        <div class="row aa_header_row">
-                            <div class="col-md-12">
-                                <div class="row">
-                                    <xsl:if test="@seqno = 0">
-                                        <xsl:attribute name="style">margin-top: -20px;</xsl:attribute>
-                                    </xsl:if>
-                                    <div class="col-md-6 aa-header-info">
-                                        <!-- Generate name id which corresponds to the link associated with the acquisition activity -->
-                                        <span class="aa_header" id="{generate-id(current())}">
-                                            <b>Experiment activity <xsl:value-of select="@seqno+1"/></b><xsl:text> </xsl:text>
-                                        </span>
-
-                                        <a href='javascript:void(0)' onclick="$(this).blur(); window.NexusLIMSDetail.openModal('{generate-id(current())}-modal');"
-                                           data-bs-toggle='tooltip' data-bs-placement='right'
-                                           title="Click to view this activity's setup parameters">
-                                           <i class='fa fa-tasks fa-border param-button'/>
-                                        </a>
-                                        <div style="font-size:15px">Activity contents:
-                                            <i>
-                                                <xsl:call-template name="parse-activity-contents"></xsl:call-template>
-                                            </i>
-                                        </div>
-                                        <span class="badge list-record-badge">
-                                            <xsl:value-of select="count(nx:dataset)"/> data file<xsl:if test="count(nx:dataset) > 1">s</xsl:if>
-                                        </span>
-                                        <i class="fa fa-cubes" style="margin-left:0.75em; font-size: small;"
-                                            data-bs-toggle="tooltip" data-bs-placement="bottom" title="Filetypes present in this activity"/><span style="font-size: small;"><xsl:text>: </xsl:text></span>
-                                        <xsl:variable name="this-aa-unique-extensions">
-                                            <xsl:call-template name="get-unique-extensions">
-                                                <xsl:with-param name="global" select="false()"/>
-                                            </xsl:call-template>
-                                        </xsl:variable>
-                                        <xsl:call-template name="extensions-to-badges">
-                                            <xsl:with-param name="input" select="exslt:node-set($this-aa-unique-extensions)"/>
-                                        </xsl:call-template>
-                                    </div>
-                                </div>
-                                <div class="row aa-content-row align-items-center" style="margin-top: -20px;">
-                                    <!-- preview image column -->
-                                    <div class="col-lg-4 aa-img-col">
-                                        <xsl:for-each select="nx:dataset">
-                                            <!-- only show the first image in this AA's gallery by setting the
-                                                "hidden" class on all others -->
-                                            <xsl:variable name="classString">
-                                                <xsl:choose>
-                                                    <xsl:when test="position() > 1">nx-img aa-img hidden</xsl:when>
-                                                    <xsl:otherwise>nx-img aa-img visible</xsl:otherwise>
-                                                </xsl:choose>
-                                            </xsl:variable>
-                                            <xsl:element name="img">
-                                                <xsl:attribute name="class">
-                                                   <xsl:choose>
-                                                       <xsl:when test="nx:preview">
-                                                           <xsl:value-of select="$classString"/>
-                                                       </xsl:when>
-                                                       <xsl:otherwise>
-                                                           <xsl:value-of select="concat($classString, ' preview-placeholder')"/>
-                                                       </xsl:otherwise>
-                                                   </xsl:choose>
-                                                </xsl:attribute>
-                                                <xsl:attribute name="id"><xsl:value-of select="generate-id()"/>-aa-img</xsl:attribute>
-                                                <xsl:attribute name="src">
-                                                    <xsl:choose>
-                                                        <xsl:when test="nx:preview">
-                                                            <xsl:value-of select="$previewBaseUrl"/><xsl:value-of select="nx:preview"/>
-                                                        </xsl:when>
-                                                        <xsl:otherwise></xsl:otherwise>
-                                                    </xsl:choose>
-                                                </xsl:attribute>
-                                            </xsl:element>
-
-                                        </xsl:for-each>
-
-                                    </div>
-
-                                    <!-- dataset listing column -->
-                                    <div class="col-lg-8 aa-table-col">
-                                        <table class="table table-sm table-hover aa-table compact wrap" border="1"><!-- style="width:100%; border-collapse:collapse;" -->
-                                            <thead>
-                                                <tr>
-                                                    <th>
-                                                        Dataset Name
-                                                        <xsl:call-template name="help-tip">
-                                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
-                                                            <xsl:with-param name="tip-text">The name given to the dataset (typically the filename)</xsl:with-param>
-                                                        </xsl:call-template>
-                                                    </th>
-                                                    <th>
-                                                        Creation Time
-                                                    </th>
-                                                    <th>
-                                                        Type
-                                                        <xsl:call-template name="help-tip">
-                                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
-                                                            <xsl:with-param name="tip-text">A label indicating the data type of this dataset (taken from a controlled list)</xsl:with-param>
-                                                        </xsl:call-template>
-                                                    </th>
-                                                    <th>
-                                                        Role
-                                                        <xsl:call-template name="help-tip">
-                                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
-                                                            <xsl:with-param name="tip-text">A label indicating the experimental role of this dataset (taken from a controlled list)</xsl:with-param>
-                                                        </xsl:call-template>
-                                                    </th>
-                                                    <xsl:choose>
-                                                        <xsl:when test="nx:dataset/nx:format/text()">
-                                                            <th>
-                                                                Format
-                                                                <xsl:call-template name="help-tip">
-                                                                    <xsl:with-param name="tip-placement">top</xsl:with-param>
-                                                                    <xsl:with-param name="tip-text">A string (can be a MIME type) indicating the format of the dataset (e.g. TIFF, DICOM, Excel)</xsl:with-param>
-                                                                </xsl:call-template>
-                                                            </th>
-                                                        </xsl:when>
-                                                    </xsl:choose>
-                                                    <th class='text-center'><!-- style='padding-right: 1%' -->Meta</th>
-                                                    <th class='text-center'><!-- style='padding-right: 1%' -->D/L</th>
-                                                </tr>
-                                            </thead>
-                                            <!-- Loop through each dataset -->
-                                            <tbody>
-                                                <xsl:for-each select="nx:dataset">
-                                                    <tr img-id="{generate-id()}-aa-img">
-                                                        <!-- Populate table values with the metadata name and value -->
-                                                        <!-- generate a dataset id that matches preview image as an attribute on the first column for accessing later via JS -->
-                                                        <xsl:element name="td">
-                                                            <xsl:value-of select="nx:name"/>
-                                                        </xsl:element>
-                                                        <xsl:element name="td">
-                                                            <xsl:choose>
-                                                                <xsl:when test="nx:meta[@name = 'Creation Time']">
-                                                                    <xsl:variable name="dt" select="string(nx:meta[@name = 'Creation Time'])"/>
-                                                                    <xsl:value-of select="concat(
-                                                                        substring($dt,1,10),' ',
-                                                                        substring($dt,12,5))" />
-                                                                </xsl:when>
-                                                                <xsl:when test="../nx:setup/nx:param[@name = 'Creation Time']">
-                                                                    <xsl:variable name="dt" select="string(../nx:setup/nx:param[@name = 'Creation Time'])"/>
-                                                                    <xsl:value-of select="concat(
-                                                                        substring($dt,1,10),' ',
-                                                                        substring($dt,12,5))" />
-                                                                </xsl:when>
-                                                                <xsl:otherwise>---</xsl:otherwise>
-                                                            </xsl:choose>
-                                                        </xsl:element>
-                                                        <xsl:variable name="dataset-type">
-                                                            <xsl:choose>
-                                                                <xsl:when test="string(@type) = 'SpectrumImage'">Spectrum Image</xsl:when>
-                                                                <xsl:otherwise><xsl:value-of select="@type"/></xsl:otherwise>
-                                                            </xsl:choose>
-                                                        </xsl:variable>
-                                                        <td><xsl:value-of select="$dataset-type"/></td>
-                                                        <td><xsl:value-of select="@role"/></td>
-                                                        <xsl:choose>
-                                                            <xsl:when test="../nx:dataset/nx:format/text()">
-                                                                <td><xsl:value-of select="nx:format/text()"/></td>
-                                                            </xsl:when>
-                                                        </xsl:choose>
-                                                        <td class='text-center aa-meta-col'>
-                                                            <!-- Modal content inside of table, since it needs to be in the context of this dataset -->
-                                                            <a href='javascript:void(0)' onclick="$(this).blur(); window.NexusLIMSDetail.openModal('{generate-id(current())}-modal');"
-                                                            data-bs-toggle='tooltip' data-bs-placement='left'
-                                                            title="Click to view this dataset's unique metadata">
-                                                                <i class='fa fa-tasks fa-border param-button' style='margin-left:0;'/>
-                                                            </a>
-                                                            <xsl:variable name="json-location-raw">
-                                                                <xsl:choose>
-                                                                    <xsl:when test="nx:preview">
-                                                                        <xsl:value-of select="$previewBaseUrl"/>
-                                                                        <xsl:value-of select="substring-before(nx:preview, '.thumb.png')"/>
-                                                                        <xsl:text>.json</xsl:text>
-                                                                    </xsl:when>
-                                                                    <xsl:otherwise>
-                                                                        <xsl:value-of select="$previewBaseUrl"/>
-                                                                        <xsl:value-of select="nx:location"/>
-                                                                        <xsl:text>.json</xsl:text>
-                                                                    </xsl:otherwise>
-                                                                </xsl:choose>
-                                                            </xsl:variable>
-                                                            <xsl:variable name="json-location" select="normalize-space($json-location-raw)"/>
-                                                            <xsl:element name='a'>
-                                                                <xsl:attribute name="href"><xsl:value-of select="$json-location"/></xsl:attribute>
-                                                                <xsl:attribute name="onclick">
-                                                                    $(this).blur()
-                                                                </xsl:attribute>
-                                                                <xsl:attribute name="target">_blank</xsl:attribute>
-                                                                <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
-                                                                <xsl:attribute name="data-bs-placement">right</xsl:attribute>
-                                                                <xsl:attribute name="data-bs-html">true</xsl:attribute>
-                                                                <xsl:attribute name="title">Click to download this dataset's metadata in JSON format</xsl:attribute>
-                                                                <i class='fa fa-download fa-border param-button' style='margin-left:0;'/>
-                                                            </xsl:element>
-                                                            <div id="{generate-id(current())}-modal" class="nexuslims-modal dataset-meta-modal modal">
-                                                                <div class="modal-content">
-                                                                    <div class="container-fluid">
-                                                                        <div class="d-flex justify-content-between align-items-start">
-                                                                            <h5 class="modal-title"><xsl:value-of select="nx:name"/></h5>
-                                                                            <i class="close-modal fas fa-times" onclick="window.NexusLIMSDetail.closeModal('{generate-id(current())}-modal')"/>
-                                                                        </div>
-                                                                        <xsl:if test="nx:description/text()">
-                                                                            <div class="row">
-                                                                                <div class='col-12' style=''>
-                                                                                    <div style="font-size:15px">Dataset description:
-                                                                                        <i><xsl:value-of select="nx:description"/></i>
-                                                                                    </div>
-                                                                                </div>
-                                                                            </div>
-                                                                        </xsl:if>
-                                                                        <div class="row" style="justify-content: center;">
-                                                                            <div class='col-12 meta-table-col' style="">
-                                                                                <!-- Generate the table with setup conditions for each acquisition activity -->
-                                                                                <table class="table table-sm table-hover meta-table compact text-start" border="1"><!-- style="" -->
-                                                                                    <thead>
-                                                                                        <tr>
-                                                                                            <th>Metadata Parameter
-                                                                                                <xsl:call-template name="help-tip">
-                                                                                                    <xsl:with-param name="tip-placement">right</xsl:with-param>
-                                                                                                    <xsl:with-param name="tip-text">The following metadata values are those (within an activity) that are unique to each dataset</xsl:with-param>
-                                                                                                </xsl:call-template></th>
-                                                                                            <th>Value</th>
-                                                                                        </tr>
-                                                                                    </thead>
-                                                                                    <tbody>
-                                                                                        <xsl:for-each select="nx:meta">
-    <!--                                                                                        <xsl:sort select="@name"/>
-                                                                                                Don't sort here because xsl is case-sensitive, which isn't what we want
-    -->
-                                                                                            <tr>
-                                                                                                <!-- Populate table values with the metadata name and value -->
-                                                                                                <td><b><xsl:value-of select="@name"/>
-                                                                                                <xsl:if test="@unit">
-                                                                                                    <xsl:text> (</xsl:text>
-                                                                                                    <xsl:value-of select="@unit"/>
-                                                                                                    <xsl:text>)</xsl:text>
-                                                                                                </xsl:if></b>
-                                                                                                <!-- If this parameter has a warning attribute, then add warning tooltip -->
-                                                                                                <xsl:if test="@warning = 'true'"><xsl:text> </xsl:text>
-                                                                                                    <xsl:call-template name="warning-tip">
-                                                                                                        <xsl:with-param name="tip-placement">right</xsl:with-param>
-                                                                                                        <xsl:with-param name="tip-text">This parameter is known to be unreliable, so use its value with caution</xsl:with-param>
-                                                                                                    </xsl:call-template>
-                                                                                                </xsl:if>
-                                                                                                </td>
-                                                                                                <td>
-                                                                                                    <xsl:attribute name="class">
-                                                                                                        <xsl:if test="@warning = 'true'">has-warning</xsl:if>
-                                                                                                    </xsl:attribute>
-                                                                                                    <xsl:choose>
-                                                                                                        <!-- If metadata tag is "Data Type", then replace '_' with ' ' -->
-                                                                                                        <xsl:when test="@name = 'Data Type'">
-                                                                                                            <xsl:call-template name="string-replace-all">
-                                                                                                                <xsl:with-param name="text"><xsl:value-of select="current()"/></xsl:with-param>
-                                                                                                                <xsl:with-param name="replace" select="'_'" />
-                                                                                                                <xsl:with-param name="by" select="' '" />
-                                                                                                            </xsl:call-template>
-                                                                                                        </xsl:when>
-                                                                                                        <!-- If Creation Time, format more nicely -->
-                                                                                                        <xsl:when test="@name = 'Creation Time'">
-                                                                                                            <xsl:variable name="dt" select="string(current())"/>
-                                                                                                            <xsl:value-of select="concat(
-                                                                                                                substring($dt,1,10),' ',
-                                                                                                                substring($dt,12,5))" />
-                                                                                                        </xsl:when>
-                                                                                                        <xsl:otherwise>
-                                                                                                            <xsl:value-of select="current()"/>
-                                                                                                        </xsl:otherwise>
-                                                                                                    </xsl:choose>
-                                                                                                </td>
-                                                                                            </tr>
-                                                                                        </xsl:for-each>
-                                                                                    </tbody>
-                                                                                </table>
-                                                                            </div>
-                                                                        </div>
-                                                                        <div class='row'
-                                                                             style="justify-content: center;">
-                                                                            <div class='col-12 text-center mt-3 missing-metadata'>
-                                                                                <xsl:element name='a'>
-                                                                                    <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
-                                                                                    <xsl:attribute name="data-bs-placement">top</xsl:attribute>
-                                                                                    <xsl:attribute name="data-bs-html">true</xsl:attribute>
-                                                                                    <xsl:attribute name="title">This table only shows metadata values unique to each dataset in this activity. All other metadata values that were common to all files in this activity can be viewed by clicking the "view metadata" button in the header for this activity (look for the <xsl:text disable-output-escaping="yes">&lt;i class="fa fa-tasks fa-border"&gt;&lt;/i&gt;</xsl:text> icon).</xsl:attribute>
-                                                                                    <i class='fa fa-question-circle' style=''/>
-                                                                                    Missing metadata?
-                                                                                </xsl:element>
-                                                                            </div>
-                                                                        </div>
-                                                                    </div>
-                                                                </div>
-                                                            </div>
-                                                        </td>
-                                                        <td class='text-center aa-dl-col'>
-                                                            <xsl:element name='a'>
-                                                                <xsl:attribute name="href"><xsl:value-of select="$datasetBaseUrl"/><xsl:value-of select="nx:location"/></xsl:attribute>
-                                                                <xsl:attribute name="onclick">
-                                                                    $(this).blur()
-                                                                </xsl:attribute>
-                                                                <xsl:attribute name="download"/>
-                                                                <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
-                                                                <xsl:attribute name="data-bs-placement">right</xsl:attribute>
-                                                                <xsl:attribute name="data-bs-html">true</xsl:attribute>
-                                                                <xsl:attribute name="title">Click to download &#013;<xsl:value-of select='nx:name'/></xsl:attribute>
-                                                                <i class='fa fa-download fa-border param-button' style='margin-left:0;'/>
-                                                            </xsl:element>
-                                                        </td>
-                                                    </tr>
-                                                </xsl:for-each>
-                                            </tbody>
-                                        </table>
-                                    </div>
-                                </div>
-                            </div>
-                            <!-- Generate unique modal box for each AA which contains the setup params, accessed via a button -->
-                            <div id="{generate-id(current())}-modal" class="nexuslims-modal aa-setup-params-modal modal">
-                                <div class="modal-content">
-                                    <div class="container-fluid">
-                                        <div class="d-flex justify-content-between align-items-start">
-                                            <h5 class="modal-title">Experiment activity <xsl:value-of select="@seqno+1"/></h5>
-                                            <i class="close-modal fas fa-times" onclick="window.NexusLIMSDetail.closeModal('{generate-id(current())}-modal')"/>
-                                        </div>
-                                        <div class="row">
-                                            <div class='col-12' style=''>
-                                                <div style="font-size:15px">Activity contents:
-                                                    <i>
-                                                        <xsl:call-template name="parse-activity-contents"></xsl:call-template>
-                                                    </i>
-                                                </div>
-                                            </div>
-                                        </div>
-                                        <div class="row" style="justify-content: center;">
-                                            <div class='col-12 meta-table-col' style="">
-                                                <!-- Generate the table with setup conditions for each acquisition activity -->
-                                                <table class="table table-sm table-hover meta-table compact text-start" border="1"><!-- style="" -->
-                                                    <thead>
-                                                        <tr>
-                                                            <th>Setup Parameter
-                                                            <xsl:call-template name="help-tip">
-                                                                <xsl:with-param name="tip-placement">right</xsl:with-param>
-                                                                <xsl:with-param name="tip-text">Setup parameters are defined as those metadata values that are common between all datasets within a given activity</xsl:with-param>
-                                                            </xsl:call-template></th>
-                                                            <th>Value</th>
-                                                        </tr>
-                                                    </thead>
-                                                    <tbody>
-                                                        <tr>
-                                                            <td><b>Start time</b></td>
-                                                            <td>
-                                                                <xsl:variable name="dt">
-                                                                  <xsl:call-template name="tokenize-select">
-                                                                  <xsl:with-param name="text" select="nx:startTime"/>
-                                                                    <xsl:with-param name="delim">T</xsl:with-param>
-                                                                    <xsl:with-param name="i" select="2"/>
-                                                                  </xsl:call-template>
-                                                                </xsl:variable>
-                                                                <xsl:value-of select="substring($dt,1,8)" />
-                                                            </td>
-                                                        </tr>
-                                                        <!-- Loop through each setup value under the 'param' heading -->
-                                                        <xsl:for-each select="nx:setup/nx:param">
-    <!--                                                        <xsl:sort select="@name"/>
-                                                                Don't sort here because xsl is case-sensitive, which isn't what we want
-    -->
-                                                            <tr>
-                                                                <!-- Populate setup table with parameter name and value -->
-                                                                <td><b><xsl:value-of select="@name"/>
-                                                                <xsl:if test="@unit">
-                                                                    <xsl:text> (</xsl:text>
-                                                                    <xsl:value-of select="@unit"/>
-                                                                    <xsl:text>)</xsl:text>
-                                                                </xsl:if></b>
-                                                                <xsl:if test="@warning = 'true'"><xsl:text> </xsl:text>
-                                                                    <xsl:call-template name="warning-tip">
-                                                                        <xsl:with-param name="tip-placement">right</xsl:with-param>
-                                                                        <xsl:with-param name="tip-text">This parameter is known to be unreliable, so use its value with caution</xsl:with-param>
-                                                                    </xsl:call-template>
-                                                                </xsl:if>
-                                                                </td>
-                                                                <td>
-                                                                    <xsl:attribute name="class">
-                                                                        <xsl:if test="@warning = 'true'">has-warning</xsl:if>
-                                                                    </xsl:attribute>
-                                                                    <!-- If metadata tag is "Data Type", then replace '_' with ' ' -->
-                                                                    <xsl:choose>
-                                                                        <xsl:when test="@name = 'Data Type'">
-                                                                            <xsl:call-template name="string-replace-all">
-                                                                                <xsl:with-param name="text"><xsl:value-of select="current()"/></xsl:with-param>
-                                                                                <xsl:with-param name="replace" select="'_'" />
-                                                                                <xsl:with-param name="by" select="' '" />
-                                                                            </xsl:call-template>
-                                                                        </xsl:when>
-                                                                        <xsl:otherwise>
-                                                                            <xsl:value-of select="current()"/>
-                                                                        </xsl:otherwise>
-                                                                    </xsl:choose></td>
-                                                            </tr>
-                                                        </xsl:for-each>
-                                                    </tbody>
-                                                </table>
-                                            </div>
-                                        </div>
-                                        <div class='row' style="justify-content: center;">
-                                            <div class='col-12 text-center mt-3 missing-metadata'>
-                                                <xsl:element name='a'>
-                                                    <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
-                                                    <xsl:attribute name="data-bs-placement">top</xsl:attribute>
-                                                    <xsl:attribute name="data-bs-html">true</xsl:attribute>
-                                                    <xsl:attribute name="title">This table only shows metadata values common to all files in this activity. For metadata specific to each dataset, click the metadata table button for that dataset in the table below (look for the <xsl:text disable-output-escaping="yes">&lt;i class="fa fa-tasks fa-border"&gt;&lt;/i&gt;</xsl:text> icon).</xsl:attribute>
-                                                    <i class='fa fa-question-circle' style=''/>
-                                                    Missing metadata?
-                                                </xsl:element>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
+                        <xsl:choose>
+                            <xsl:when test="$activityFragmentUrl != ''">
+                                <xsl:apply-templates select="." mode="activity-skeleton">
+                                    <xsl:with-param name="index" select="position()"/>
+                                </xsl:apply-templates>
+                            </xsl:when>
+                            <xsl:otherwise>
+                                <xsl:apply-templates select="." mode="activity-detail"/>
+                            </xsl:otherwise>
+                        </xsl:choose>
                     </xsl:for-each>
                    </xsl:otherwise>
                </xsl:choose>
@@ -1665,6 +1328,469 @@ Use it like:
         </div>
     </xsl:template>
 
+    <!--
+        Details of an acquisition activity: header, preview images, dataset table and setup
+        parameters modal. The ids are prefixed with $id-prefix, so that the ids of an
+        activity rendered on its own (see $activityIndex) do not collide with the ids of
+        the page it is inserted in.
+    -->
+    <xsl:template match="nx:acquisitionActivity" mode="activity-detail">
+        <div class="row aa_header_row">
+            <div class="col-md-12">
+                <div class="row">
+                    <xsl:if test="@seqno = 0">
+                        <xsl:attribute name="style">margin-top: -20px;</xsl:attribute>
+                    </xsl:if>
+                    <div class="col-md-6 aa-header-info">
+                        <!-- Generate name id which corresponds to the link associated with the acquisition activity -->
+                        <span class="aa_header" id="{$id-prefix}{generate-id(current())}">
+                            <b>Experiment activity <xsl:value-of select="@seqno+1"/></b><xsl:text> </xsl:text>
+                        </span>
+
+                        <a href='javascript:void(0)' onclick="$(this).blur(); window.NexusLIMSDetail.openModal('{$id-prefix}{generate-id(current())}-modal');"
+                           data-bs-toggle='tooltip' data-bs-placement='right'
+                           title="Click to view this activity's setup parameters">
+                           <i class='fa fa-tasks fa-border param-button'/>
+                        </a>
+                        <div style="font-size:15px">Activity contents:
+                            <i>
+                                <xsl:call-template name="parse-activity-contents"></xsl:call-template>
+                            </i>
+                        </div>
+                        <span class="badge list-record-badge">
+                            <xsl:value-of select="count(nx:dataset)"/> data file<xsl:if test="count(nx:dataset) > 1">s</xsl:if>
+                        </span>
+                        <i class="fa fa-cubes" style="margin-left:0.75em; font-size: small;"
+                            data-bs-toggle="tooltip" data-bs-placement="bottom" title="Filetypes present in this activity"/><span style="font-size: small;"><xsl:text>: </xsl:text></span>
+                        <xsl:variable name="this-aa-unique-extensions">
+                            <xsl:call-template name="get-unique-extensions">
+                                <xsl:with-param name="global" select="false()"/>
+                            </xsl:call-template>
+                        </xsl:variable>
+                        <xsl:call-template name="extensions-to-badges">
+                            <xsl:with-param name="input" select="exslt:node-set($this-aa-unique-extensions)"/>
+                        </xsl:call-template>
+                    </div>
+                </div>
+                <div class="row aa-content-row align-items-center" style="margin-top: -20px;">
+                    <!-- preview image column -->
+                    <div class="col-lg-4 aa-img-col">
+                        <xsl:for-each select="nx:dataset">
+                            <!-- only show the first image in this AA's gallery by setting the
+                                "hidden" class on all others -->
+                            <xsl:variable name="classString">
+                                <xsl:choose>
+                                    <xsl:when test="position() > 1">nx-img aa-img hidden</xsl:when>
+                                    <xsl:otherwise>nx-img aa-img visible</xsl:otherwise>
+                                </xsl:choose>
+                            </xsl:variable>
+                            <xsl:element name="img">
+                                <xsl:attribute name="class">
+                                   <xsl:choose>
+                                       <xsl:when test="nx:preview">
+                                           <xsl:value-of select="$classString"/>
+                                       </xsl:when>
+                                       <xsl:otherwise>
+                                           <xsl:value-of select="concat($classString, ' preview-placeholder')"/>
+                                       </xsl:otherwise>
+                                   </xsl:choose>
+                                </xsl:attribute>
+                                <xsl:attribute name="id"><xsl:value-of select="$id-prefix"/><xsl:value-of select="generate-id()"/>-aa-img</xsl:attribute>
+                                <xsl:attribute name="src">
+                                    <xsl:choose>
+                                        <xsl:when test="nx:preview">
+                                            <xsl:value-of select="$previewBaseUrl"/><xsl:value-of select="nx:preview"/>
+                                        </xsl:when>
+                                        <xsl:otherwise></xsl:otherwise>
+                                    </xsl:choose>
+                                </xsl:attribute>
+                            </xsl:element>
+
+                        </xsl:for-each>
+
+                    </div>
+
+                    <!-- dataset listing column -->
+                    <div class="col-lg-8 aa-table-col">
+                        <table class="table table-sm table-hover aa-table compact wrap" border="1"><!-- style="width:100%; border-collapse:collapse;" -->
+                            <thead>
+                                <tr>
+                                    <th>
+                                        Dataset Name
+                                        <xsl:call-template name="help-tip">
+                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
+                                            <xsl:with-param name="tip-text">The name given to the dataset (typically the filename)</xsl:with-param>
+                                        </xsl:call-template>
+                                    </th>
+                                    <th>
+                                        Creation Time
+                                    </th>
+                                    <th>
+                                        Type
+                                        <xsl:call-template name="help-tip">
+                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
+                                            <xsl:with-param name="tip-text">A label indicating the data type of this dataset (taken from a controlled list)</xsl:with-param>
+                                        </xsl:call-template>
+                                    </th>
+                                    <th>
+                                        Role
+                                        <xsl:call-template name="help-tip">
+                                            <xsl:with-param name="tip-placement">top</xsl:with-param>
+                                            <xsl:with-param name="tip-text">A label indicating the experimental role of this dataset (taken from a controlled list)</xsl:with-param>
+                                        </xsl:call-template>
+                                    </th>
+                                    <xsl:choose>
+                                        <xsl:when test="nx:dataset/nx:format/text()">
+                                            <th>
+                                                Format
+                                                <xsl:call-template name="help-tip">
+                                                    <xsl:with-param name="tip-placement">top</xsl:with-param>
+                                                    <xsl:with-param name="tip-text">A string (can be a MIME type) indicating the format of the dataset (e.g. TIFF, DICOM, Excel)</xsl:with-param>
+                                                </xsl:call-template>
+                                            </th>
+                                        </xsl:when>
+                                    </xsl:choose>
+                                    <th class='text-center'><!-- style='padding-right: 1%' -->Meta</th>
+                                    <th class='text-center'><!-- style='padding-right: 1%' -->D/L</th>
+                                </tr>
+                            </thead>
+                            <!-- Loop through each dataset -->
+                            <tbody>
+                                <xsl:for-each select="nx:dataset">
+                                    <tr img-id="{$id-prefix}{generate-id()}-aa-img">
+                                        <!-- Populate table values with the metadata name and value -->
+                                        <!-- generate a dataset id that matches preview image as an attribute on the first column for accessing later via JS -->
+                                        <xsl:element name="td">
+                                            <xsl:value-of select="nx:name"/>
+                                        </xsl:element>
+                                        <xsl:element name="td">
+                                            <xsl:choose>
+                                                <xsl:when test="nx:meta[@name = 'Creation Time']">
+                                                    <xsl:variable name="dt" select="string(nx:meta[@name = 'Creation Time'])"/>
+                                                    <xsl:value-of select="concat(
+                                                        substring($dt,1,10),' ',
+                                                        substring($dt,12,5))" />
+                                                </xsl:when>
+                                                <xsl:when test="../nx:setup/nx:param[@name = 'Creation Time']">
+                                                    <xsl:variable name="dt" select="string(../nx:setup/nx:param[@name = 'Creation Time'])"/>
+                                                    <xsl:value-of select="concat(
+                                                        substring($dt,1,10),' ',
+                                                        substring($dt,12,5))" />
+                                                </xsl:when>
+                                                <xsl:otherwise>---</xsl:otherwise>
+                                            </xsl:choose>
+                                        </xsl:element>
+                                        <xsl:variable name="dataset-type">
+                                            <xsl:choose>
+                                                <xsl:when test="string(@type) = 'SpectrumImage'">Spectrum Image</xsl:when>
+                                                <xsl:otherwise><xsl:value-of select="@type"/></xsl:otherwise>
+                                            </xsl:choose>
+                                        </xsl:variable>
+                                        <td><xsl:value-of select="$dataset-type"/></td>
+                                        <td><xsl:value-of select="@role"/></td>
+                                        <xsl:choose>
+                                            <xsl:when test="../nx:dataset/nx:format/text()">
+                                                <td><xsl:value-of select="nx:format/text()"/></td>
+                                            </xsl:when>
+                                        </xsl:choose>
+                                        <td class='text-center aa-meta-col'>
+                                            <!-- Modal content inside of table, since it needs to be in the context of this dataset -->
+                                            <a href='javascript:void(0)' onclick="$(this).blur(); window.NexusLIMSDetail.openModal('{$id-prefix}{generate-id(current())}-modal');"
+                                            data-bs-toggle='tooltip' data-bs-placement='left'
+                                            title="Click to view this dataset's unique metadata">
+                                                <i class='fa fa-tasks fa-border param-button' style='margin-left:0;'/>
+                                            </a>
+                                            <xsl:variable name="json-location-raw">
+                                                <xsl:choose>
+                                                    <xsl:when test="nx:preview">
+                                                        <xsl:value-of select="$previewBaseUrl"/>
+                                                        <xsl:value-of select="substring-before(nx:preview, '.thumb.png')"/>
+                                                        <xsl:text>.json</xsl:text>
+                                                    </xsl:when>
+                                                    <xsl:otherwise>
+                                                        <xsl:value-of select="$previewBaseUrl"/>
+                                                        <xsl:value-of select="nx:location"/>
+                                                        <xsl:text>.json</xsl:text>
+                                                    </xsl:otherwise>
+                                                </xsl:choose>
+                                            </xsl:variable>
+                                            <xsl:variable name="json-location" select="normalize-space($json-location-raw)"/>
+                                            <xsl:element name='a'>
+                                                <xsl:attribute name="href"><xsl:value-of select="$json-location"/></xsl:attribute>
+                                                <xsl:attribute name="onclick">
+                                                    $(this).blur()
+                                                </xsl:attribute>
+                                                <xsl:attribute name="target">_blank</xsl:attribute>
+                                                <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
+                                                <xsl:attribute name="data-bs-placement">right</xsl:attribute>
+                                                <xsl:attribute name="data-bs-html">true</xsl:attribute>
+                                                <xsl:attribute name="title">Click to download this dataset's metadata in JSON format</xsl:attribute>
+                                                <i class='fa fa-download fa-border param-button' style='margin-left:0;'/>
+                                            </xsl:element>
+                                            <div id="{$id-prefix}{generate-id(current())}-modal" class="nexuslims-modal dataset-meta-modal modal">
+                                                <div class="modal-content">
+                                                    <div class="container-fluid">
+                                                        <div class="d-flex justify-content-between align-items-start">
+                                                            <h5 class="modal-title"><xsl:value-of select="nx:name"/></h5>
+                                                            <i class="close-modal fas fa-times" onclick="window.NexusLIMSDetail.closeModal('{$id-prefix}{generate-id(current())}-modal')"/>
+                                                        </div>
+                                                        <xsl:if test="nx:description/text()">
+                                                            <div class="row">
+                                                                <div class='col-12' style=''>
+                                                                    <div style="font-size:15px">Dataset description:
+                                                                        <i><xsl:value-of select="nx:description"/></i>
+                                                                    </div>
+                                                                </div>
+                                                            </div>
+                                                        </xsl:if>
+                                                        <div class="row" style="justify-content: center;">
+                                                            <div class='col-12 meta-table-col' style="">
+                                                                <!-- Generate the table with setup conditions for each acquisition activity -->
+                                                                <table class="table table-sm table-hover meta-table compact text-start" border="1"><!-- style="" -->
+                                                                    <thead>
+                                                                        <tr>
+                                                                            <th>Metadata Parameter
+                                                                                <xsl:call-template name="help-tip">
+                                                                                    <xsl:with-param name="tip-placement">right</xsl:with-param>
+                                                                                    <xsl:with-param name="tip-text">The following metadata values are those (within an activity) that are unique to each dataset</xsl:with-param>
+                                                                                </xsl:call-template></th>
+                                                                            <th>Value</th>
+                                                                        </tr>
+                                                                    </thead>
+                                                                    <tbody>
+                                                                        <xsl:for-each select="nx:meta">
+    <!--                                                                                        <xsl:sort select="@name"/>
+                                                                                Don't sort here because xsl is case-sensitive, which isn't what we want
+    -->
+                                                                            <tr>
+                                                                                <!-- Populate table values with the metadata name and value -->
+                                                                                <td><b><xsl:value-of select="@name"/>
+                                                                                <xsl:if test="@unit">
+                                                                                    <xsl:text> (</xsl:text>
+                                                                                    <xsl:value-of select="@unit"/>
+                                                                                    <xsl:text>)</xsl:text>
+                                                                                </xsl:if></b>
+                                                                                <!-- If this parameter has a warning attribute, then add warning tooltip -->
+                                                                                <xsl:if test="@warning = 'true'"><xsl:text> </xsl:text>
+                                                                                    <xsl:call-template name="warning-tip">
+                                                                                        <xsl:with-param name="tip-placement">right</xsl:with-param>
+                                                                                        <xsl:with-param name="tip-text">This parameter is known to be unreliable, so use its value with caution</xsl:with-param>
+                                                                                    </xsl:call-template>
+                                                                                </xsl:if>
+                                                                                </td>
+                                                                                <td>
+                                                                                    <xsl:attribute name="class">
+                                                                                        <xsl:if test="@warning = 'true'">has-warning</xsl:if>
+                                                                                    </xsl:attribute>
+                                                                                    <xsl:choose>
+                                                                                        <!-- If metadata tag is "Data Type", then replace '_' with ' ' -->
+                                                                                        <xsl:when test="@name = 'Data Type'">
+                                                                                            <xsl:call-template name="string-replace-all">
+                                                                                                <xsl:with-param name="text"><xsl:value-of select="current()"/></xsl:with-param>
+                                                                                                <xsl:with-param name="replace" select="'_'" />
+                                                                                                <xsl:with-param name="by" select="' '" />
+                                                                                            </xsl:call-template>
+                                                                                        </xsl:when>
+                                                                                        <!-- If Creation Time, format more nicely -->
+                                                                                        <xsl:when test="@name = 'Creation Time'">
+                                                                                            <xsl:variable name="dt" select="string(current())"/>
+                                                                                            <xsl:value-of select="concat(
+                                                                                                substring($dt,1,10),' ',
+                                                                                                substring($dt,12,5))" />
+                                                                                        </xsl:when>
+                                                                                        <xsl:otherwise>
+                                                                                            <xsl:value-of select="current()"/>
+                                                                                        </xsl:otherwise>
+                                                                                    </xsl:choose>
+                                                                                </td>
+                                                                            </tr>
+                                                                        </xsl:for-each>
+                                                                    </tbody>
+                                                                </table>
+                                                            </div>
+                                                        </div>
+                                                        <div class='row'
+                                                             style="justify-content: center;">
+                                                            <div class='col-12 text-center mt-3 missing-metadata'>
+                                                                <xsl:element name='a'>
+                                                                    <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
+                                                                    <xsl:attribute name="data-bs-placement">top</xsl:attribute>
+                                                                    <xsl:attribute name="data-bs-html">true</xsl:attribute>
+                                                                    <xsl:attribute name="title">This table only shows metadata values unique to each dataset in this activity. All other metadata values that were common to all files in this activity can be viewed by clicking the "view metadata" button in the header for this activity (look for the <xsl:text disable-output-escaping="yes">&lt;i class="fa fa-tasks fa-border"&gt;&lt;/i&gt;</xsl:text> icon).</xsl:attribute>
+                                                                    <i class='fa fa-question-circle' style=''/>
+                                                                    Missing metadata?
+                                                                </xsl:element>
+                                                            </div>
+                                                        </div>
+                                                    </div>
+                                                </div>
+                                            </div>
+                                        </td>
+                                        <td class='text-center aa-dl-col'>
+                                            <xsl:element name='a'>
+                                                <xsl:attribute name="href"><xsl:value-of select="$datasetBaseUrl"/><xsl:value-of select="nx:location"/></xsl:attribute>
+                                                <xsl:attribute name="onclick">
+                                                    $(this).blur()
+                                                </xsl:attribute>
+                                                <xsl:attribute name="download"/>
+                                                <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
+                                                <xsl:attribute name="data-bs-placement">right</xsl:attribute>
+                                                <xsl:attribute name="data-bs-html">true</xsl:attribute>
+                                                <xsl:attribute name="title">Click to download &#013;<xsl:value-of select='nx:name'/></xsl:attribute>
+                                                <i class='fa fa-download fa-border param-button' style='margin-left:0;'/>
+                                            </xsl:element>
+                                        </td>
+                                    </tr>
+                                </xsl:for-each>
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+            </div>
+            <!-- Generate unique modal box for each AA which contains the setup params, accessed via a button -->
+            <div id="{$id-prefix}{generate-id(current())}-modal" class="nexuslims-modal aa-setup-params-modal modal">
+                <div class="modal-content">
+                    <div class="container-fluid">
+                        <div class="d-flex justify-content-between align-items-start">
+                            <h5 class="modal-title">Experiment activity <xsl:value-of select="@seqno+1"/></h5>
+                            <i class="close-modal fas fa-times" onclick="window.NexusLIMSDetail.closeModal('{$id-prefix}{generate-id(current())}-modal')"/>
+                        </div>
+                        <div class="row">
+                            <div class='col-12' style=''>
+                                <div style="font-size:15px">Activity contents:
+                                    <i>
+                                        <xsl:call-template name="parse-activity-contents"></xsl:call-template>
+                                    </i>
+                                </div>
+                            </div>
+                        </div>
+                        <div class="row" style="justify-content: center;">
+                            <div class='col-12 meta-table-col' style="">
+                                <!-- Generate the table with setup conditions for each acquisition activity -->
+                                <table class="table table-sm table-hover meta-table compact text-start" border="1"><!-- style="" -->
+                                    <thead>
+                                        <tr>
+                                            <th>Setup Parameter
+                                            <xsl:call-template name="help-tip">
+                                                <xsl:with-param name="tip-placement">right</xsl:with-param>
+                                                <xsl:with-param name="tip-text">Setup parameters are defined as those metadata values that are common between all datasets within a given activity</xsl:with-param>
+                                            </xsl:call-template></th>
+                                            <th>Value</th>
+                                        </tr>
+                                    </thead>
+                                    <tbody>
+                                        <tr>
+                                            <td><b>Start time</b></td>
+                                            <td>
+                                                <xsl:variable name="dt">
+                                                  <xsl:call-template name="tokenize-select">
+                                                  <xsl:with-param name="text" select="nx:startTime"/>
+                                                    <xsl:with-param name="delim">T</xsl:with-param>
+                                                    <xsl:with-param name="i" select="2"/>
+                                                  </xsl:call-template>
+                                                </xsl:variable>
+                                                <xsl:value-of select="substring($dt,1,8)" />
+                                            </td>
+                                        </tr>
+                                        <!-- Loop through each setup value under the 'param' heading -->
+                                        <xsl:for-each select="nx:setup/nx:param">
+    <!--                                                        <xsl:sort select="@name"/>
+                                                Don't sort here because xsl is case-sensitive, which isn't what we want
+    -->
+                                            <tr>
+                                                <!-- Populate setup table with parameter name and value -->
+                                                <td><b><xsl:value-of select="@name"/>
+                                                <xsl:if test="@unit">
+                                                    <xsl:text> (</xsl:text>
+                                                    <xsl:value-of select="@unit"/>
+                                                    <xsl:text>)</xsl:text>
+                                                </xsl:if></b>
+                                                <xsl:if test="@warning = 'true'"><xsl:text> </xsl:text>
+                                                    <xsl:call-template name="warning-tip">
+                                                        <xsl:with-param name="tip-placement">right</xsl:with-param>
+                                                        <xsl:with-param name="tip-text">This parameter is known to be unreliable, so use its value with caution</xsl:with-param>
+                                                    </xsl:call-template>
+                                                </xsl:if>
+                                                </td>
+                                                <td>
+                                                    <xsl:attribute name="class">
+                                                        <xsl:if test="@warning = 'true'">has-warning</xsl:if>
+                                                    </xsl:attribute>
+                                                    <!-- If metadata tag is "Data Type", then replace '_' with ' ' -->
+                                                    <xsl:choose>
+                                                        <xsl:when test="@name = 'Data Type'">
+                                                            <xsl:call-template name="string-replace-all">
+                                                                <xsl:with-param name="text"><xsl:value-of select="current()"/></xsl:with-param>
+                                                                <xsl:with-param name="replace" select="'_'" />
+                                                                <xsl:with-param name="by" select="' '" />
+                                                            </xsl:call-template>
+                                                        </xsl:when>
+                                                        <xsl:otherwise>
+                                                            <xsl:value-of select="current()"/>
+                                                        </xsl:otherwise>
+                                                    </xsl:choose></td>
+                                            </tr>
+                                        </xsl:for-each>
+                                    </tbody>
+                                </table>
+                            </div>
+                        </div>
+                        <div class='row' style="justify-content: center;">
+                            <div class='col-12 text-center mt-3 missing-metadata'>
+                                <xsl:element name='a'>
+                                    <xsl:attribute name="data-bs-toggle">tooltip</xsl:attribute>
+                                    <xsl:attribute name="data-bs-placement">top</xsl:attribute>
+                                    <xsl:attribute name="data-bs-html">true</xsl:attribute>
+                                    <xsl:attribute name="title">This table only shows metadata values common to all files in this activity. For metadata specific to each dataset, click the metadata table button for that dataset in the table below (look for the <xsl:text disable-output-escaping="yes">&lt;i class="fa fa-tasks fa-border"&gt;&lt;/i&gt;</xsl:text> icon).</xsl:attribute>
+                                    <i class='fa fa-question-circle' style=''/>
+                                    Missing metadata?
+                                </xsl:element>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </xsl:template>
+
+    <!--
+        Placeholder of an acquisition activity whose details are loaded from
+        $activityFragmentUrl when it is displayed. It holds the anchor the navigation
+        table and the image gallery link to.
+    -->
+    <xsl:template match="nx:acquisitionActivity" mode="activity-skeleton">
+        <xsl:param name="index"/>
+        <div class="row aa_header_row aa-lazy" data-activity-index="{$index}" data-fragment-url="{$activityFragmentUrl}">
+            <div class="col-md-12">
+                <div class="row">
+                    <xsl:if test="@seqno = 0">
+                        <xsl:attribute name="style">margin-top: -20px;</xsl:attribute>
+                    </xsl:if>
+                    <div class="col-md-6 aa-header-info">
+                        <span class="aa_header" id="{generate-id(current())}">
+                            <b>Experiment activity <xsl:value-of select="@seqno+1"/></b><xsl:text> </xsl:text>
+                        </span>
+                        <div style="font-size:15px">Activity contents:
+                            <i>
+                                <xsl:call-template name="parse-activity-contents"></xsl:call-template>
+                            </i>
+                        </div>
+                        <span class="badge list-record-badge">
+                            <xsl:value-of select="count(nx:dataset)"/> data file<xsl:if test="count(nx:dataset) > 1">s</xsl:if>
+                        </span>
+                    </div>
+                </div>
+                <div class="row aa-lazy-status">
+                    <div class="col-md-12 text-center">
+                        <a href='javascript:void(0)' class="aa-lazy-load">
+                            <i class="fas fa-spinner fa-spin"/> Loading activity details...
+                        </a>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </xsl:template>
+
     <!--
       - Format a date given in yyyy-mm-dd format to a text-based format
       - e.g. "2019-10-04" becomes "October 4, 2019"
@@ -1672,37 +1798,45 @@ Use it like:
       -->
     <xsl:template name="localize-date">
         <xsl:param name="date"/>
-        <xsl:variable name="month-num">
-            <xsl:call-template name="tokenize-select">
-                <xsl:with-param name="text">
-                    <xsl:value-of select="$date"/>
-                </xsl:with-param>
-                <xsl:with-param name="delim" select="'-'"/>
-                <xsl:with-param name="i" select="2"/>
-            </xsl:call-template>
-        </xsl:variable>
+        <xsl:choose>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:localize-date')">
+                <xsl:value-of select="nx-fn:localize-date(string($date))"/>
+            </xsl:when>
+            <xsl:otherwise>
+                <xsl:variable name="month-num">
+                    <xsl:call-template name="tokenize-select">
+                        <xsl:with-param name="text">
+                            <xsl:value-of select="$date"/>
+                        </xsl:with-param>
+                        <xsl:with-param name="delim" select="'-'"/>
+                        <xsl:with-param name="i" select="2"/>
+                    </xsl:call-template>
+                </xsl:variable>
 
-        <!-- The 'for-each document' bit is required because keys only work in the context of the current
-                 document in XSLT 1.0 (see https://stackoverflow.com/a/35327827/1435788) -->
-        <xsl:for-each select="document('')">
-            <xsl:value-of select="key('lookup.date.month', $month-num)"/>
-        </xsl:for-each>
-        <xsl:text> </xsl:text>
-        <xsl:call-template name="tokenize-select">
-            <xsl:with-param name="text">
-                <xsl:value-of select="$date"/>
-            </xsl:with-param>
-            <xsl:with-param name="delim" select="'-'"/>
-            <xsl:with-param name="i" select="3"/>
-        </xsl:call-template>
-        <xsl:text>, </xsl:text>
-        <xsl:call-template name="tokenize-select">
-            <xsl:with-param name="text">
-                <xsl:value-of select="$date"/>
-            </xsl:with-param>
-            <xsl:with-param name="delim" select="'-'"/>
-            <xsl:with-param name="i" select="1"/>
-        </xsl:call-template>
+                <!-- The 'for-each document' bit is required because keys only work in the context of the current
+                         document in XSLT 1.0 (see https://stackoverflow.com/a/35327827/1435788) -->
+                <xsl:for-each select="document('')">
+                    <xsl:value-of select="key('lookup.date.month', $month-num)"/>
+                </xsl:for-each>
+                <xsl:text> </xsl:text>
+                <xsl:call-template name="tokenize-select">
+                    <xsl:with-param name="text">
+                        <xsl:value-of select="$date"/>
+                    </xsl:with-param>
+                    <xsl:with-param name="delim" select="'-'"/>
+                    <xsl:with-param name="i" select="3"/>
+                </xsl:call-template>
+                <xsl:text>, </xsl:text>
+                <xsl:call-template name="tokenize-select">
+                    <xsl:with-param name="text">
+                        <xsl:value-of select="$date"/>
+                    </xsl:with-param>
+                    <xsl:with-param name="delim" select="'-'"/>
+                    <xsl:with-param name="i" select="1"/>
+                </xsl:call-template>
+            </xsl:otherwise>
+        </xsl:choose>
     </xsl:template>
 
     <!--
@@ -1714,31 +1848,38 @@ Use it like:
         <xsl:param name="path"/>
         <xsl:param name="separator" select="'/'"/>
         <xsl:param name="prepend" select="''"/>
-
         <xsl:choose>
-            <xsl:when test="not(contains($path, $separator))">
-                <item>
-                    <xsl:value-of select="concat(concat($prepend, $separator), normalize-space($path))"/>
-                </item>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:tokenize-path')">
+                <xsl:copy-of select="nx-fn:tokenize-path(string($path), string($separator), string($prepend))"/>
             </xsl:when>
             <xsl:otherwise>
-                <xsl:variable name="this-part" select="concat($prepend,  normalize-space(substring-before($path, $separator)))"/>
-                <item>
-                    <xsl:choose>
-                        <xsl:when test="$this-part = ''">
-                            <xsl:value-of select="$separator"/>
-                        </xsl:when>
-                        <xsl:otherwise>
-                            <xsl:value-of select="$this-part"/>
-                        </xsl:otherwise>
+                <xsl:choose>
+                    <xsl:when test="not(contains($path, $separator))">
+                        <item>
+                            <xsl:value-of select="concat(concat($prepend, $separator), normalize-space($path))"/>
+                        </item>
+                    </xsl:when>
+                    <xsl:otherwise>
+                        <xsl:variable name="this-part" select="concat($prepend,  normalize-space(substring-before($path, $separator)))"/>
+                        <item>
+                            <xsl:choose>
+                                <xsl:when test="$this-part = ''">
+                                    <xsl:value-of select="$separator"/>
+                                </xsl:when>
+                                <xsl:otherwise>
+                                    <xsl:value-of select="$this-part"/>
+                                </xsl:otherwise>
+                            </xsl:choose>
+                        </item>
+                        <xsl:call-template name="tokenize-path">
+                            <xsl:with-param name="path" select="substring-after($path, $separator)"/>
+                            <xsl:with-param name="prepend" select="concat($this-part, $separator)"/>
+                        </xsl:call-template>
+                    </xsl:otherwise>
                     </xsl:choose>
-                </item>
-                <xsl:call-template name="tokenize-path">
-                    <xsl:with-param name="path" select="substring-after($path, $separator)"/>
-                    <xsl:with-param name="prepend" select="concat($this-part, $separator)"/>
-                </xsl:call-template>
             </xsl:otherwise>
-            </xsl:choose>
+        </xsl:choose>
     </xsl:template>
 
     <!--
@@ -1753,76 +1894,119 @@ Use it like:
       <xsl:param name="text"/>
       <xsl:param name="delim" select="' '"/>
       <xsl:param name="i" select="1"/>
-
-      <xsl:choose>
-
-        <!-- we want the first element; we can deliver it  -->
-        <xsl:when test="$i=1">
-          <xsl:choose>
-            <xsl:when test="contains($text,$delim)">
-              <xsl:value-of select="substring-before($text,$delim)"/>
+        <xsl:choose>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:tokenize-select')">
+                <xsl:value-of select="nx-fn:tokenize-select(string($text), string($delim), number($i))"/>
             </xsl:when>
             <xsl:otherwise>
-              <xsl:value-of select="$text"/>
+              <xsl:choose>
+
+                <!-- we want the first element; we can deliver it  -->
+                <xsl:when test="$i=1">
+                  <xsl:choose>
+                    <xsl:when test="contains($text,$delim)">
+                      <xsl:value-of select="substring-before($text,$delim)"/>
+                    </xsl:when>
+                    <xsl:otherwise>
+                      <xsl:value-of select="$text"/>
+                    </xsl:otherwise>
+                  </xsl:choose>
+                </xsl:when>
+
+                <!-- should not happen -->
+                <xsl:when test="$i &lt;= 1"/>
+
+                <!-- need an element that's not first one; strip off the first element
+                     and recurse into this function -->
+                <xsl:otherwise>
+                  <xsl:call-template name="tokenize-select">
+                    <xsl:with-param name="text">
+                      <xsl:value-of select="substring-after($text,$delim)"/>
+                    </xsl:with-param>
+                    <xsl:with-param name="delim" select="$delim"/>
+                    <xsl:with-param name="i" select="$i - 1"/>
+                  </xsl:call-template>
+                </xsl:otherwise>
+
+              </xsl:choose>
             </xsl:otherwise>
-          </xsl:choose>
-        </xsl:when>
-
-        <!-- should not happen -->
-        <xsl:when test="$i &lt;= 1"/>
-
-        <!-- need an element that's not first one; strip off the first element
-             and recurse into this function -->
-        <xsl:otherwise>
-          <xsl:call-template name="tokenize-select">
-            <xsl:with-param name="text">
-              <xsl:value-of select="substring-after($text,$delim)"/>
-            </xsl:with-param>
-            <xsl:with-param name="delim" select="$delim"/>
-            <xsl:with-param name="i" select="$i - 1"/>
-          </xsl:call-template>
-        </xsl:otherwise>
-
-      </xsl:choose>
+        </xsl:choose>
     </xsl:template>
 
     <xsl:template name="get-unique-extensions">
         <xsl:param name="global" select="true()"/>
-        <xsl:variable name="selection">
-            <xsl:choose>
-                <xsl:when test="$global">
-                    <xsl:copy-of select="//nx:dataset/nx:location"/>
-                </xsl:when>
-                <xsl:otherwise>
-                    <xsl:copy-of select="nx:dataset/nx:location"/>
-                </xsl:otherwise>
-            </xsl:choose>
-        </xsl:variable>
-        <xsl:variable name="extension-fragment">
-            <xsl:element name="extensions">
-                <xsl:for-each select="exslt:node-set($selection)/nx:location">
-                    <xsl:call-template name="get-file-extension">
-                        <xsl:with-param name="path">
-                            <xsl:value-of select="."/>
-                        </xsl:with-param>
+        <!-- extension counts of the record summary, as "count:extension/" items -->
+        <xsl:param name="counts" select="''"/>
+        <xsl:choose>
+            <xsl:when test="$counts != ''">
+                <xsl:element name="extensionCount">
+                    <xsl:call-template name="extension-counts-to-elements">
+                        <xsl:with-param name="counts" select="$counts"/>
                     </xsl:call-template>
-                </xsl:for-each>
-            </xsl:element>
-        </xsl:variable>
+                </xsl:element>
+            </xsl:when>
+            <xsl:otherwise>
+                <xsl:variable name="selection">
+                    <xsl:choose>
+                        <xsl:when test="$global">
+                            <xsl:copy-of select="//nx:dataset/nx:location"/>
+                        </xsl:when>
+                        <xsl:otherwise>
+                            <xsl:copy-of select="nx:dataset/nx:location"/>
+                        </xsl:otherwise>
+                    </xsl:choose>
+                </xsl:variable>
+                <xsl:variable name="extension-fragment">
+                    <xsl:element name="extensions">
+                        <xsl:for-each select="exslt:node-set($selection)/nx:location">
+                            <xsl:call-template name="get-file-extension">
+                                <xsl:with-param name="path">
+                                    <xsl:value-of select="."/>
+                                </xsl:with-param>
+                            </xsl:call-template>
+                        </xsl:for-each>
+                    </xsl:element>
+                </xsl:variable>
 
-        <xsl:element name="extensionCount">
-            <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[not(preceding::value = value)]">
-                <xsl:sort select="value/text()"/>
-                <xsl:variable name="thisExtension" select="value/text()"/>
-                <xsl:variable name="thisCount" select="count(exslt:node-set($extension-fragment)/extensions/ext[value = $thisExtension])"/>
-                <xsl:element name="extension">
-                    <xsl:attribute name="count">
-                        <xsl:value-of select="$thisCount"/>
-                    </xsl:attribute>
-                    <xsl:value-of select="$thisExtension"/>
+                <xsl:element name="extensionCount">
+                    <!-- Muenchian grouping: the first ext of each value is selected and
+                        counted with key lookups, in linear time. Keys apply to the
+                        document of the context node, here the extension fragment -->
+                    <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[generate-id() = generate-id(key('extension-by-value', value)[1])]">
+                        <xsl:sort select="value/text()"/>
+                        <xsl:variable name="thisExtension" select="value/text()"/>
+                        <xsl:variable name="thisCount" select="count(key('extension-by-value', value))"/>
+                        <xsl:element name="extension">
+                            <xsl:attribute name="count">
+                                <xsl:value-of select="$thisCount"/>
+                            </xsl:attribute>
+                            <xsl:value-of select="$thisExtension"/>
+                        </xsl:element>
+                    </xsl:for-each>
                 </xsl:element>
-            </xsl:for-each>
-        </xsl:element>
+            </xsl:otherwise>
+        </xsl:choose>
+    </xsl:template>
+
+    <!--
+        Convert the extension counts of a record summary ("12:tif/3:dm3/") to the
+        extension elements built by get-unique-extensions
+    -->
+    <xsl:template name="extension-counts-to-elements">
+        <xsl:param name="counts"/>
+        <xsl:if test="contains($counts, '/')">
+            <xsl:variable name="item" select="substring-before($counts, '/')"/>
+            <xsl:element name="extension">
+                <xsl:attribute name="count">
+                    <xsl:value-of select="substring-before($item, ':')"/>
+                </xsl:attribute>
+                <xsl:value-of select="substring-after($item, ':')"/>
+            </xsl:element>
+            <xsl:call-template name="extension-counts-to-elements">
+                <xsl:with-param name="counts" select="substring-after($counts, '/')"/>
+            </xsl:call-template>
+        </xsl:if>
     </xsl:template>
 
     <xsl:template name="get-file-extension">
@@ -1963,16 +2147,23 @@ Use it like:
     <xsl:template name="substring-after-last">
         <xsl:param name="string"/>
         <xsl:param name="char"/>
-
         <xsl:choose>
-            <xsl:when test="contains($string, $char)">
-                <xsl:call-template name="substring-after-last">
-                    <xsl:with-param name="string" select="substring-after($string, $char)"/>
-                    <xsl:with-param name="char" select="$char"/>
-                </xsl:call-template>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:substring-after-last')">
+                <xsl:value-of select="nx-fn:substring-after-last(string($string), string($char))"/>
             </xsl:when>
             <xsl:otherwise>
-                <xsl:value-of select="$string"/>
+                <xsl:choose>
+                    <xsl:when test="contains($string, $char)">
+                        <xsl:call-template name="substring-after-last">
+                            <xsl:with-param name="string" select="substring-after($string, $char)"/>
+                            <xsl:with-param name="char" select="$char"/>
+                        </xsl:call-template>
+                    </xsl:when>
+                    <xsl:otherwise>
+                        <xsl:value-of select="$string"/>
+                    </xsl:otherwise>
+                </xsl:choose>
             </xsl:otherwise>
         </xsl:choose>
     </xsl:template>
@@ -2060,34 +2251,50 @@ Use it like:
         <xsl:param name="replace" />
         <xsl:param name="by" />
         <xsl:choose>
-            <xsl:when test="contains($text, $replace)">
-                <xsl:value-of select="substring-before($text,$replace)" />
-                <xsl:value-of select="$by" />
-                <xsl:call-template name="string-replace-all">
-                    <xsl:with-param name="text"
-                        select="substring-after($text,$replace)" />
-                    <xsl:with-param name="replace" select="$replace" />
-                    <xsl:with-param name="by" select="$by" />
-                </xsl:call-template>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:replace-all')">
+                <xsl:value-of select="nx-fn:replace-all(string($text), string($replace), string($by))"/>
             </xsl:when>
             <xsl:otherwise>
-                <xsl:value-of select="$text" />
+                <xsl:choose>
+                    <xsl:when test="contains($text, $replace)">
+                        <xsl:value-of select="substring-before($text,$replace)" />
+                        <xsl:value-of select="$by" />
+                        <xsl:call-template name="string-replace-all">
+                            <xsl:with-param name="text"
+                                select="substring-after($text,$replace)" />
+                            <xsl:with-param name="replace" select="$replace" />
+                            <xsl:with-param name="by" select="$by" />
+                        </xsl:call-template>
+                    </xsl:when>
+                    <xsl:otherwise>
+                        <xsl:value-of select="$text" />
+                    </xsl:otherwise>
+                </xsl:choose>
             </xsl:otherwise>
         </xsl:choose>
     </xsl:template>
 
     <xsl:template name="strip-tags">
         <xsl:param name="text"/>
-        <xsl:comment>From https://ehikioya.com/remove-html-tags-xsl-value/</xsl:comment>
         <xsl:choose>
-            <xsl:when test="contains($text, '&lt;')">
-                <xsl:value-of select="substring-before($text, '&lt;')"/>
-                <xsl:call-template name="strip-tags">
-                    <xsl:with-param name="text" select="substring-after($text, '&gt;')"/>
-                </xsl:call-template>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:strip-tags')">
+                <xsl:value-of select="nx-fn:strip-tags(string($text))"/>
             </xsl:when>
             <xsl:otherwise>
-                <xsl:value-of select="$text"/>
+                <xsl:comment>From https://ehikioya.com/remove-html-tags-xsl-value/</xsl:comment>
+                <xsl:choose>
+                    <xsl:when test="contains($text, '&lt;')">
+                        <xsl:value-of select="substring-before($text, '&lt;')"/>
+                        <xsl:call-template name="strip-tags">
+                            <xsl:with-param name="text" select="substring-after($text, '&gt;')"/>
+                        </xsl:call-template>
+                    </xsl:when>
+                    <xsl:otherwise>
+                        <xsl:value-of select="$text"/>
+                    </xsl:otherwise>
+                </xsl:choose>
             </xsl:otherwise>
         </xsl:choose>
     </xsl:template>
@@ -2212,7 +2419,14 @@ Use it like:
     -->
     <xsl:template name="simple-filelist-table">
         <xsl:variable name="filelist-rootpath">
-            <xsl:call-template name="find-root-filepath"/>
+            <xsl:choose>
+                <xsl:when test="$filelistRootPath != ''">
+                    <xsl:value-of select="$filelistRootPath"/>
+                </xsl:when>
+                <xsl:otherwise>
+                    <xsl:call-template name="find-root-filepath"/>
+                </xsl:otherwise>
+            </xsl:choose>
         </xsl:variable>
         <xsl:variable
             name="rootpath-weblink"
@@ -2246,6 +2460,11 @@ Use it like:
             class="table table-sm table-hover filelist-table compact mt-0"
             width="100%"
             border="1"><!-- style="" -->
+            <xsl:if test="$datasetRowsUrl != ''">
+                <xsl:attribute name="data-rows-url"><xsl:value-of select="$datasetRowsUrl"/></xsl:attribute>
+                <xsl:attribute name="data-dataset-base-url"><xsl:value-of select="$datasetBaseUrl"/></xsl:attribute>
+                <xsl:attribute name="data-preview-base-url"><xsl:value-of select="$previewBaseUrl"/></xsl:attribute>
+            </xsl:if>
             <thead>
                 <tr>
                     <th id="simple-filelist-number-col">
@@ -2307,6 +2526,8 @@ Use it like:
                 </tr>
             </thead>
             <tbody>
+                <!-- without a rows URL, every dataset is rendered here -->
+                <xsl:if test="$datasetRowsUrl = ''">
                 <xsl:for-each select="//nx:dataset">
                     <tr>
                         <xsl:element name="td">
@@ -2460,6 +2681,7 @@ Use it like:
                         </td>
                     </tr>
                 </xsl:for-each>
+                </xsl:if>
             </tbody>
         </table>
     </xsl:template>
@@ -2470,17 +2692,25 @@ Use it like:
         <xsl:param name="replace"/>
         <xsl:param name="with"/>
         <xsl:choose>
-            <xsl:when test="contains($text,$replace)">
-                <xsl:value-of select="substring-before($text,$replace)"/>
-                <xsl:value-of select="$with"/>
-                <xsl:call-template name="replace-string">
-                    <xsl:with-param name="text" select="substring-after($text,$replace)"/>
-                    <xsl:with-param name="replace" select="$replace"/>
-                    <xsl:with-param name="with" select="$with"/>
-                </xsl:call-template>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:replace-all')">
+                <xsl:value-of select="nx-fn:replace-all(string($text), string($replace), string($with))"/>
             </xsl:when>
             <xsl:otherwise>
-                <xsl:value-of select="$text"/>
+                <xsl:choose>
+                    <xsl:when test="contains($text,$replace)">
+                        <xsl:value-of select="substring-before($text,$replace)"/>
+                        <xsl:value-of select="$with"/>
+                        <xsl:call-template name="replace-string">
+                            <xsl:with-param name="text" select="substring-after($text,$replace)"/>
+                            <xsl:with-param name="replace" select="$replace"/>
+                            <xsl:with-param name="with" select="$with"/>
+                        </xsl:call-template>
+                    </xsl:when>
+                    <xsl:otherwise>
+                        <xsl:value-of select="$text"/>
+                    </xsl:otherwise>
+                </xsl:choose>
             </xsl:otherwise>
         </xsl:choose>
     </xsl:template>
@@ -2492,25 +2722,33 @@ Use it like:
     <xsl:template name="decode">
         <xsl:param name="encoded"/>
         <xsl:choose>
-            <xsl:when test="contains($encoded,'%')">
-                <xsl:value-of select="substring-before($encoded,'%')"/>
-                <xsl:variable name="hexpair" select="translate(substring(substring-after($encoded,'%'),1,2),'abcdef','ABCDEF')"/>
-                <xsl:variable name="decimal" select="(string-length(substring-before($hex,substring($hexpair,1,1))))*16 + string-length(substring-before($hex,substring($hexpair,2,1)))"/>
+            <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+            <xsl:when test="function-available('nx-fn:decode')">
+                <xsl:value-of select="nx-fn:decode(string($encoded))"/>
+            </xsl:when>
+            <xsl:otherwise>
                 <xsl:choose>
-                    <xsl:when test="$decimal &lt; 127 and $decimal &gt; 31">
-                        <xsl:value-of select="substring($ascii,$decimal - 31,1)"/>
-                    </xsl:when>
-                    <xsl:when test="$decimal &gt; 159">
-                        <xsl:value-of select="substring($latin1,$decimal - 159,1)"/>
+                    <xsl:when test="contains($encoded,'%')">
+                        <xsl:value-of select="substring-before($encoded,'%')"/>
+                        <xsl:variable name="hexpair" select="translate(substring(substring-after($encoded,'%'),1,2),'abcdef','ABCDEF')"/>
+                        <xsl:variable name="decimal" select="(string-length(substring-before($hex,substring($hexpair,1,1))))*16 + string-length(substring-before($hex,substring($hexpair,2,1)))"/>
+                        <xsl:choose>
+                            <xsl:when test="$decimal &lt; 127 and $decimal &gt; 31">
+                                <xsl:value-of select="substring($ascii,$decimal - 31,1)"/>
+                            </xsl:when>
+                            <xsl:when test="$decimal &gt; 159">
+                                <xsl:value-of select="substring($latin1,$decimal - 159,1)"/>
+                            </xsl:when>
+                            <xsl:otherwise>?</xsl:otherwise>
+                        </xsl:choose>
+                        <xsl:call-template name="decode">
+                            <xsl:with-param name="encoded" select="substring(substring-after($encoded,'%'),3)"/>
+                        </xsl:call-template>
                     </xsl:when>
-                    <xsl:otherwise>?</xsl:otherwise>
+                    <xsl:otherwise>
+                        <xsl:value-of select="$encoded"/>
+                    </xsl:otherwise>
                 </xsl:choose>
-                <xsl:call-template name="decode">
-                    <xsl:with-param name="encoded" select="substring(substring-after($encoded,'%'),3)"/>
-                </xsl:call-template>
-            </xsl:when>
-            <xsl:otherwise>
-                <xsl:value-of select="$encoded"/>
             </xsl:otherwise>
         </xsl:choose>
     </xsl:template>
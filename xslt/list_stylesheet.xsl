@@ -14,10 +14,21 @@ Remember to disable NX_XSLT_DEBUG before production deployment.
   xmlns:xsi="http://www.w3.org/2001/XMLSchema"
   xmlns:nx="https://data.nist.gov/od/dm/nexus/experiment/v1.0"
   xmlns:exslt="http://exslt.org/common" extension-element-prefixes="exslt"
+  xmlns:nxb="https://datasophos.co/nexuslims/batch"
+  xmlns:nx-fn="https://datasophos.co/nexuslims/functions" exclude-result-prefixes="nxb nx-fn"
   version="1.0">
   <xsl:output method="html" indent="yes" encoding="UTF-8"/>
 
   <xsl:param name="detail_url" select="'#'"/>
+  <!--
+      - Dataset and activity counts and file extension counts ("count:extension/"
+      - items) of the record, computed when the record is saved (see
+      - nexuslims_overrides/record_summary.py). When not provided, they are
+      - computed from the record. Batched items carry their own values.
+      -->
+  <xsl:param name="datasetCount" select="count(//nx:dataset)"/>
+  <xsl:param name="activityCount" select="count(//nx:acquisitionActivity)"/>
+  <xsl:param name="extensionCounts" select="''"/>
   <xsl:variable name="datasetBaseUrl">https://CHANGE.THIS.VALUE</xsl:variable>
   <xsl:variable name="previewBaseUrl">https://CHANGE.THIS.VALUE</xsl:variable>
 
@@ -60,6 +71,8 @@ Remember to disable NX_XSLT_DEBUG before production deployment.
     <month month-number="12">December</month>
   </xsl:variable>
   <xsl:key name="lookup.date.month" match="month" use="@month-number"/>
+  <!-- ext elements of the fragments built by get-unique-extensions -->
+  <xsl:key name="extension-by-value" match="ext" use="value"/>
 
   <!-- Lookup table for tooltip text for extension badges
 
@@ -109,9 +122,59 @@ Use it like:
     select="exslt:node-set($extension-to-tooltip-lookup-fragment)" />
 
   <xsl:template match="/">
-    <xsl:apply-templates select="/nx:Experiment"/>
+    <xsl:apply-templates select="/nx:Experiment | /nxb:batch"/>
+  </xsl:template>
+
+  <!--
+      - Batched rendering of a page of search results (see xsl_transform_batch
+      - in nexuslims_overrides/xml.py). Each record is wrapped in an nxb:item
+      - element carrying its own detail_url, and the output of each record is
+      - preceded by a marker comment used to split the results apart again.
+      -->
+  <xsl:template match="nxb:batch">
+    <xsl:for-each select="nxb:item">
+      <xsl:comment>nx-batch-item:<xsl:value-of select="@index"/></xsl:comment>
+      <xsl:apply-templates select="nx:Experiment">
+        <xsl:with-param name="item-detail-url">
+          <xsl:choose>
+            <xsl:when test="@detail_url">
+              <xsl:value-of select="@detail_url"/>
+            </xsl:when>
+            <xsl:otherwise>
+              <xsl:value-of select="$detail_url"/>
+            </xsl:otherwise>
+          </xsl:choose>
+        </xsl:with-param>
+        <xsl:with-param name="item-dataset-count">
+          <xsl:choose>
+            <xsl:when test="@dataset_count">
+              <xsl:value-of select="@dataset_count"/>
+            </xsl:when>
+            <xsl:otherwise>
+              <xsl:value-of select="count(.//nx:dataset)"/>
+            </xsl:otherwise>
+          </xsl:choose>
+        </xsl:with-param>
+        <xsl:with-param name="item-activity-count">
+          <xsl:choose>
+            <xsl:when test="@activity_count">
+              <xsl:value-of select="@activity_count"/>
+            </xsl:when>
+            <xsl:otherwise>
+              <xsl:value-of select="count(.//nx:acquisitionActivity)"/>
+            </xsl:otherwise>
+          </xsl:choose>
+        </xsl:with-param>
+        <xsl:with-param name="item-extension-counts" select="string(@extension_counts)"/>
+      </xsl:apply-templates>
+    </xsl:for-each>
   </xsl:template>
+
   <xsl:template match="nx:Experiment">
+    <xsl:param name="item-detail-url" select="$detail_url"/>
+    <xsl:param name="item-dataset-count" select="$datasetCount"/>
+    <xsl:param name="item-activity-count" select="$activityCount"/>
+    <xsl:param name="item-extension-counts" select="$extensionCounts"/>
     <xsl:variable name="reservation-date-part">
       <xsl:call-template name="tokenize-select">
         <xsl:with-param name="text" select="nx:summary/nx:reservationStart"/>
@@ -131,31 +194,6 @@ Use it like:
     </xsl:variable>
 
 
-    <xsl:variable name="extension-fragment">
-      <xsl:element name="extensions">
-        <xsl:for-each select="//nx:dataset/nx:location">
-          <xsl:call-template name="get-file-extension">
-            <xsl:with-param name="path">
-              <xsl:value-of select="."/>
-            </xsl:with-param>
-          </xsl:call-template>
-        </xsl:for-each>
-      </xsl:element>
-    </xsl:variable>
-
-    <xsl:variable name="extensionCount">
-      <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[not(preceding::value = value)]">
-        <xsl:variable name="thisExtension" select="value/text()"/>
-        <xsl:variable name="thisCount" select="count(exslt:node-set($extension-fragment)/extensions/ext[value = $thisExtension])"/>
-        <xsl:element name="extension">
-          <xsl:attribute name="count">
-            <xsl:value-of select="$thisCount"/>
-          </xsl:attribute>
-          <xsl:value-of select="$thisExtension"/>
-        </xsl:element>
-      </xsl:for-each>
-    </xsl:variable>
-
     <style>
       .tooltip {
       z-index: 20000;
@@ -166,7 +204,7 @@ Use it like:
      <div>
        <xsl:element name="a">
          <xsl:attribute name="href">
-           <xsl:value-of select="$detail_url"/>
+           <xsl:value-of select="$item-detail-url"/>
          </xsl:attribute>
          <span class="list-record-title">
              <i class="fas fa-file-alt results-icon"/>
@@ -205,8 +243,8 @@ Use it like:
          <xsl:value-of select="nx:summary/nx:instrument"/>
        </span>
        <span class="badge list-record-badge">
-         <xsl:value-of select="count(//nx:dataset)"/> data files in <xsl:value-of select="count(//nx:acquisitionActivity)"/> activit<xsl:choose>
-           <xsl:when test="count(//nx:acquisitionActivity) = 1">y</xsl:when>
+         <xsl:value-of select="$item-dataset-count"/> data files in <xsl:value-of select="$item-activity-count"/> activit<xsl:choose>
+           <xsl:when test="$item-activity-count = 1">y</xsl:when>
            <xsl:otherwise>ies</xsl:otherwise>
          </xsl:choose> </span>
         <i class="fa fa-cubes filetypes-icon" style="margin-left:0.75em; font-size: small;"
@@ -216,6 +254,7 @@ Use it like:
        <xsl:variable name="unique-extensions">
          <xsl:call-template name="get-unique-extensions">
            <xsl:with-param name="global" select="true()"/>
+           <xsl:with-param name="counts" select="$item-extension-counts"/>
          </xsl:call-template>
        </xsl:variable>
        <xsl:call-template name="extensions-to-badges">
@@ -444,37 +483,45 @@ Use it like:
       -->
   <xsl:template name="localize-date">
     <xsl:param name="date"/>
-    <xsl:variable name="month-num">
-      <xsl:call-template name="tokenize-select">
-        <xsl:with-param name="text">
-          <xsl:value-of select="$date"/>
-        </xsl:with-param>
-        <xsl:with-param name="delim" select="'-'"/>
-        <xsl:with-param name="i" select="2"/>
-      </xsl:call-template>
-    </xsl:variable>
+    <xsl:choose>
+      <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+      <xsl:when test="function-available('nx-fn:localize-date')">
+        <xsl:value-of select="nx-fn:localize-date(string($date))"/>
+      </xsl:when>
+      <xsl:otherwise>
+        <xsl:variable name="month-num">
+          <xsl:call-template name="tokenize-select">
+            <xsl:with-param name="text">
+              <xsl:value-of select="$date"/>
+            </xsl:with-param>
+            <xsl:with-param name="delim" select="'-'"/>
+            <xsl:with-param name="i" select="2"/>
+          </xsl:call-template>
+        </xsl:variable>
 
-    <!-- The 'for-each document' bit is required because keys only work in the context of the current
-                 document in XSLT 1.0 (see https://stackoverflow.com/a/35327827/1435788) -->
-    <xsl:for-each select="document('')">
-      <xsl:value-of select="key('lookup.date.month', $month-num)"/>
-    </xsl:for-each>
-    <xsl:text> </xsl:text>
-    <xsl:call-template name="tokenize-select">
-      <xsl:with-param name="text">
-        <xsl:value-of select="$date"/>
-      </xsl:with-param>
-      <xsl:with-param name="delim" select="'-'"/>
-      <xsl:with-param name="i" select="3"/>
-    </xsl:call-template>
-    <xsl:text>, </xsl:text>
-    <xsl:call-template name="tokenize-select">
-      <xsl:with-param name="text">
-        <xsl:value-of select="$date"/>
-      </xsl:with-param>
-      <xsl:with-param name="delim" select="'-'"/>
-      <xsl:with-param name="i" select="1"/>
-    </xsl:call-template>
+        <!-- The 'for-each document' bit is required because keys only work in the context of the current
+                     document in XSLT 1.0 (see https://stackoverflow.com/a/35327827/1435788) -->
+        <xsl:for-each select="document('')">
+          <xsl:value-of select="key('lookup.date.month', $month-num)"/>
+        </xsl:for-each>
+        <xsl:text> </xsl:text>
+        <xsl:call-template name="tokenize-select">
+          <xsl:with-param name="text">
+            <xsl:value-of select="$date"/>
+          </xsl:with-param>
+          <xsl:with-param name="delim" select="'-'"/>
+          <xsl:with-param name="i" select="3"/>
+        </xsl:call-template>
+        <xsl:text>, </xsl:text>
+        <xsl:call-template name="tokenize-select">
+          <xsl:with-param name="text">
+            <xsl:value-of select="$date"/>
+          </xsl:with-param>
+          <xsl:with-param name="delim" select="'-'"/>
+          <xsl:with-param name="i" select="1"/>
+        </xsl:call-template>
+      </xsl:otherwise>
+    </xsl:choose>
   </xsl:template>
 
   <!--
@@ -489,76 +536,119 @@ Use it like:
     <xsl:param name="text"/>
     <xsl:param name="delim" select="' '"/>
     <xsl:param name="i" select="1"/>
-
     <xsl:choose>
-
-      <!-- we want the first element; we can deliver it  -->
-      <xsl:when test="$i = 1">
+      <!-- Python implementation, see nexuslims_overrides/xslt_functions.py -->
+      <xsl:when test="function-available('nx-fn:tokenize-select')">
+        <xsl:value-of select="nx-fn:tokenize-select(string($text), string($delim), number($i))"/>
+      </xsl:when>
+      <xsl:otherwise>
         <xsl:choose>
-          <xsl:when test="contains($text, $delim)">
-            <xsl:value-of select="substring-before($text, $delim)"/>
+
+          <!-- we want the first element; we can deliver it  -->
+          <xsl:when test="$i = 1">
+            <xsl:choose>
+              <xsl:when test="contains($text, $delim)">
+                <xsl:value-of select="substring-before($text, $delim)"/>
+              </xsl:when>
+              <xsl:otherwise>
+                <xsl:value-of select="$text"/>
+              </xsl:otherwise>
+            </xsl:choose>
           </xsl:when>
+
+          <!-- should not happen -->
+          <xsl:when test="$i &lt;= 1"/>
+
+          <!-- need an element that's not first one; strip off the first element
+                 and recurse into this function -->
           <xsl:otherwise>
-            <xsl:value-of select="$text"/>
+            <xsl:call-template name="tokenize-select">
+              <xsl:with-param name="text">
+                <xsl:value-of select="substring-after($text, $delim)"/>
+              </xsl:with-param>
+              <xsl:with-param name="delim" select="$delim"/>
+              <xsl:with-param name="i" select="$i - 1"/>
+            </xsl:call-template>
           </xsl:otherwise>
-        </xsl:choose>
-      </xsl:when>
-
-      <!-- should not happen -->
-      <xsl:when test="$i &lt;= 1"/>
 
-      <!-- need an element that's not first one; strip off the first element
-             and recurse into this function -->
-      <xsl:otherwise>
-        <xsl:call-template name="tokenize-select">
-          <xsl:with-param name="text">
-            <xsl:value-of select="substring-after($text, $delim)"/>
-          </xsl:with-param>
-          <xsl:with-param name="delim" select="$delim"/>
-          <xsl:with-param name="i" select="$i - 1"/>
-        </xsl:call-template>
+        </xsl:choose>
       </xsl:otherwise>
-
     </xsl:choose>
   </xsl:template>
 
   <xsl:template name="get-unique-extensions">
     <xsl:param name="global" select="true()"/>
-    <xsl:variable name="selection">
-      <xsl:choose>
-        <xsl:when test="$global">
-          <xsl:copy-of select="//nx:dataset/nx:location"/>
-        </xsl:when>
-        <xsl:otherwise>
-          <xsl:copy-of select="nx:dataset/nx:location"/>
-        </xsl:otherwise>
-      </xsl:choose>
-    </xsl:variable>
-    <xsl:variable name="extension-fragment">
-      <xsl:element name="extensions">
-        <xsl:for-each select="exslt:node-set($selection)/nx:location">
-          <xsl:call-template name="get-file-extension">
-            <xsl:with-param name="path">
-              <xsl:value-of select="."/>
-            </xsl:with-param>
+    <!-- extension counts of the record summary, as "count:extension/" items -->
+    <xsl:param name="counts" select="''"/>
+    <xsl:choose>
+      <xsl:when test="$counts != ''">
+        <xsl:element name="extensionCount">
+          <xsl:call-template name="extension-counts-to-elements">
+            <xsl:with-param name="counts" select="$counts"/>
           </xsl:call-template>
-        </xsl:for-each>
-      </xsl:element>
-    </xsl:variable>
-
-    <xsl:element name="extensionCount">
-      <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[not(preceding::value = value)]">
-        <xsl:sort select="value/text()"/>
-        <xsl:variable name="thisExtension" select="value/text()"/>
-        <xsl:variable name="thisCount" select="count(exslt:node-set($extension-fragment)/extensions/ext[value = $thisExtension])"/>
-        <xsl:element name="extension">
-          <xsl:attribute name="count">
-            <xsl:value-of select="$thisCount"/>
-          </xsl:attribute>
-          <xsl:value-of select="$thisExtension"/>
         </xsl:element>
-      </xsl:for-each>
-    </xsl:element>
+      </xsl:when>
+      <xsl:otherwise>
+        <xsl:variable name="selection">
+          <xsl:choose>
+            <xsl:when test="$global">
+              <xsl:copy-of select=".//nx:dataset/nx:location"/>
+            </xsl:when>
+            <xsl:otherwise>
+              <xsl:copy-of select="nx:dataset/nx:location"/>
+            </xsl:otherwise>
+          </xsl:choose>
+        </xsl:variable>
+        <xsl:variable name="extension-fragment">
+          <xsl:element name="extensions">
+            <xsl:for-each select="exslt:node-set($selection)/nx:location">
+              <xsl:call-template name="get-file-extension">
+                <xsl:with-param name="path">
+                  <xsl:value-of select="."/>
+                </xsl:with-param>
+              </xsl:call-template>
+            </xsl:for-each>
+          </xsl:element>
+        </xsl:variable>
+
+        <xsl:element name="extensionCount">
+          <!-- Muenchian grouping: the first ext of each value is selected and
+            counted with key lookups, in linear time. Keys apply to the
+            document of the context node, here the extension fragment -->
+          <xsl:for-each select="exslt:node-set($extension-fragment)/extensions/ext[generate-id() = generate-id(key('extension-by-value', value)[1])]">
+            <xsl:sort select="value/text()"/>
+            <xsl:variable name="thisExtension" select="value/text()"/>
+            <xsl:variable name="thisCount" select="count(key('extension-by-value', value))"/>
+            <xsl:element name="extension">
+              <xsl:attribute name="count">
+                <xsl:value-of select="$thisCount"/>
+              </xsl:attribute>
+              <xsl:value-of select="$thisExtension"/>
+            </xsl:element>
+          </xsl:for-each>
+        </xsl:element>
+      </xsl:otherwise>
+    </xsl:choose>
+  </xsl:template>
+
+  <!--
+      Convert the extension counts of a record summary ("12:tif/3:dm3/") to the
+      extension elements built by get-unique-extensions
+  -->
+  <xsl:template name="extension-counts-to-elements">
+    <xsl:param name="counts"/>
+    <xsl:if test="contains($counts, '/')">
+      <xsl:variable name="item" select="substring-before($counts, '/')"/>
+      <xsl:element name="extension">
+        <xsl:attribute name="count">
+          <xsl:value-of select="substring-before($item, ':')"/>
+        </xsl:attribute>
+        <xsl:value-of select="substring-after($item, ':')"/>
+      </xsl:element>
+      <xsl:call-template name="extension-counts-to-elements">
+        <xsl:with-param name="counts" select="substring-after($counts, '/')"/>
+      </xsl:call-template>
+    </xsl:if>
   </xsl:template>
 
   <xsl:template name="get-file-extension">